@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 import dj_database_url
 import dotenv
 
@@ -45,6 +46,10 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Take the write lock when a transaction starts and wait for it,
+            # so concurrent writers (e.g. refresh_cache --workers) queue up
+            # instead of failing with "database is locked".
+            "OPTIONS": {"timeout": 20, "transaction_mode": "IMMEDIATE"},
         }
     }
 
@@ -63,6 +68,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "stats_app.middleware.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -139,3 +145,51 @@ CORS_ALLOWED_ORIGINS = [
     "https://front-end-production-7b0d.up.railway.app",
     "http://localhost:3000",
 ]
+
+# --- CACHE CONFIGURATION ---
+# API responses are cached per data generation. A file-based cache is shared by
+# every gunicorn worker and management command on the machine, so a refresh
+# run invalidates the cached leaderboard for all of them.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.environ.get(
+            "CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "gim_stats_cache")
+        ),
+    }
+}
+
+# Upper bound on how long a cached API response is served, in seconds. Only
+# matters for per-process caches that cannot see invalidations from elsewhere.
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", "300"))
+
+# Serve the API with async views. gim_project.asgi turns this on by default;
+# under WSGI the sync views are cheaper.
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "False") == "True"
+
+# Per-request SQL/serialization metrics: a Server-Timing header and a JSON log
+# line on the "stats_app.requests" logger for every request, with the slowest
+# statements of requests taking longer than REQUEST_METRICS_SLOW_MS.
+REQUEST_METRICS = os.environ.get("REQUEST_METRICS", "False") == "True"
+REQUEST_METRICS_SLOW_MS = int(os.environ.get("REQUEST_METRICS_SLOW_MS", "500"))
+if REQUEST_METRICS:
+    MIDDLEWARE.insert(0, "stats_app.middleware.RequestMetricsMiddleware")
+    LOGGING = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {"console": {"class": "logging.StreamHandler"}},
+        "loggers": {
+            "stats_app.requests": {"handlers": ["console"], "level": "INFO"},
+        },
+    }
+
+# cProfile output from `--profile` commands and requests carrying a signed
+# profiling token; only the newest PROFILE_KEEP profiles are kept.
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "gim_stats_profiles")
+)
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+# How long a token from `manage.py profiles --token` stays valid, in seconds.
+PROFILE_TOKEN_MAX_AGE = int(os.environ.get("PROFILE_TOKEN_MAX_AGE", "3600"))
@@ -1,5 +1,19 @@
+import json
+from collections import defaultdict
 from django.contrib import admin
-from .models import GroupMember, PlayerStatsCache, APICallLog, PlayerHistory
+from django.utils.html import format_html
+from .api_handler import build_stats_projection
+from .history import delete_snapshots, iter_snapshots
+from .models import (
+    GroupMember,
+    PlayerStatsCache,
+    APICallLog,
+    PlayerHistory,
+    RateLimitSlot,
+    RefreshSchedule,
+    BackfillCheckpoint,
+)
+from .utils import get_config
 
 
 @admin.register(GroupMember)
@@ -13,11 +27,21 @@ class GroupMemberAdmin(admin.ModelAdmin):
 
 @admin.register(PlayerStatsCache)
 class PlayerStatsCacheAdmin(admin.ModelAdmin):
+    """
+    Reads go through `projection`, so it is derived from `data` on save
+    rather than edited directly.
+    """
+
     list_display = (
         "group_member",
         "last_updated",
     )
     search_fields = ("group_member__player_name",)
+    readonly_fields = ("projection",)
+
+    def save_model(self, request, obj, form, change):
+        obj.projection = build_stats_projection(obj.data, get_config())
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(APICallLog)
@@ -25,16 +49,82 @@ class APICallLogAdmin(admin.ModelAdmin):
     list_display = ("timestamp",)
 
 
+@admin.register(RateLimitSlot)
+class RateLimitSlotAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "slot",
+        "expires_at",
+    )
+
+
+@admin.register(RefreshSchedule)
+class RefreshScheduleAdmin(admin.ModelAdmin):
+    list_display = (
+        "group_member",
+        "next_refresh_at",
+        "last_refreshed_at",
+        "last_changed_at",
+        "xp_per_hour",
+        "consecutive_failures",
+    )
+    search_fields = ("group_member__player_name",)
+
+
+@admin.register(BackfillCheckpoint)
+class BackfillCheckpointAdmin(admin.ModelAdmin):
+    list_display = (
+        "group_member",
+        "status",
+        "synced_until",
+        "datapoints_added",
+        "updated_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("group_member__player_name",)
+
+
 @admin.register(PlayerHistory)
 class PlayerHistoryAdmin(admin.ModelAdmin):
     """
     Admin configuration for the PlayerHistory model.
     This makes the historical data viewable and searchable in the Django admin.
+
+    Rows may be deltas against earlier rows, so they are shown rebuilt and
+    are read-only; deleting goes through history.delete_snapshots, which
+    re-encodes the rest of the member's history.
     """
 
     list_display = (
         "group_member",
         "timestamp",
+        "is_keyframe",
     )
     search_fields = ("group_member__player_name",)
     list_filter = ("timestamp",)
+    fields = ("group_member", "timestamp", "is_keyframe", "snapshot")
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Snapshot")
+    def snapshot(self, obj):
+        snapshots = iter_snapshots(
+            obj.group_member, start=obj.timestamp, end=obj.timestamp
+        )
+        _, snapshot = next(snapshots, (None, None))
+        return format_html("<pre>{}</pre>", json.dumps(snapshot, indent=2))
+
+    def delete_model(self, request, obj):
+        delete_snapshots(obj.group_member, [obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        by_member = defaultdict(list)
+        for pk, member_id in queryset.values_list("pk", "group_member_id"):
+            by_member[member_id].append(pk)
+        for member in GroupMember.objects.filter(pk__in=by_member):
+            delete_snapshots(member, by_member[member.pk])
@@ -1,24 +1,31 @@
 # stats_app/api_handler.py
 
 
-import requests
-from datetime import timedelta
-from urllib.parse import quote
+import time
+from django.db import transaction
 from django.utils import timezone
-from .models import GroupMember, PlayerStatsCache, APICallLog, PlayerHistory
+from .models import GroupMember, PlayerStatsCache
+from .history import latest_snapshot, record_snapshot
+from .ratelimit import RateLimitExceeded
+from .upstream import get_client
 from requests.exceptions import RequestException
 from dataclasses import dataclass
-from .utils import get_keys, load_config, carry_forward
+from .utils import get_config, carry_forward
+from .xpmath import xp_to_levels
 
 
-@dataclass
+# Each refresh makes two upstream calls: add_datapoint, then player_stats.
+CALLS_PER_REFRESH = 2
+
+
+@dataclass(slots=True)
 class Skill:
     rank: int
     level: int
     xp: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Boss:
     killcount: int
 
@@ -31,10 +38,17 @@ class PlayerStats:
     bosses: dict
 
 
-def refresh_player_cache(player_name):
+def refresh_player_cache(
+    player_name, rate_limit_timeout=0, reservation=None, deadline=None
+):
     """
     Handles the "heavy lifting": triggers an API update, fetches fresh data,
-    and saves it to the PlayerStatsCache.
+    and saves it to the PlayerStatsCache. The budget for both upstream calls
+    is reserved up front, waiting up to `rate_limit_timeout` seconds, so a
+    refresh never spends a call it can't finish. Callers that already hold
+    a Reservation for CALLS_PER_REFRESH calls can pass it in instead.
+    `deadline`, a time.monotonic() value, bounds the upstream calls (see
+    TempleClient.get).
     Returns True on success, False on failure.
     """
     try:
@@ -42,110 +56,180 @@ def refresh_player_cache(player_name):
     except GroupMember.DoesNotExist:
         return False
 
-    config = load_config()
-    DATA_KEY, INFO_KEY, OVERALL_KEY, OVERALL_RANK_KEY, OVERALL_LEVEL_KEY = get_keys()
-    max_requests = config.get("api_rate_limit", {}).get("max_requests_per_minute", 5)
+    config = get_config()
+    DATA_KEY, INFO_KEY, OVERALL_KEY, OVERALL_RANK_KEY, OVERALL_LEVEL_KEY = config.keys
+
+    if reservation is None:
+        wait = rate_limit_timeout
+        if deadline is not None:
+            wait = min(wait, max(0.0, deadline - time.monotonic()))
+        reservation = get_client().reserve(CALLS_PER_REFRESH, timeout=wait)
+        if reservation is None:
+            return False
 
-    if update_player_on_temple(player_name, max_requests):
+    if update_player_on_temple(
+        player_name, rate_limit_timeout, limiter=reservation, deadline=deadline
+    ):
         try:
-            api_response = fetch_player_stats_from_api(player_name)
+            api_response = fetch_player_stats_from_api(
+                player_name, rate_limit_timeout, limiter=reservation, deadline=deadline
+            )
 
-            skill_names = config.get("skills", [])
+            skill_names = config.skills
 
-            try:
-                last_history = (
-                    PlayerHistory.objects.filter(group_member=member)
-                    .only("data")
-                    .latest("timestamp")
-                )
-                previous_data = last_history.data.get("data", {})
-            except PlayerHistory.DoesNotExist:
-                previous_data = {}
+            previous_data = (latest_snapshot(member) or {}).get(DATA_KEY, {})
 
             api_data = api_response.get(DATA_KEY, {})
             for skill in skill_names:
                 # XP carry-forward
-                xp = carry_forward(api_data.get(skill), previous_data.get(skill, 0))
-                api_data[skill] = xp
+                api_data[skill] = carry_forward(
+                    api_data.get(skill), previous_data.get(skill, 0)
+                )
+
+            # Levels can never be below what the XP earns, whatever the API says.
+            levelled_skills = [skill for skill in skill_names if skill != OVERALL_KEY]
+            xp_levels = dict(
+                zip(
+                    levelled_skills,
+                    xp_to_levels([api_data[skill] for skill in levelled_skills]),
+                )
+            )
+            xp_levels[OVERALL_KEY] = sum(xp_levels.values())
 
+            for skill, level_key in zip(skill_names, config.skill_level_keys):
                 # Level carry-forward
-                level_key = f"{skill}_level"
                 level = carry_forward(
                     api_data.get(level_key), previous_data.get(level_key, 0)
                 )
-                api_data[level_key] = level
+                api_data[level_key] = max(level, xp_levels[skill])
 
             api_response[DATA_KEY] = api_data
 
-            cache, created = PlayerStatsCache.objects.get_or_create(
-                group_member=member, defaults={DATA_KEY: api_response}
-            )
-            if not created:
-                cache.data = api_response
-                cache.last_updated = timezone.now()
-                cache.save()
-
-            PlayerHistory.objects.create(
-                group_member=member, timestamp=cache.last_updated, data=api_response
-            )
+            projection = build_stats_projection(api_response, config)
+            with transaction.atomic():
+                cache, created = PlayerStatsCache.objects.get_or_create(
+                    group_member=member,
+                    defaults={DATA_KEY: api_response, "projection": projection},
+                )
+                if not created:
+                    cache.data = api_response
+                    cache.projection = projection
+                    cache.last_updated = timezone.now()
+                    cache.save()
+
+                record_snapshot(
+                    member, cache.last_updated, api_response, skill_names=skill_names
+                )
             return True  # Success
-        except RequestException:
+        except (RequestException, RateLimitExceeded):
             return False  # Failed to fetch new data
     return False  # Rate limit was likely hit
 
 
 def get_player_stats_from_cache(player_name, cache=None):
     """
-    Handles the "fast" part: reads and parses data directly from the cache.
-    Accepts a cache object to avoid extra queries.
+    Handles the "fast" part: builds PlayerStats from the cache's projection.
+    Accepts a cache object to avoid extra queries; callers that pass one can
+    defer its raw `data`, which is only read when the projection is missing
+    or was built for a different config. Callers with many caches should run
+    them through refresh_projections() first.
     """
     from .models import GroupMember, PlayerStatsCache
 
     try:
         if cache is not None:
             member = cache.group_member
-            api_response = cache.data
         else:
             member = GroupMember.objects.get(player_name=player_name)
-            cache = PlayerStatsCache.objects.get(group_member=member)
-            api_response = cache.data
+            cache = PlayerStatsCache.objects.defer("data").get(group_member=member)
     except (GroupMember.DoesNotExist, PlayerStatsCache.DoesNotExist):
         return None
 
-    DATA_KEY, INFO_KEY, OVERALL_KEY, OVERALL_RANK_KEY, OVERALL_LEVEL_KEY = get_keys()
+    refresh_projections([cache])
+    projection = cache.projection
+    if projection is None:
+        return None
+
+    return PlayerStats(
+        player_name=member.player_name,
+        timestamp=projection["timestamp"],
+        skills={key: Skill(*values) for key, *values in projection["skills"]},
+        bosses={key: Boss(killcount) for key, killcount in projection["bosses"]},
+    )
+
+
+def refresh_projections(caches):
+    """
+    Rebuilds and saves the projections of `caches` (PlayerStatsCache rows,
+    `data` possibly deferred) that are missing or were built for a different
+    config, updating the rows in place. Their `data` is read in one query; a
+    row refreshed meanwhile keeps the projection saved with its new data.
+    """
+    config = get_config()
+    stale = {
+        cache.pk: cache
+        for cache in caches
+        if not cache.projection or cache.projection.get("layout") != config.layout
+    }
+    if not stale:
+        return
+
+    rows = PlayerStatsCache.objects.filter(pk__in=stale).values_list(
+        "pk", "data", "last_updated"
+    )
+    for pk, data, last_updated in rows:
+        projection = build_stats_projection(data, config)
+        stale[pk].projection = projection
+        if projection is not None:
+            PlayerStatsCache.objects.filter(pk=pk, last_updated=last_updated).update(
+                projection=projection
+            )
+
+
+def build_stats_projection(api_response, config):
+    """
+    Parses a Temple player_stats response into the form stored as
+    PlayerStatsCache.projection: skills as [key, rank, level, xp] rows in
+    config order (with the overall totals last) and bosses as [key,
+    killcount] rows sorted by killcount. Rows rather than objects, because
+    JSON columns need not keep key order. Returns None for a response with
+    no stats.
+    """
+    DATA_KEY, INFO_KEY, _, _, _ = config.keys
     if not api_response or DATA_KEY not in api_response:
         return None
 
-    config = load_config()
     player_info = api_response.get(DATA_KEY, {}).get(INFO_KEY, {})
     player_data = api_response.get(DATA_KEY, {})
 
     if not player_info or not player_data:
         return None
 
-    parsed_skills = parse_skills(player_data, config)
-    parsed_bosses = parse_bosses(player_data, config)
-
-    return PlayerStats(
-        player_name=member.player_name,
-        timestamp=player_info.get("Last checked", "N/A"),
-        skills=parsed_skills,
-        bosses=parsed_bosses,
-    )
+    skills = parse_skills(player_data, config)
+    bosses = parse_bosses(player_data, config)
+    return {
+        "layout": config.layout,
+        "timestamp": player_info.get("Last checked", "N/A"),
+        "skills": [[key, s.rank, s.level, s.xp] for key, s in skills.items()],
+        "bosses": [[key, b.killcount] for key, b in bosses.items()],
+    }
 
 
 def parse_skills(player_data, config):
-    """Parse skills from player data using the provided config."""
-    skill_names = config.get("skills", [])
+    """Parse skills from player data using the provided StatsConfig."""
     parsed_skills = {}
-    for skill_name in skill_names:
-        skill_key = skill_name.lower()
-        rank = player_data.get(f"{skill_name}_rank", 0)
-        level = player_data.get(f"{skill_name}_level", 0)
+    for skill_name, skill_key, rank_key, level_key in zip(
+        config.skills,
+        config.skill_keys,
+        config.skill_rank_keys,
+        config.skill_level_keys,
+    ):
+        rank = player_data.get(rank_key, 0)
+        level = player_data.get(level_key, 0)
         xp = player_data.get(skill_name, 0)
         parsed_skills[skill_key] = Skill(rank=rank, level=level, xp=xp)
 
-    _, _, OVERALL_KEY, OVERALL_RANK_KEY, OVERALL_LEVEL_KEY = get_keys()
+    _, _, OVERALL_KEY, OVERALL_RANK_KEY, OVERALL_LEVEL_KEY = config.keys
     overall_skill_data = player_data.get(OVERALL_KEY, 0)
     overall_rank = player_data.get(OVERALL_RANK_KEY, 0)
     overall_level = player_data.get(OVERALL_LEVEL_KEY, 0)
@@ -157,12 +241,10 @@ def parse_skills(player_data, config):
 
 
 def parse_bosses(player_data, config):
-    """Parse bosses from player data using the provided config."""
-    boss_names = config.get("bosses", [])
+    """Parse bosses from player data using the provided StatsConfig."""
     parsed_bosses = {}
-    for boss_name in boss_names:
-        boss_key = boss_name.lower()
-        killcount = player_data.get(f"{boss_name}", 0)
+    for boss_name, boss_key in zip(config.bosses, config.boss_keys):
+        killcount = player_data.get(boss_name, 0)
         parsed_bosses[boss_key] = Boss(killcount=killcount)
 
     sorted_bosses_list = dict(
@@ -171,34 +253,36 @@ def parse_bosses(player_data, config):
     return sorted_bosses_list
 
 
-def update_player_on_temple(player_name, max_requests_per_minute):
+def update_player_on_temple(
+    player_name, rate_limit_timeout=0, limiter=None, deadline=None
+):
     """Updates the player's stats on the TempleOSRS API.
-    Returns True if the update was successful, False if it hit the rate limit.
+    Returns True if the update was successful, False if it hit the rate limit
+    (after waiting up to `rate_limit_timeout` seconds) or failed. `limiter`
+    may be a Reservation to take the call's token from.
     """
-    # Check if the rate limit has been hit
-    one_minute_ago = timezone.now() - timedelta(seconds=60)
-    recent_requests = APICallLog.objects.filter(timestamp__gte=one_minute_ago)
-
-    if recent_requests.count() >= max_requests_per_minute:
-        return False
-
     try:
-        encoded_player_name = quote(player_name)
-        url = (
-            f"https://templeosrs.com/php/add_datapoint.php?player={encoded_player_name}"
+        get_client().add_datapoint(
+            player_name,
+            rate_limit_timeout=rate_limit_timeout,
+            limiter=limiter,
+            deadline=deadline,
         )
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        APICallLog.objects.create()
         return True
-    except RequestException:
+    except (RequestException, RateLimitExceeded):
         return False
 
 
-def fetch_player_stats_from_api(player_name):
-    """Fetches player stats from the TempleOSRS API."""
-    encoded_player_name = quote(player_name)
-    url = f"https://templeosrs.com/api/player_stats.php?player={encoded_player_name}&bosses=1"
-    response = requests.get(url, timeout=10)
-    response.raise_for_status()
-    return response.json()
+def fetch_player_stats_from_api(
+    player_name, rate_limit_timeout=0, limiter=None, deadline=None
+):
+    """Fetches player stats from the TempleOSRS API.
+    Raises RateLimitExceeded if no call budget frees up within
+    `rate_limit_timeout` seconds.
+    """
+    return get_client().player_stats(
+        player_name,
+        rate_limit_timeout=rate_limit_timeout,
+        limiter=limiter,
+        deadline=deadline,
+    )
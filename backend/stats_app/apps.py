@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class StatsAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "stats_app"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .utils import get_config
+
+        # Fail fast on a malformed config.json instead of on the first request.
+        get_config()
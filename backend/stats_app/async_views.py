@@ -0,0 +1,167 @@
+# stats_app/async_views.py
+
+
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from .events import aevent_stream
+from .middleware import record_timing
+from .views import (
+    boss_leaderboard_response,
+    build_boss_series,
+    build_skill_series,
+    event_stream_response,
+    gains_response,
+    iter_skill_datasets,
+    parse_boss_name,
+    parse_history_params,
+    parse_series_params,
+    parse_skill_names,
+    player_stats_response,
+    resume_event_id,
+    wants_stream,
+)
+
+# Async versions of the API views, served instead of the sync ones when
+# settings.ASYNC_VIEWS is on (the default under gim_project.asgi). They take
+# the same parameters and return the same JSON.
+
+
+@require_GET
+async def player_stats_api(request):
+    # The leaderboard is built from a fixed number of batched queries, so a
+    # single hop to the sync thread per request is all the blocking there is.
+    return await sync_to_async(player_stats_response)(request)
+
+
+@require_GET
+async def skill_history_data_api(request, skill_name):
+    """
+    Async skill_history_data_api: every player's history is queried at the
+    same time on the thread pool, and with `stream=1` datasets are written in
+    player order as they complete.
+    """
+    try:
+        player_names, ymode, start, end, max_points = parse_history_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    skill = skill_name.capitalize()
+    tasks = [
+        asyncio.ensure_future(
+            player_dataset(player_name, skill, ymode, start, end, max_points)
+        )
+        for player_name in player_names
+    ]
+    if wants_stream(request):
+        return StreamingHttpResponse(
+            stream_datasets(tasks), content_type="application/json"
+        )
+
+    datasets = await asyncio.gather(*tasks)
+    with record_timing("serialize"):
+        return JsonResponse({"datasets": [d for d in datasets if d is not None]})
+
+
+@require_GET
+async def multi_skill_history_data_api(request):
+    """Async multi_skill_history_data_api; all samples come from one query."""
+    player_names = [
+        name.strip()
+        for name in request.GET.get("players", "").split(",")
+        if name.strip()
+    ]
+    if not player_names:
+        return JsonResponse({"error": "No players selected"}, status=400)
+
+    try:
+        skill_names = parse_skill_names(request)
+        start, end, max_points = parse_series_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    series = await sync_to_async(build_skill_series)(
+        player_names,
+        skill_names,
+        request.GET.get("ymode", "xp"),
+        start,
+        end,
+        max_points,
+    )
+    with record_timing("serialize"):
+        return JsonResponse(
+            {
+                "skills": {
+                    skill: {"datasets": datasets} for skill, datasets in series.items()
+                }
+            }
+        )
+
+
+@require_GET
+async def gains_api(request):
+    return await sync_to_async(gains_response)(request)
+
+
+@require_GET
+async def boss_leaderboard_api(request):
+    return await sync_to_async(boss_leaderboard_response)(request)
+
+
+@require_GET
+async def boss_history_data_api(request, boss_name):
+    """Async boss_history_data_api."""
+    try:
+        boss = parse_boss_name(boss_name)
+        player_names, _, start, end, max_points = parse_history_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    datasets = await sync_to_async(build_boss_series)(
+        player_names, boss, start, end, max_points
+    )
+    with record_timing("serialize"):
+        return JsonResponse({"datasets": datasets})
+
+
+@require_GET
+async def events_api(request):
+    """
+    Server-Sent Events stream of leaderboard changes. Sends a player_update
+    event each time a refresh commits; reconnecting clients resume from
+    Last-Event-ID (or `last_event_id`). Waiting doesn't hold a thread.
+    """
+    last_id = await sync_to_async(resume_event_id)(request)
+    return event_stream_response(aevent_stream(last_id))
+
+
+def _player_dataset(player_name, skill, ymode, start, end, max_points):
+    try:
+        datasets = iter_skill_datasets(
+            [player_name], skill, ymode, start, end, max_points
+        )
+        return next(datasets, None)
+    finally:
+        # Pool threads each open their own connection; don't leak them.
+        connections.close_all()
+
+
+# Not thread-sensitive, so several players' queries can run at once.
+player_dataset = sync_to_async(_player_dataset, thread_sensitive=False)
+
+
+async def stream_datasets(tasks):
+    """Yields a {"datasets": [...]} JSON document as each task completes, in order."""
+    yield '{"datasets": ['
+    first = True
+    for task in tasks:
+        dataset = await task
+        if dataset is None:
+            continue
+        yield ("" if first else ", ") + json.dumps(dataset, cls=DjangoJSONEncoder)
+        first = False
+    yield "]}"
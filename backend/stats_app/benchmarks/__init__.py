@@ -0,0 +1,4 @@
+# stats_app/benchmarks/__init__.py
+#
+# Repeatable performance benchmarks over a synthetic group. Run them with
+# `python manage.py run_benchmarks`; see that command for the baseline gate.
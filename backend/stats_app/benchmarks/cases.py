@@ -0,0 +1,105 @@
+# stats_app/benchmarks/cases.py
+
+
+from dataclasses import dataclass
+from io import StringIO
+from typing import Callable, Optional
+from django.core.management import call_command
+from django.test import Client
+from ..api_handler import refresh_player_cache
+from ..response_cache import bump_generation
+from .generator import PlayerSimulator, history_start, member_seed
+
+
+@dataclass
+class Case:
+    """One benchmark: `run` is timed; `before` runs untimed ahead of each run."""
+
+    name: str
+    run: Callable
+    before: Optional[Callable] = None
+
+
+class StubTempleClient:
+    """
+    Offline TempleClient replacement backed by PlayerSimulator, so refresh
+    and import benchmarks measure our code rather than the network.
+    """
+
+    def __init__(self, members, snapshots, seed, interval):
+        self.snapshots = snapshots
+        self.seeds = {
+            m.player_name: member_seed(seed, i) for i, m in enumerate(members)
+        }
+        self.start = history_start(snapshots, interval)
+        self.interval = interval
+        self.live = {}
+
+    def simulator(self, player_name):
+        return PlayerSimulator(
+            player_name,
+            seed=self.seeds[player_name],
+            start=self.start,
+            interval=self.interval,
+        )
+
+    def reserve(self, calls, timeout=0):
+        return self  # There is no budget to run out of offline.
+
+    def add_datapoint(
+        self, player_name, rate_limit_timeout=0, limiter=None, deadline=None
+    ):
+        pass
+
+    def player_stats(
+        self, player_name, rate_limit_timeout=0, limiter=None, deadline=None
+    ):
+        sim = self.live.get(player_name)
+        if sim is None:
+            sim = self.live[player_name] = self.simulator(player_name)
+            for _ in range(self.snapshots):
+                sim.step()
+        sim.step()
+        return sim.payload()
+
+    def player_datapoints(
+        self, player_name, seconds=None, rate_limit_timeout=0, limiter=None
+    ):
+        return self.simulator(player_name).datapoints(self.snapshots)
+
+
+def build_cases(members):
+    """The benchmark cases, run against the generated `members`."""
+    client = Client()
+    player_names = ",".join(m.player_name for m in members)
+    first = members[0].player_name
+
+    def get(path):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise AssertionError(f"GET {path} returned {response.status_code}")
+        if response.streaming:
+            return b"".join(response.streaming_content)
+        return response.content
+
+    def refresh():
+        if not refresh_player_cache(first):
+            raise AssertionError(f"refresh_player_cache({first!r}) failed")
+
+    return [
+        # Invalidate first, so every run builds the leaderboard from scratch.
+        Case(
+            "player_stats_api",
+            lambda: get("/api/player_stats/"),
+            before=bump_generation,
+        ),
+        Case(
+            "skill_history_data_api",
+            lambda: get(f"/api/history_data/attack/?players={player_names}"),
+        ),
+        Case("refresh_player_cache", refresh),
+        Case(
+            "replace_player_history",
+            lambda: call_command("replace_player_history", first, stdout=StringIO()),
+        ),
+    ]
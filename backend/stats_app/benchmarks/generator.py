@@ -0,0 +1,133 @@
+# stats_app/benchmarks/generator.py
+
+
+import random
+from datetime import datetime, timedelta, timezone
+from django.utils import timezone as django_timezone
+from ..api_handler import build_stats_projection
+from ..datapoints import DATAPOINT_TIME_FORMAT
+from ..history import replace_history
+from ..models import GroupMember, PlayerStatsCache
+from ..utils import get_config
+from ..xpmath import MAX_XP, xp_to_levels
+
+# Simulations start here unless told otherwise.
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class PlayerSimulator:
+    """
+    Deterministic stand-in for one player's Temple stats. Each step() advances
+    the clock and trains a few skills and bosses, like a real play session.
+    """
+
+    def __init__(self, player_name, seed, start=EPOCH, interval=timedelta(hours=6)):
+        self.player_name = player_name
+        self.rng = random.Random(seed)
+        self.timestamp = start
+        self.interval = interval
+        config = get_config()
+        self.skills = [s for s in config.skills if s != config.keys[2]]
+        self.bosses = list(config.bosses)
+        self.xp = {skill: self.rng.randint(0, 5_000_000) for skill in self.skills}
+        self.kc = {boss: self.rng.choice((0, 0, 5, 50, 500)) for boss in self.bosses}
+
+    def step(self):
+        """Advances one interval and returns the new Temple datapoint stats."""
+        self.timestamp += self.interval
+        if self.rng.random() < 0.6:
+            for skill in self.rng.sample(self.skills, 3):
+                gained = self.rng.randint(0, 60_000)
+                self.xp[skill] = min(MAX_XP, self.xp[skill] + gained)
+            for boss in self.rng.sample(self.bosses, 2):
+                self.kc[boss] += self.rng.randint(0, 10)
+        return self.stats()
+
+    def stats(self):
+        """The current stats, shaped like Temple's player_datapoints entries."""
+        stats = dict(self.xp)
+        stats.update(self.kc)
+        return stats
+
+    def payload(self):
+        """The current stats, shaped like Temple's player_stats response."""
+        config = get_config()
+        DATA_KEY, INFO_KEY, OVERALL_KEY, OVERALL_RANK_KEY, OVERALL_LEVEL_KEY = (
+            config.keys
+        )
+        data = {
+            INFO_KEY: {
+                "Username": self.player_name,
+                "Last checked": self.timestamp.strftime(DATAPOINT_TIME_FORMAT),
+            }
+        }
+        levels = xp_to_levels(self.xp[skill] for skill in self.skills)
+        for skill, level in zip(self.skills, levels):
+            data[skill] = self.xp[skill]
+            data[f"{skill}_level"] = level
+            data[f"{skill}_rank"] = self.rank(self.xp[skill])
+        data[OVERALL_KEY] = sum(self.xp.values())
+        data[OVERALL_LEVEL_KEY] = sum(levels)
+        data[OVERALL_RANK_KEY] = self.rank(data[OVERALL_KEY] / len(self.skills))
+        for boss, kc in self.kc.items():
+            data[boss] = kc
+            data[f"{boss}_rank"] = self.rank(kc * 10_000) if kc else -1
+        return {DATA_KEY: data}
+
+    def datapoints(self, count):
+        """A player_datapoints response covering the next `count` steps."""
+        DATA_KEY = get_config().keys[0]
+        points = {}
+        for _ in range(count):
+            stats = self.step()
+            points[self.timestamp.strftime(DATAPOINT_TIME_FORMAT)] = stats
+        return {DATA_KEY: points}
+
+    @staticmethod
+    def rank(xp):
+        return max(1, 2_000_000 - int(xp) // 10)
+
+
+def player_name(index, prefix="bench"):
+    return f"{prefix}{index:03d}"
+
+
+def member_seed(seed, index):
+    return seed * 100_003 + index
+
+
+def history_start(snapshots, interval):
+    """
+    Where a simulated history starts so it ends today. Aligned to midnight UTC,
+    so only the calendar days move between runs, never the data.
+    """
+    today = django_timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - snapshots * interval
+
+
+def generate_group(members, snapshots, seed=0, interval=timedelta(hours=6)):
+    """
+    Creates `members` GroupMembers, each with `snapshots` history snapshots
+    `interval` apart and ending today (plus rollups, samples and a stats cache
+    row), and returns them. Identical arguments produce identical data.
+    """
+    start = history_start(snapshots, interval)
+    created = []
+    for index in range(members):
+        name = player_name(index)
+        member = GroupMember.objects.create(player_name=name)
+        sim = PlayerSimulator(
+            name, seed=member_seed(seed, index), start=start, interval=interval
+        )
+        history = []
+        for _ in range(snapshots):
+            sim.step()
+            history.append((sim.timestamp, sim.payload()))
+        replace_history(member, history)
+        PlayerStatsCache.objects.create(
+            group_member=member,
+            data=history[-1][1],
+            projection=build_stats_projection(history[-1][1], get_config()),
+        )
+        created.append(member)
+    return created
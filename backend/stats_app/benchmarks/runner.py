@@ -0,0 +1,134 @@
+# stats_app/benchmarks/runner.py
+
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..upstream import set_client
+from .cases import StubTempleClient, build_cases
+
+# (members, snapshots per member). "full" is two years at four per day.
+SCALES = {"small": (10, 200), "full": (50, 2 * 365 * 4)}
+SNAPSHOT_INTERVAL = timedelta(hours=6)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Responses are cached; benchmarks run against a private in-memory cache.
+BENCHMARK_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+# Slack added on top of the relative tolerance, so tiny, noisy numbers
+# can't fail the gate on their own.
+LATENCY_SLACK_MS = 5.0
+MEMORY_SLACK_KB = 64.0
+
+
+@dataclass
+class Result:
+    name: str
+    latency_ms: float
+    queries: int
+    peak_kb: float
+
+
+def measure(case, repeat=5):
+    """
+    Runs `case` once to warm up, `repeat` times timed (reporting the median
+    latency and the query count), then once more under tracemalloc for the
+    peak memory, which tracing would otherwise slow down.
+    """
+    if case.before:
+        case.before()
+    case.run()
+
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if case.before:
+            case.before()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            case.run()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(captured)
+
+    if case.before:
+        case.before()
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Result(
+        name=case.name,
+        latency_ms=round(statistics.median(timings), 2),
+        queries=queries,
+        peak_kb=round(peak / 1024, 1),
+    )
+
+
+def run_suite(group, snapshots, seed=0, repeat=5, interval=SNAPSHOT_INTERVAL):
+    """
+    Measures every case against `group`, which generate_group() made with the
+    same `snapshots`, `seed` and `interval`, with Temple calls stubbed out.
+    """
+    previous = set_client(StubTempleClient(group, snapshots, seed, interval))
+    try:
+        return [measure(case, repeat) for case in build_cases(group)]
+    finally:
+        set_client(previous)
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, baseline, scale, results):
+    baseline[scale] = {result.name: asdict(result) for result in results}
+    for entry in baseline[scale].values():
+        del entry["name"]
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def find_regressions(results, expected, tolerance):
+    """
+    Compares results with a baseline entry ({case: metrics}) and returns a
+    message per regression. Query counts are deterministic, so any increase
+    counts; latency and memory may grow by `tolerance` (a fraction) plus
+    a small absolute slack.
+    """
+    regressions = []
+    for result in results:
+        base = expected.get(result.name)
+        if base is None:
+            continue
+        if result.queries > base["queries"]:
+            regressions.append(
+                f"{result.name}: {result.queries} queries (baseline {base['queries']})"
+            )
+        limit = base["latency_ms"] * (1 + tolerance) + LATENCY_SLACK_MS
+        if result.latency_ms > limit:
+            regressions.append(
+                f"{result.name}: {result.latency_ms:.1f}ms "
+                f"(baseline {base['latency_ms']:.1f}ms)"
+            )
+        limit = base["peak_kb"] * (1 + tolerance) + MEMORY_SLACK_KB
+        if result.peak_kb > limit:
+            regressions.append(
+                f"{result.name}: {result.peak_kb:.0f}KB peak "
+                f"(baseline {base['peak_kb']:.0f}KB)"
+            )
+    return regressions
@@ -0,0 +1,188 @@
+# stats_app/bosses.py
+
+
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+from .models import BossSample, GroupMember
+from .utils import get_config
+
+
+def build_boss_samples(member, timestamp, payload, previous, config=None):
+    """
+    Returns unsaved BossSample rows for the bosses whose killcount in a
+    snapshot differs from `previous` ({boss: killcount}, updated in place).
+    With an empty `previous`, i.e. a member's first snapshot, every boss gets
+    a row, so from then on the killcount at any time is the latest row.
+    Bosses absent from the snapshot are skipped and keep their previous
+    killcount.
+    """
+    if config is None:
+        config = get_config()
+    DATA_KEY, _, _, _, _ = config.keys
+    data = (payload or {}).get(DATA_KEY, {})
+
+    samples = []
+    for boss in config.bosses:
+        # Snapshots without boss data (e.g. older datapoints) say nothing
+        # about killcounts, so they mustn't read as 0.
+        if boss not in data:
+            continue
+        killcount = _to_int(data.get(boss))
+        if previous.get(boss) == killcount:
+            continue
+        previous[boss] = killcount
+        samples.append(
+            BossSample(
+                group_member=member,
+                boss=boss,
+                timestamp=timestamp,
+                killcount=killcount,
+            )
+        )
+    return samples
+
+
+def rebuild_boss_samples(member, snapshots, batch_size=1000):
+    """
+    Recomputes every BossSample for a member from `snapshots`, an iterable of
+    (timestamp, payload) in time order such as history.iter_snapshots().
+    """
+    config = get_config()
+    BossSample.objects.filter(group_member=member).delete()
+
+    previous = {}
+    pending = []
+    count = 0
+    for timestamp, payload in snapshots:
+        pending.extend(build_boss_samples(member, timestamp, payload, previous, config))
+        if len(pending) >= batch_size:
+            BossSample.objects.bulk_create(pending)
+            count += len(pending)
+            pending = []
+    BossSample.objects.bulk_create(pending)
+    return count + len(pending)
+
+
+def killcounts_before(member_ids, bosses, moment=None):
+    """
+    Returns {(member_id, boss): killcount} as of just before `moment` (or the
+    latest), for the pairs with a sample by then.
+    """
+    return _edge_killcounts(member_ids, bosses, latest=True, end=moment)
+
+
+def compute_boss_gains(member_ids, bosses, windows):
+    """
+    Returns {(member_id, boss): {"killcount": current, window.name: gained}}
+    for every pair with samples. A window's gain is the killcount at its end
+    minus the killcount at its start, or at the member's first sample if
+    tracking began inside the window. The number of queries depends only on
+    the number of windows.
+    """
+    member_ids = list(member_ids)
+    at = {}
+
+    def killcounts_at(moment):
+        if moment not in at:
+            at[moment] = killcounts_before(member_ids, bosses, moment)
+        return at[moment]
+
+    gains = {key: {"killcount": kc} for key, kc in killcounts_at(None).items()}
+    for window in windows:
+        before = killcounts_at(window.start)
+        after = killcounts_at(window.end)
+        missing = {member_id for member_id, _ in after.keys() - before.keys()}
+        first = {}
+        if missing:
+            first = _edge_killcounts(
+                missing, bosses, latest=False, start=window.start, end=window.end
+            )
+        for key, killcount in after.items():
+            baseline = before.get(key, first.get(key, killcount))
+            gains[key][window.name] = killcount - baseline
+    return gains
+
+
+def boss_series_points(records, end=None):
+    """
+    Returns (timestamp, killcount) points for one member's change-only
+    samples, in time order. Later records replace earlier ones at the same
+    timestamp, and the last killcount is repeated at `end` so the series
+    runs up to it.
+    """
+    points = []
+    for timestamp, killcount in records:
+        if points and points[-1][0] == timestamp:
+            points[-1] = (timestamp, killcount)
+        else:
+            points.append((timestamp, killcount))
+    if points and end is not None and points[-1][0] < end:
+        points.append((end, points[-1][1]))
+    return points
+
+
+def _edge_killcounts(member_ids, bosses, latest, start=None, end=None):
+    """
+    The killcount of each (member, boss)'s latest or earliest sample in
+    [start, end), read with one correlated subquery per boss, each answered
+    by a single probe of the (boss, group_member, timestamp) index.
+
+    A single member (every history write) is read with one window query over
+    its samples instead: building ~70 subqueries costs more than the scan.
+    """
+    order = "-timestamp" if latest else "timestamp"
+    if len(member_ids) == 1:
+        return _member_edge_killcounts(
+            next(iter(member_ids)), bosses, order, start, end
+        )
+
+    samples = BossSample.objects.filter(group_member_id=OuterRef("pk"))
+    if start is not None:
+        samples = samples.filter(timestamp__gte=start)
+    if end is not None:
+        samples = samples.filter(timestamp__lt=end)
+    samples = samples.order_by(order).values("killcount")
+    annotations = {
+        f"boss_{i}": Subquery(samples.filter(boss=boss)[:1])
+        for i, boss in enumerate(bosses)
+    }
+    if not annotations:
+        return {}
+    members = (
+        GroupMember.objects.filter(pk__in=member_ids)
+        .annotate(**annotations)
+        .values("pk", *annotations)
+    )
+
+    killcounts = {}
+    for row in members:
+        for i, boss in enumerate(bosses):
+            if row[f"boss_{i}"] is not None:
+                killcounts[(row["pk"], boss)] = row[f"boss_{i}"]
+    return killcounts
+
+
+def _member_edge_killcounts(member_id, bosses, order, start, end):
+    """_edge_killcounts for one member."""
+    if not bosses:
+        return {}
+    samples = BossSample.objects.filter(group_member_id=member_id, boss__in=bosses)
+    if start is not None:
+        samples = samples.filter(timestamp__gte=start)
+    if end is not None:
+        samples = samples.filter(timestamp__lt=end)
+    edges = (
+        samples.annotate(
+            edge=Window(RowNumber(), partition_by=F("boss"), order_by=order)
+        )
+        .filter(edge=1)
+        .values_list("boss", "killcount")
+    )
+    return {(member_id, boss): killcount for boss, killcount in edges}
+
+
+def _to_int(value):
+    try:
+        return int(value or 0)
+    except (ValueError, TypeError):
+        return 0
@@ -0,0 +1,59 @@
+# stats_app/datapoints.py
+
+
+from datetime import datetime, timezone
+from .utils import carry_forward, get_config
+from .xpmath import xp_to_levels
+
+DATAPOINT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_datapoint_time(value):
+    """Parses a datapoint key (UTC, DATAPOINT_TIME_FORMAT) into an aware datetime."""
+    return datetime.strptime(value, DATAPOINT_TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def parse_datapoints(datapoints, previous_data=None, skill_names=None):
+    """
+    Turns a Temple player_datapoints response into history snapshots.
+
+    Missing or decreasing XP is carried forward from the previous datapoint
+    (seeded from `previous_data`, the stored snapshot's data dict), and levels
+    are derived from XP. Returns (snapshots, errors): (timestamp, payload)
+    pairs in time order, and (index, message) for each unparseable datapoint.
+    """
+    config = get_config()
+    if skill_names is None:
+        skill_names = config.skills
+    DATA_KEY, _, OVERALL_KEY, _, OVERALL_LEVEL_KEY = config.keys
+    levelled_skills = [skill for skill in skill_names if skill != OVERALL_KEY]
+
+    previous_data = previous_data or {}
+    previous_xp = {skill: previous_data.get(skill, 0) or 0 for skill in skill_names}
+
+    snapshots = []
+    errors = []
+    data_points = (datapoints or {}).get(DATA_KEY, {})
+    for i, (timestamp_str, stats) in enumerate(sorted(data_points.items())):
+        stats_with_date = dict(stats)
+        stats_with_date["date"] = timestamp_str
+
+        for skill in skill_names:
+            xp = carry_forward(stats.get(skill), previous_xp.get(skill, 0))
+            previous_xp[skill] = xp
+            stats_with_date[skill] = xp
+
+        try:
+            dt = parse_datapoint_time(timestamp_str)
+        except ValueError as e:
+            errors.append((i, str(e)))
+            continue
+
+        # Add level fields for each skill and sum for overall
+        levels = xp_to_levels([stats_with_date[skill] for skill in levelled_skills])
+        for skill, level in zip(levelled_skills, levels):
+            stats_with_date[f"{skill}_level"] = level
+        stats_with_date[OVERALL_LEVEL_KEY] = sum(levels)
+
+        snapshots.append((dt, {DATA_KEY: stats_with_date}))
+    return snapshots, errors
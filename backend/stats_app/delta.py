@@ -0,0 +1,61 @@
+# stats_app/delta.py
+
+
+REMOVED_KEY = "__removed__"
+
+
+def diff_snapshot(previous, current):
+    """
+    Returns a sparse delta that turns `previous` into `current`. Nested dicts
+    are diffed recursively; keys that disappear are listed under REMOVED_KEY.
+    """
+    delta = {}
+    for key, value in current.items():
+        if key not in previous:
+            delta[key] = value
+            continue
+        prev_value = previous[key]
+        if isinstance(value, dict) and isinstance(prev_value, dict):
+            nested = diff_snapshot(prev_value, value)
+            if nested:
+                delta[key] = nested
+        elif value != prev_value or type(value) is not type(prev_value):
+            delta[key] = value
+
+    removed = [key for key in previous if key not in current]
+    if removed:
+        delta[REMOVED_KEY] = removed
+    return delta
+
+
+def apply_delta(base, delta):
+    """
+    Returns a new snapshot with `delta` applied to `base`. Unchanged nested
+    dicts are shared with `base`, so treat the result as read-only.
+    """
+    result = dict(base)
+    for key in delta.get(REMOVED_KEY, ()):
+        result.pop(key, None)
+    for key, value in delta.items():
+        if key == REMOVED_KEY:
+            continue
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = apply_delta(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def apply_delta_to_key(value, delta, path):
+    """
+    Applies `delta` to the single value at `path` (a tuple of keys), returning
+    the new value without rebuilding the rest of the snapshot.
+    """
+    node = delta
+    for key in path:
+        if not isinstance(node, dict) or key in node.get(REMOVED_KEY, ()):
+            return None
+        if key not in node:
+            return value
+        node = node[key]
+    return node
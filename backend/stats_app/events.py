@@ -0,0 +1,118 @@
+# stats_app/events.py
+
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.utils import timezone
+from .api_handler import get_player_stats_from_cache, refresh_projections
+from .gains import compute_gains, default_windows
+from .models import GroupMember, LeaderboardEvent, PlayerStatsCache
+from .utils import get_config
+
+PLAYER_UPDATE = "player_update"
+# Events older than this are pruned; clients further behind just miss them.
+EVENT_RETENTION = timedelta(hours=1)
+# How often a stream checks the log, and how long it stays silent before
+# sending a keep-alive comment.
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15.0
+# Streams end after this long; EventSource reconnects with Last-Event-ID.
+STREAM_DURATION = 300.0
+RECONNECT_MS = 3000
+
+
+def publish_player_update(member_id):
+    """Logs a player_update event with the member's gains and everyone's rank."""
+    data = build_player_update(member_id)
+    if data is None:
+        return None
+    event = LeaderboardEvent.objects.create(kind=PLAYER_UPDATE, data=data)
+    LeaderboardEvent.objects.filter(
+        created_at__lt=timezone.now() - EVENT_RETENTION
+    ).delete()
+    return event
+
+
+def build_player_update(member_id):
+    """
+    Returns the compact player_update payload: the player's new stats and
+    gains, shaped like their player_stats_api entry, plus the leaderboard
+    rank of every player, ranked as player_stats_api does.
+    """
+    skill_names = get_config().skills
+    players = list(GroupMember.objects.order_by("player_name"))
+    caches = (
+        PlayerStatsCache.objects.select_related("group_member")
+        .defer("data")
+        .in_bulk([p.id for p in players], field_name="group_member_id")
+    )
+    refresh_projections(caches.values())
+    stats = {
+        p.id: get_player_stats_from_cache(p.player_name, cache=caches[p.id])
+        for p in players
+        if p.id in caches
+    }
+    ranked = [p for p in players if stats.get(p.id)]
+    if not stats.get(member_id):
+        return None
+
+    gains = compute_gains([p.id for p in ranked], skill_names, default_windows())
+    ranked.sort(key=lambda p: gains[p.id]["week"][0], reverse=True)
+    member = next(p for p in ranked if p.id == member_id)
+    today, skill_gains_today = gains[member_id]["today"]
+    week, skill_gains_week = gains[member_id]["week"]
+    player = stats[member_id]
+    return {
+        "player_name": member.player_name,
+        "timestamp": player.timestamp,
+        "skills": {
+            k: {"rank": v.rank, "level": v.level, "xp": v.xp}
+            for k, v in player.skills.items()
+        },
+        "bosses": {k: {"killcount": v.killcount} for k, v in player.bosses.items()},
+        "xp_gained_today": today,
+        "top_skill_today": skill_gains_today[0][0] if skill_gains_today else None,
+        "skill_xp_gained_today": skill_gains_today,
+        "xp_gained_week": week,
+        "top_skill_week": skill_gains_week[0][0] if skill_gains_week else None,
+        "skill_xp_gained_week": skill_gains_week,
+        "ranks": {p.player_name: idx + 1 for idx, p in enumerate(ranked)},
+    }
+
+
+def latest_event_id():
+    return LeaderboardEvent.objects.aggregate(latest=Max("id"))["latest"] or 0
+
+
+def events_after(event_id, limit=100):
+    return list(LeaderboardEvent.objects.filter(id__gt=event_id).order_by("id")[:limit])
+
+
+def format_event(event):
+    data = json.dumps(event.data, cls=DjangoJSONEncoder)
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {data}\n\n"
+
+
+async def aevent_stream(last_id, duration=STREAM_DURATION):
+    """
+    Yields Server-Sent Events for log entries after `last_id`, for the async
+    events_api; waits without holding a thread.
+    """
+    yield f"retry: {RECONNECT_MS}\n\n"
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < duration:
+        events = await sync_to_async(events_after)(last_id)
+        for event in events:
+            yield format_event(event)
+            last_id = event.id
+        if events:
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= HEARTBEAT_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(POLL_INTERVAL)
@@ -0,0 +1,146 @@
+# stats_app/gains.py
+
+
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from django.db.models import JSONField, OuterRef, Subquery
+from django.utils import timezone
+from .models import DailyXPRollup, GroupMember, HourlyXPRollup
+from .rollups import utc_hour
+from .utils import get_config
+
+
+@dataclass(frozen=True)
+class GainWindow:
+    """A named, half-open [start, end) time range to measure gains over."""
+
+    name: str
+    start: datetime
+    end: datetime
+
+    @property
+    def is_day_aligned(self):
+        return _is_local_midnight(self.start) and _is_local_midnight(self.end)
+
+
+def local_midnight(day):
+    """Returns the aware datetime for the start of `day` in TIME_ZONE."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_window(name, days, now=None):
+    """The window covering today and the previous `days - 1` local days."""
+    today = timezone.localdate(now)
+    start = local_midnight(today - timedelta(days=days - 1))
+    end = local_midnight(today + timedelta(days=1))
+    return GainWindow(name=name, start=start, end=end)
+
+
+def default_windows(now=None):
+    """The windows shown on the leaderboard."""
+    return (day_window("today", 1, now=now), day_window("week", 7, now=now))
+
+
+def compute_gains(member_ids, skill_names, windows):
+    """
+    Returns {member_id: {window.name: (total_xp_gained, sorted_skill_xp_gained)}}
+    for every member and window. The number of queries depends only on the
+    number of windows, never on the number of members.
+    """
+    _, _, OVERALL_KEY, _, _ = get_config().keys
+    bounds = get_window_bounds(member_ids, skill_names, windows)
+
+    gains = {}
+    for member_id in member_ids:
+        gains[member_id] = {}
+        for window in windows:
+            first, last = bounds.get((member_id, window.name), ({}, {}))
+            skill_gains = {
+                skill: last.get(skill, 0) - first.get(skill, 0) for skill in skill_names
+            }
+            gains[member_id][window.name] = (
+                skill_gains.get(OVERALL_KEY, 0),
+                sort_skill_gains(skill_gains),
+            )
+    return gains
+
+
+def get_window_bounds(member_ids, skill_names, windows):
+    """
+    Returns {(member_id, window.name): (first_skill_xp, last_skill_xp)} with the
+    XP of the first and last snapshot each member has inside each window.
+    Members without snapshots in a window are omitted.
+
+    Day-aligned windows are answered from the daily rollups, others from the
+    hourly ones, so their edges are widened to whole hours. Each is two index
+    seeks per member, in one query per rollup table for all the windows.
+    """
+    member_ids = list(member_ids)
+    bounds = {}
+    if not member_ids:
+        return bounds
+
+    day_windows = [w for w in windows if w.is_day_aligned]
+    hour_windows = [w for w in windows if not w.is_day_aligned]
+    if day_windows:
+        ranges = {
+            w.name: (
+                timezone.localtime(w.start).date(),
+                timezone.localtime(w.end).date(),
+            )
+            for w in day_windows
+        }
+        bounds.update(_bounds_from_rollups(member_ids, DailyXPRollup, "date", ranges))
+    if hour_windows:
+        ranges = {w.name: (utc_hour(w.start), w.end) for w in hour_windows}
+        bounds.update(_bounds_from_rollups(member_ids, HourlyXPRollup, "hour", ranges))
+    return bounds
+
+
+def _bounds_from_rollups(member_ids, model, field, ranges):
+    """
+    Reads the first and last rollup row of each member inside each of
+    `ranges` ({window name: (start, end)}, on `field`) with correlated
+    subqueries, which the (group_member, `field`) unique index answers.
+    """
+    annotations = {}
+    for i, (start, end) in enumerate(ranges.values()):
+        rows = model.objects.filter(
+            group_member_id=OuterRef("pk"),
+            **{f"{field}__gte": start, f"{field}__lt": end},
+        )
+        annotations[f"first_{i}"] = Subquery(
+            rows.order_by(field).values("first_xp")[:1], output_field=JSONField()
+        )
+        annotations[f"last_{i}"] = Subquery(
+            rows.order_by(f"-{field}").values("last_xp")[:1], output_field=JSONField()
+        )
+    members = (
+        GroupMember.objects.filter(pk__in=member_ids)
+        .annotate(**annotations)
+        .values("pk", *annotations)
+    )
+
+    bounds = {}
+    for row in members:
+        for i, name in enumerate(ranges):
+            if row[f"first_{i}"] is not None:
+                bounds[(row["pk"], name)] = (row[f"first_{i}"], row[f"last_{i}"])
+    return bounds
+
+
+def sort_skill_gains(skill_gains):
+    """Sorts non-zero, non-overall skill gains from largest to smallest."""
+    return sorted(
+        (
+            (skill, xp)
+            for skill, xp in skill_gains.items()
+            if skill.lower() != "overall" and xp != 0
+        ),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+
+def _is_local_midnight(value):
+    return timezone.localtime(value).time() == time.min
@@ -0,0 +1,462 @@
+# stats_app/history.py
+
+
+from bisect import bisect_left
+from datetime import timedelta
+from operator import itemgetter
+from django.db import transaction
+from django.db.models import Q
+from .bosses import build_boss_samples, killcounts_before, rebuild_boss_samples
+from .delta import apply_delta, apply_delta_to_key, diff_snapshot
+from .models import (
+    BossSample,
+    DailyXPRollup,
+    GroupMember,
+    HourlyXPRollup,
+    PlayerHistory,
+    SkillSample,
+)
+from .response_cache import bump_generation
+from .rollups import merge_rollups, rebuild_rollups, update_rollups
+from .samples import build_skill_samples, rebuild_skill_samples
+from .utils import get_config
+
+
+def record_snapshot(member, timestamp, payload, skill_names=None):
+    """
+    Writes a PlayerHistory snapshot and keeps the derived rollup and sample
+    tables in step with it. All history writes should go through here.
+    """
+    with transaction.atomic():
+        _lock_member(member)
+        data, is_keyframe = _encode_for_storage(member, timestamp, payload)
+        history = PlayerHistory.objects.create(
+            group_member=member,
+            timestamp=timestamp,
+            data=data,
+            is_keyframe=is_keyframe,
+        )
+        update_rollups(member, timestamp, payload, skill_names=skill_names)
+        SkillSample.objects.bulk_create(build_skill_samples(member, timestamp, payload))
+        BossSample.objects.bulk_create(
+            build_boss_samples(
+                member, timestamp, payload, _latest_killcounts(member, timestamp)
+            )
+        )
+    return history
+
+
+def delete_history(member):
+    """Deletes a member's history together with everything derived from it."""
+    with transaction.atomic():
+        PlayerHistory.objects.filter(group_member=member).delete()
+        DailyXPRollup.objects.filter(group_member=member).delete()
+        HourlyXPRollup.objects.filter(group_member=member).delete()
+        SkillSample.objects.filter(group_member=member).delete()
+        BossSample.objects.filter(group_member=member).delete()
+
+
+def delete_snapshots(member, pks):
+    """
+    Deletes some of a member's snapshots by primary key. The rest of the
+    history, and everything derived from it, is rewritten so that no delta
+    loses its base. Returns the number deleted.
+    """
+    pks = set(pks)
+    with transaction.atomic():
+        _lock_member(member)
+        kept = []
+        deleted = 0
+        for row, snapshot in _rebuild(_history_rows(member)):
+            if row.pk in pks:
+                deleted += 1
+            else:
+                kept.append((row.timestamp, snapshot))
+        if deleted:
+            replace_history(member, kept)
+    return deleted
+
+
+def replace_history(member, snapshots, skill_names=None, batch_size=500):
+    """
+    Atomically replaces a member's history with `snapshots`, an iterable of
+    (timestamp, payload), writing the history, rollups and samples in bulk.
+    Returns the number of snapshots written.
+    """
+    config = get_config()
+    snapshots = sorted(snapshots, key=itemgetter(0))
+    encoded = _encode_series(
+        [payload for _, payload in snapshots],
+        config.history_storage,
+        config.keyframe_interval,
+    )
+    rows = [
+        PlayerHistory(
+            group_member=member, timestamp=timestamp, data=data, is_keyframe=keyframe
+        )
+        for (timestamp, _), (data, keyframe) in zip(snapshots, encoded)
+    ]
+
+    with transaction.atomic():
+        _lock_member(member)
+        delete_history(member)
+        PlayerHistory.objects.bulk_create(rows, batch_size=batch_size)
+        rebuild_rollups(member, snapshots, skill_names=skill_names)
+        rebuild_skill_samples(member, snapshots)
+        rebuild_boss_samples(member, snapshots)
+        # bulk_create sends no post_save signals, so invalidate explicitly.
+        transaction.on_commit(bump_generation)
+    return len(rows)
+
+
+def merge_history(member, snapshots, skill_names=None, batch_size=500, tolerance=None):
+    """
+    Adds `snapshots`, an iterable of (timestamp, payload), to a member's
+    history, skipping timestamps that are already stored, or within
+    `tolerance` (a timedelta) of a stored one. Snapshots that all come after
+    the latest stored one are appended in bulk; earlier ones are inserted,
+    re-encoding only the delta chains they land in. Returns the number added.
+    """
+    snapshots = sorted(snapshots, key=itemgetter(0))
+    if not snapshots:
+        return 0
+    tolerance = tolerance or timedelta(0)
+
+    with transaction.atomic():
+        _lock_member(member)
+        history = PlayerHistory.objects.filter(group_member=member)
+        stored = list(
+            history.filter(
+                timestamp__gte=snapshots[0][0] - tolerance,
+                timestamp__lte=snapshots[-1][0] + tolerance,
+            )
+            .order_by("timestamp")
+            .values_list("timestamp", flat=True)
+        )
+        new = []
+        for timestamp, payload in snapshots:
+            if new and new[-1][0] == timestamp:
+                continue
+            i = bisect_left(stored, timestamp - tolerance)
+            if i < len(stored) and stored[i] <= timestamp + tolerance:
+                continue
+            new.append((timestamp, payload))
+        if not new:
+            return 0
+
+        latest = (
+            history.order_by("-timestamp", "-id")
+            .values_list("timestamp", flat=True)
+            .first()
+        )
+        if latest is None or new[0][0] > latest:
+            _append_history(member, new, skill_names, batch_size)
+        else:
+            _insert_history(member, new, skill_names, batch_size)
+        # bulk_create sends no post_save signals, so invalidate explicitly.
+        transaction.on_commit(bump_generation)
+    return len(new)
+
+
+def iter_snapshots(member, start=None, end=None):
+    """
+    Yields (timestamp, payload) for each of a member's snapshots with
+    start <= timestamp <= end, oldest first, rebuilding deltas on the way.
+    """
+    for row, snapshot in _rebuild(_history_rows(member, start=start, end=end)):
+        if start is None or row.timestamp >= start:
+            yield row.timestamp, snapshot
+
+
+def snapshot_at(member, timestamp=None):
+    """
+    Returns the member's latest full snapshot at or before `timestamp` (or the
+    latest overall), or None.
+    """
+    snapshot = None
+    for _, snapshot in _rebuild(_history_rows(member, end=timestamp, latest=True)):
+        pass
+    return snapshot
+
+
+def latest_snapshot(member):
+    """Returns the member's most recent full snapshot, or None."""
+    return snapshot_at(member)
+
+
+def key_series(member, path, start=None, end=None):
+    """
+    Yields (timestamp, value) for the single value at `path` (a tuple of keys,
+    e.g. ("data", "Attack")) without rebuilding whole snapshots.
+    """
+    rows = _history_rows(member, start=start, end=end).values_list(
+        "timestamp", "is_keyframe", "data"
+    )
+    value = None
+    for timestamp, is_keyframe, data in rows.iterator(chunk_size=500):
+        if is_keyframe:
+            value = _lookup(data, path)
+        else:
+            value = apply_delta_to_key(value, data, path)
+        if start is None or timestamp >= start:
+            yield timestamp, value
+
+
+def reencode_history(member, storage=None, keyframe_interval=None):
+    """
+    Rewrites a member's history in the given storage mode ("full" or "delta").
+    Returns (keyframes, deltas) written.
+    """
+    config = get_config()
+    storage = storage or config.history_storage
+    keyframe_interval = keyframe_interval or config.keyframe_interval
+
+    rows = list(_rebuild(_history_rows(member)))
+    encoded = _encode_series(
+        [snapshot for _, snapshot in rows], storage, keyframe_interval
+    )
+    updates = []
+    for (row, _), (data, is_keyframe) in zip(rows, encoded):
+        row.data, row.is_keyframe = data, is_keyframe
+        updates.append(row)
+
+    with transaction.atomic():
+        PlayerHistory.objects.bulk_update(
+            updates, ["data", "is_keyframe"], batch_size=500
+        )
+    keyframes = sum(1 for row in updates if row.is_keyframe)
+    return keyframes, len(updates) - keyframes
+
+
+def _append_history(member, snapshots, skill_names, batch_size):
+    """Bulk-writes snapshots that all come after the member's latest one."""
+    config = get_config()
+    # Continue the delta chain from the latest stored snapshot.
+    rows = list(_rebuild(_history_rows(member, latest=True)))
+    previous = rows[-1][1] if rows else None
+    encoded = _encode_series(
+        [payload for _, payload in snapshots],
+        config.history_storage,
+        config.keyframe_interval,
+        previous=previous,
+        since_keyframe=len(rows) - 1,
+    )
+    PlayerHistory.objects.bulk_create(
+        [
+            PlayerHistory(
+                group_member=member,
+                timestamp=timestamp,
+                data=data,
+                is_keyframe=keyframe,
+            )
+            for (timestamp, _), (data, keyframe) in zip(snapshots, encoded)
+        ],
+        batch_size=batch_size,
+    )
+    merge_rollups(member, snapshots, skill_names=skill_names)
+
+    samples = []
+    boss_samples = []
+    killcounts = _latest_killcounts(member)
+    for timestamp, payload in snapshots:
+        samples.extend(build_skill_samples(member, timestamp, payload, config))
+        boss_samples.extend(
+            build_boss_samples(member, timestamp, payload, killcounts, config)
+        )
+    SkillSample.objects.bulk_create(samples, batch_size=batch_size)
+    BossSample.objects.bulk_create(boss_samples, batch_size=batch_size)
+
+
+def _insert_history(member, snapshots, skill_names, batch_size):
+    """
+    Bulk-writes snapshots that don't all come after the member's latest one.
+    Only the rows from the keyframe before the first new snapshot up to the
+    first keyframe after the last one are re-encoded; later chains start at
+    that keyframe and don't change.
+    """
+    config = get_config()
+    first, last = snapshots[0][0], snapshots[-1][0]
+    next_keyframe = (
+        PlayerHistory.objects.filter(
+            group_member=member, is_keyframe=True, timestamp__gt=last
+        )
+        .order_by("timestamp", "id")
+        .first()
+    )
+
+    merged = []
+    for row, snapshot in _rebuild(_history_rows(member, start=first)):
+        if next_keyframe is not None and row.pk == next_keyframe.pk:
+            break
+        merged.append((row.timestamp, snapshot, row))
+    merged.extend((timestamp, payload, None) for timestamp, payload in snapshots)
+    merged.sort(key=itemgetter(0))
+
+    encoded = _encode_series(
+        [snapshot for _, snapshot, _ in merged],
+        config.history_storage,
+        config.keyframe_interval,
+    )
+    created = []
+    updated = []
+    for (timestamp, _, row), (data, is_keyframe) in zip(merged, encoded):
+        if row is None:
+            created.append(
+                PlayerHistory(
+                    group_member=member,
+                    timestamp=timestamp,
+                    data=data,
+                    is_keyframe=is_keyframe,
+                )
+            )
+        elif row.is_keyframe != is_keyframe or row.data != data:
+            row.data, row.is_keyframe = data, is_keyframe
+            updated.append(row)
+    PlayerHistory.objects.bulk_update(
+        updated, ["data", "is_keyframe"], batch_size=batch_size
+    )
+    PlayerHistory.objects.bulk_create(created, batch_size=batch_size)
+    merge_rollups(member, snapshots, skill_names=skill_names)
+
+    samples = []
+    for timestamp, payload in snapshots:
+        samples.extend(build_skill_samples(member, timestamp, payload, config))
+    SkillSample.objects.bulk_create(samples, batch_size=batch_size)
+
+    # Boss samples only record changes, so redo them from the first new
+    # snapshot through the keyframe that ends the re-encoded range.
+    rebuilt = [(ts, snapshot) for ts, snapshot, _ in merged if ts >= first]
+    boss_samples = BossSample.objects.filter(group_member=member, timestamp__gte=first)
+    if next_keyframe is not None:
+        rebuilt.append((next_keyframe.timestamp, next_keyframe.data))
+        boss_samples = boss_samples.filter(timestamp__lte=next_keyframe.timestamp)
+    boss_samples.delete()
+    killcounts = _latest_killcounts(member, first)
+    BossSample.objects.bulk_create(
+        [
+            sample
+            for timestamp, payload in rebuilt
+            for sample in build_boss_samples(
+                member, timestamp, payload, killcounts, config
+            )
+        ],
+        batch_size=batch_size,
+    )
+
+
+def _latest_killcounts(member, before=None):
+    """{boss: killcount} of the member's boss samples before `before`."""
+    killcounts = killcounts_before([member.id], get_config().bosses, before)
+    return {boss: killcount for (_, boss), killcount in killcounts.items()}
+
+
+def _encode_series(
+    snapshots, storage, keyframe_interval, previous=None, since_keyframe=0
+):
+    """
+    Yields (data, is_keyframe) for consecutive full snapshots, oldest first.
+    `previous` and `since_keyframe` continue an existing chain.
+    """
+    for snapshot in snapshots:
+        since_keyframe += 1
+        if (
+            storage != "delta"
+            or previous is None
+            or since_keyframe >= keyframe_interval
+        ):
+            yield snapshot, True
+            since_keyframe = 0
+        else:
+            yield diff_snapshot(previous, snapshot), False
+        previous = snapshot
+
+
+def _encode_for_storage(member, timestamp, payload):
+    """Returns (data, is_keyframe) for a new snapshot in the configured mode."""
+    config = get_config()
+    if config.history_storage != "delta":
+        return payload, True
+
+    later = (
+        PlayerHistory.objects.filter(group_member=member, timestamp__gt=timestamp)
+        .order_by("timestamp", "id")
+        .first()
+    )
+    if later is not None:
+        # Inserting before existing rows would change the base of the next
+        # delta, so make that row self-contained and store this one in full.
+        if not later.is_keyframe:
+            _promote_to_keyframe(member, later)
+        return payload, True
+
+    rows = list(_history_rows(member, end=timestamp, latest=True))
+    if not rows or len(rows) >= config.keyframe_interval:
+        return payload, True
+    previous = None
+    for _, previous in _rebuild(rows):
+        pass
+    return diff_snapshot(previous, payload), False
+
+
+def _lock_member(member):
+    """
+    Locks the member's row until the surrounding transaction ends, so history
+    writers for one member (refresh_cache, run_scheduler, imports) run one at
+    a time and never encode deltas against the same base row.
+    """
+    GroupMember.objects.select_for_update().only("pk").get(pk=member.pk)
+
+
+def _promote_to_keyframe(member, target):
+    rows = _history_rows(member, end=target.timestamp, latest=True)
+    for row, snapshot in _rebuild(rows):
+        if row.pk == target.pk:
+            row.data = snapshot
+            row.is_keyframe = True
+            row.save(update_fields=["data", "is_keyframe"])
+            return
+
+
+def _history_rows(member, start=None, end=None, latest=False):
+    """
+    A member's rows up to `end` in storage order, starting at the keyframe
+    needed to rebuild them: the last one at or before `start`, or with
+    `latest` the last one at or before `end`. Otherwise starts at the first row.
+    """
+    history = PlayerHistory.objects.filter(group_member=member)
+    if end is not None:
+        history = history.filter(timestamp__lte=end)
+
+    anchor = start if start is not None else (end if latest else None)
+    if anchor is not None or latest:
+        keyframes = history.filter(is_keyframe=True)
+        if anchor is not None:
+            keyframes = keyframes.filter(timestamp__lte=anchor)
+        keyframe = (
+            keyframes.order_by("-timestamp", "-id").values("timestamp", "id").first()
+        )
+        if keyframe is not None:
+            history = history.filter(
+                Q(timestamp__gt=keyframe["timestamp"])
+                | Q(timestamp=keyframe["timestamp"], id__gte=keyframe["id"])
+            )
+    return history.order_by("timestamp", "id")
+
+
+def _rebuild(rows):
+    """Yields (row, full_snapshot) for rows that start at a keyframe."""
+    snapshot = None
+    for row in rows.iterator(chunk_size=500) if hasattr(rows, "iterator") else rows:
+        if row.is_keyframe or snapshot is None:
+            snapshot = row.data
+        else:
+            snapshot = apply_delta(snapshot, row.data)
+        yield row, snapshot
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
@@ -0,0 +1,206 @@
+# stats_app/management/commands/backfill_history.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
+from requests.exceptions import RequestException
+from stats_app.datapoints import parse_datapoint_time, parse_datapoints
+from stats_app.history import merge_history, snapshot_at
+from stats_app.models import BackfillCheckpoint, GroupMember, PlayerHistory
+from stats_app.ratelimit import RateLimitExceeded, get_upstream_limiter
+from stats_app.upstream import get_client
+from stats_app.utils import get_config
+from stats_app.profiling import ProfiledCommand
+
+# Re-fetch this much before the last synced datapoint, in case Temple
+# recorded late points; already stored timestamps are skipped on merge.
+OVERLAP_SECONDS = 60 * 60
+# Refreshes stamp history with our clock and Temple stamps datapoints with
+# its own, so a datapoint this close to a stored snapshot is the same one.
+DUPLICATE_TOLERANCE = timedelta(minutes=5)
+# Temple's "all time" window for player_datapoints.
+ALL_TIME_SECONDS = 10000000000
+
+
+def backfill_member(member_id, full, rate_limit_timeout):
+    """
+    Fetches and merges one member's missing datapoints, updating its
+    checkpoint. Returns the checkpoint. Runs in a worker thread.
+    """
+    try:
+        member = GroupMember.objects.get(pk=member_id)
+        checkpoint, _ = BackfillCheckpoint.objects.get_or_create(group_member=member)
+        try:
+            added, synced_until = fetch_and_merge(
+                member, checkpoint, full, rate_limit_timeout
+            )
+        except (RequestException, RateLimitExceeded, ValueError) as e:
+            checkpoint.status = BackfillCheckpoint.FAILED
+            checkpoint.error = repr(e)
+        else:
+            checkpoint.status = BackfillCheckpoint.DONE
+            checkpoint.error = ""
+            checkpoint.synced_until = synced_until
+            checkpoint.datapoints_added = added
+        checkpoint.save()
+        return checkpoint
+    finally:
+        # Worker threads get their own connections; don't leak them.
+        connections.close_all()
+
+
+def fetch_and_merge(member, checkpoint, full, rate_limit_timeout):
+    """Returns (datapoints added, newest timestamp now stored)."""
+    stored_until = PlayerHistory.objects.filter(group_member=member).aggregate(
+        latest=Max("timestamp")
+    )["latest"]
+    since = (
+        None
+        if full
+        else max(filter(None, [checkpoint.synced_until, stored_until]), default=None)
+    )
+
+    seconds = ALL_TIME_SECONDS
+    if since is not None:
+        seconds = (timezone.now() - since).total_seconds() + OVERLAP_SECONDS
+    datapoints = get_client().player_datapoints(
+        member.player_name, seconds=seconds, rate_limit_timeout=rate_limit_timeout
+    )
+    if isinstance(datapoints, dict) and "error" in datapoints:
+        raise ValueError(f"API error: {datapoints['error']}")
+
+    DATA_KEY = get_config().keys[0]
+    first = min((datapoints or {}).get(DATA_KEY) or {}, default=None)
+    previous = None
+    if first is not None:
+        # Carry values forward from what was stored just before this batch.
+        previous = snapshot_at(member, parse_datapoint_time(first))
+    snapshots, _ = parse_datapoints(
+        datapoints, previous_data=(previous or {}).get(DATA_KEY)
+    )
+
+    added = merge_history(member, snapshots, tolerance=DUPLICATE_TOLERANCE)
+    newest = snapshots[-1][0] if snapshots else None
+    return added, max(filter(None, [newest, since, stored_until]), default=None)
+
+
+class Command(ProfiledCommand):
+    help = (
+        "Backfills PlayerHistory from TempleOSRS for many members at once, "
+        "fetching only datapoints newer than what is stored and merging them "
+        "in. An interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "player_names",
+            nargs="*",
+            type=str,
+            help="RSNs to backfill (defaults to every group member)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of members to backfill concurrently (default 4)",
+        )
+        parser.add_argument(
+            "--rate-limit-wait",
+            type=float,
+            default=60,
+            help="Seconds each upstream call may wait for rate-limit budget",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Fetch all-time datapoints instead of only newer ones",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start a new run even if the previous one did not finish",
+        )
+
+    def handle(self, *args, **options):
+        members = GroupMember.objects.all()
+        if options["player_names"]:
+            members = members.filter(player_name__in=options["player_names"])
+            missing = set(options["player_names"]) - set(
+                members.values_list("player_name", flat=True)
+            )
+            if missing:
+                raise CommandError(f"Unknown players: {', '.join(sorted(missing))}")
+        member_ids = list(members.values_list("id", flat=True))
+
+        finished = set(
+            BackfillCheckpoint.objects.filter(
+                group_member_id__in=member_ids, status=BackfillCheckpoint.DONE
+            ).values_list("group_member_id", flat=True)
+        )
+        if options["restart"] or len(finished) in (0, len(member_ids)):
+            # Nothing left over from an interrupted run: start a new one.
+            BackfillCheckpoint.objects.filter(group_member_id__in=member_ids).update(
+                status=BackfillCheckpoint.PENDING
+            )
+            pending = member_ids
+        else:
+            pending = [pk for pk in member_ids if pk not in finished]
+            self.stdout.write(
+                f"Resuming previous run: {len(finished)} of {len(member_ids)} "
+                "members already done."
+            )
+
+        workers = max(1, options["workers"])
+        self.stdout.write(
+            f"Backfilling {len(pending)} members with {workers} worker(s)..."
+        )
+        started = time.monotonic()
+        added = 0
+        failed = 0
+        names = dict(members.values_list("id", "player_name"))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    backfill_member,
+                    member_id,
+                    options["full"],
+                    options["rate_limit_wait"],
+                ): member_id
+                for member_id in pending
+            }
+            for future in as_completed(futures):
+                name = names[futures[future]]
+                error = future.exception()
+                if error is not None:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"{name}: failed ({error!r})."))
+                    continue
+                checkpoint = future.result()
+                if checkpoint.status == BackfillCheckpoint.DONE:
+                    added += checkpoint.datapoints_added
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"{name}: added {checkpoint.datapoints_added} datapoints."
+                        )
+                    )
+                else:
+                    failed += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"{name}: failed ({checkpoint.error}).")
+                    )
+
+        self.stdout.write(
+            f"Upstream calls left this minute: {get_upstream_limiter().remaining()}"
+        )
+        summary = (
+            f"Backfill finished in {time.monotonic() - started:.2f}s: "
+            f"{added} datapoints added, {failed} of {len(pending)} members failed."
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(summary + " Run again to retry them."))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,39 @@
+# stats_app/management/commands/backfill_samples.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from stats_app.bosses import rebuild_boss_samples
+from stats_app.history import iter_snapshots
+from stats_app.models import GroupMember
+from stats_app.samples import rebuild_skill_samples
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the per-skill SkillSample and per-boss BossSample series "
+        "from existing PlayerHistory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "player_names",
+            nargs="*",
+            type=str,
+            help="RSNs to rebuild (defaults to every group member)",
+        )
+
+    def handle(self, *args, **options):
+        members = GroupMember.objects.all()
+        if options["player_names"]:
+            members = members.filter(player_name__in=options["player_names"])
+
+        for member in members:
+            with transaction.atomic():
+                count = rebuild_skill_samples(member, iter_snapshots(member))
+                boss_count = rebuild_boss_samples(member, iter_snapshots(member))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Rebuilt {count} skill samples and {boss_count} boss samples "
+                    f"for {member.player_name}."
+                )
+            )
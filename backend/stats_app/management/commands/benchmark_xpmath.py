@@ -0,0 +1,86 @@
+# stats_app/management/commands/benchmark_xpmath.py
+
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from stats_app.xpmath import MAX_XP, xp_to_levels, xp_to_virtual_level
+
+
+def legacy_xp_to_level(xp):
+    """The per-call loop replace_player_history used before xpmath."""
+    lvl_xp = 0
+    for level in range(1, 127):  # 126 is max
+        lvl_xp += int((level + 300 * 2 ** (level / 7)) // 4)
+        if lvl_xp > xp:
+            return level
+    return 126
+
+
+def reference_xp_to_level(xp):
+    """A linear scan over the exact XP curve, for checking results."""
+    points = 0
+    for level in range(1, 126):
+        points += int(level + 300 * 2 ** (level / 7))
+        if points // 4 > xp:
+            return level
+    return 126
+
+
+class Command(BaseCommand):
+    help = "Compares xpmath's XP-to-level conversion with the old per-call loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=100_000,
+            help="Number of random XP values to convert (default 100000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per implementation; the fastest is reported (default 3)",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        xps = [rng.randint(0, MAX_XP) for _ in range(options["samples"])]
+        repeat = max(1, options["repeat"])
+
+        implementations = [
+            ("legacy loop", lambda: [legacy_xp_to_level(xp) for xp in xps]),
+            ("xpmath scalar", lambda: [xp_to_virtual_level(xp) for xp in xps]),
+            ("xpmath batched", lambda: xp_to_levels(xps, virtual=True)),
+        ]
+        results = {}
+        timings = {}
+        for name, run in implementations:
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                results[name] = run()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+
+        expected = [reference_xp_to_level(xp) for xp in xps]
+        for name in ("xpmath scalar", "xpmath batched"):
+            if results[name] != expected:
+                raise CommandError(f"{name} disagrees with the reference curve.")
+        legacy_off = sum(
+            1 for got, want in zip(results["legacy loop"], expected) if got != want
+        )
+
+        baseline = timings["legacy loop"]
+        self.stdout.write(f"Converted {len(xps)} XP values, best of {repeat}:")
+        for name, seconds in timings.items():
+            self.stdout.write(
+                f"  {name:<15} {seconds * 1000:9.1f} ms  "
+                f"({baseline / seconds if seconds else float('inf'):.0f}x)"
+            )
+        self.stdout.write(
+            f"The legacy loop's rounding misplaced {legacy_off} of {len(xps)} values."
+        )
+        self.stdout.write(self.style.SUCCESS("xpmath matches the reference curve."))
@@ -0,0 +1,52 @@
+# stats_app/management/commands/compact_history.py
+
+from django.core.management.base import BaseCommand
+from stats_app.history import reencode_history
+from stats_app.models import GroupMember
+from stats_app.utils import HISTORY_STORAGE_MODES, get_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites existing PlayerHistory as keyframes plus sparse deltas "
+        "(or back to full snapshots with --storage full)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "player_names",
+            nargs="*",
+            type=str,
+            help="RSNs to convert (defaults to every group member)",
+        )
+        parser.add_argument(
+            "--storage",
+            choices=HISTORY_STORAGE_MODES,
+            default=None,
+            help="Storage mode to convert to (defaults to config.json)",
+        )
+        parser.add_argument(
+            "--keyframe-interval",
+            type=int,
+            default=None,
+            help="Rows between keyframes (defaults to config.json)",
+        )
+
+    def handle(self, *args, **options):
+        members = GroupMember.objects.all()
+        if options["player_names"]:
+            members = members.filter(player_name__in=options["player_names"])
+
+        storage = options["storage"] or get_config().history_storage
+        for member in members:
+            keyframes, deltas = reencode_history(
+                member,
+                storage=storage,
+                keyframe_interval=options["keyframe_interval"],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Stored {member.player_name} history as {storage}: "
+                    f"{keyframes} keyframes, {deltas} deltas."
+                )
+            )
@@ -0,0 +1,76 @@
+# stats_app/management/commands/profiles.py
+
+import os
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from stats_app.profiling import (
+    list_profiles,
+    make_profile_token,
+    profile_dir,
+    summarize_profile,
+)
+
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls")
+
+
+class Command(BaseCommand):
+    help = (
+        "Lists saved profiles, summarizes one (the top functions by cumulative "
+        "time by default), or prints a token that enables request profiling."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "name",
+            nargs="?",
+            help="Profile to summarize; `latest` for the newest one",
+        )
+        parser.add_argument("--sort", choices=SORT_KEYS, default="cumulative")
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=25,
+            help="Number of functions to show (default 25)",
+        )
+        parser.add_argument(
+            "--token",
+            action="store_true",
+            help="Print a profiling token for the `profile` query parameter "
+            "or X-Profile-Token header",
+        )
+
+    def handle(self, *args, **options):
+        if options["token"]:
+            self.stdout.write(make_profile_token())
+            self.stdout.write(
+                f"Valid for {settings.PROFILE_TOKEN_MAX_AGE} seconds, e.g. "
+                "/api/player_stats/?profile=<token>"
+            )
+            return
+
+        names = list_profiles()
+        name = options["name"]
+        if name is None:
+            if not names:
+                self.stdout.write(f"No profiles in {profile_dir()}.")
+                return
+            self.stdout.write(f"{len(names)} profile(s) in {profile_dir()}:")
+            for name in names:
+                stat = os.stat(os.path.join(profile_dir(), name))
+                modified = datetime.fromtimestamp(stat.st_mtime)
+                self.stdout.write(
+                    f"  {name}  {stat.st_size / 1024:.0f} KB  {modified:%Y-%m-%d %H:%M:%S}"
+                )
+            return
+
+        if name == "latest":
+            if not names:
+                raise CommandError("There are no saved profiles.")
+            name = names[0]
+        try:
+            summary = summarize_profile(name, options["sort"], options["limit"])
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"{name}:")
+        self.stdout.write(summary)
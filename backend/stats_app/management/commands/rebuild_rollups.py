@@ -0,0 +1,38 @@
+# stats_app/management/commands/rebuild_rollups.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from stats_app.history import iter_snapshots
+from stats_app.models import GroupMember
+from stats_app.rollups import rebuild_rollups
+from stats_app.utils import get_config
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily and hourly XP rollups from existing PlayerHistory."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "player_names",
+            nargs="*",
+            type=str,
+            help="RSNs to rebuild (defaults to every group member)",
+        )
+
+    def handle(self, *args, **options):
+        members = GroupMember.objects.all()
+        if options["player_names"]:
+            members = members.filter(player_name__in=options["player_names"])
+
+        skill_names = get_config().skills
+        for member in members:
+            with transaction.atomic():
+                daily, hourly = rebuild_rollups(
+                    member, iter_snapshots(member), skill_names=skill_names
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Rebuilt {daily} daily and {hourly} hourly rollups "
+                    f"for {member.player_name}."
+                )
+            )
@@ -1,38 +1,171 @@
 # stats_app/management/commands/refresh_cache.py
 
-from django.core.management.base import BaseCommand
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.core.cache import cache
+from django.db import connections
 from stats_app.models import GroupMember
 from stats_app.api_handler import refresh_player_cache
+from stats_app.ratelimit import get_upstream_limiter
+from stats_app.profiling import ProfiledCommand
+from stats_app.utils import get_config
 
+RUN_LOCK_KEY = "stats_app:refresh_cache:lock"
+DEFAULT_LOCK_TIMEOUT = 60 * 60
+# Long enough for a full minute's budget to return, so one run refreshes
+# every member instead of only those the current budget covers.
+DEFAULT_RATE_LIMIT_WAIT = 60
 
-class Command(BaseCommand):
+
+def refresh_and_time(player_name, rate_limit_timeout, deadline=None):
+    """Runs one refresh in a worker thread, returning (success, seconds)."""
+    started = time.monotonic()
+    try:
+        success = refresh_player_cache(
+            player_name, rate_limit_timeout, deadline=deadline
+        )
+        return success, time.monotonic() - started
+    finally:
+        # Worker threads get their own connections; don't leak them.
+        connections.close_all()
+
+
+class Command(ProfiledCommand):
     help = "Refreshes the player stats cache from the API."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of players to refresh concurrently (default 1)",
+        )
+        parser.add_argument(
+            "--deadline",
+            type=float,
+            default=None,
+            help=(
+                "Finish within about this many seconds: no refresh starts "
+                "after it, and upstream calls still running are cut short"
+            ),
+        )
+        parser.add_argument(
+            "--rate-limit-wait",
+            type=float,
+            default=DEFAULT_RATE_LIMIT_WAIT,
+            help=(
+                "Seconds each refresh may wait for rate-limit budget "
+                f"(default {DEFAULT_RATE_LIMIT_WAIT})"
+            ),
+        )
+
     def handle(self, *args, **kwargs):
+        workers = max(1, kwargs["workers"])
+        deadline = kwargs["deadline"]
+
+        # Skip this run if the previous one is still going. At the deadline
+        # in-flight calls are cut short, but a socket read already under way
+        # can still take up to the upstream timeouts, then the save.
+        lock_timeout = DEFAULT_LOCK_TIMEOUT
+        if deadline:
+            upstream = get_config().upstream
+            lock_timeout = int(
+                deadline + upstream["connect_timeout"] + upstream["read_timeout"] + 60
+            )
+        if not cache.add(RUN_LOCK_KEY, True, timeout=lock_timeout):
+            self.stdout.write(
+                self.style.WARNING("Another cache refresh is still running; skipping.")
+            )
+            return
+
+        try:
+            self.refresh_all(workers, deadline, kwargs["rate_limit_wait"])
+        finally:
+            cache.delete(RUN_LOCK_KEY)
+
+    def refresh_all(self, workers, deadline, rate_limit_wait):
         self.stdout.write("Starting cache refresh process...")
-        players = GroupMember.objects.all()
-        self.stdout.write(f"Found {len(players)} players to update.")
+        players = list(GroupMember.objects.values_list("player_name", flat=True))
+        self.stdout.write(
+            f"Found {len(players)} players to update with {workers} worker(s)."
+        )
 
+        started = time.monotonic()
+        timings = {}
         success_count = 0
         fail_count = 0
+        pending_players = list(players)
 
-        for player in players:
-            self.stdout.write(f"Refreshing stats for {player.player_name}...")
-            if refresh_player_cache(player.player_name):
-                self.stdout.write(
-                    self.style.SUCCESS(f"Successfully updated {player.player_name}.")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            while pending_players or running:
+                out_of_time = (
+                    deadline is not None and time.monotonic() - started >= deadline
                 )
-                success_count += 1
-            else:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Failed to update {player.player_name} (rate-limited or error)."
+                while pending_players and len(running) < workers and not out_of_time:
+                    player_name = pending_players.pop(0)
+                    self.stdout.write(f"Refreshing stats for {player_name}...")
+                    future = executor.submit(
+                        refresh_and_time,
+                        player_name,
+                        rate_limit_wait,
+                        None if deadline is None else started + deadline,
                     )
-                )
-                fail_count += 1
+                    running[future] = player_name
+                if not running:
+                    break
+
+                timeout = None
+                if deadline is not None and not out_of_time:
+                    timeout = max(0.0, deadline - (time.monotonic() - started))
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    player_name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        self.stdout.write(
+                            self.style.ERROR(
+                                f"Failed to update {player_name}: {error!r}"
+                            )
+                        )
+                        fail_count += 1
+                        continue
+                    success, seconds = future.result()
+                    timings[player_name] = seconds
+                    if success:
+                        self.stdout.write(
+                            self.style.SUCCESS(
+                                f"Successfully updated {player_name} ({seconds:.2f}s)."
+                            )
+                        )
+                        success_count += 1
+                    else:
+                        self.stdout.write(
+                            self.style.WARNING(
+                                f"Failed to update {player_name} "
+                                f"(rate-limited or error, {seconds:.2f}s)."
+                            )
+                        )
+                        fail_count += 1
 
+        for player_name in pending_players:
+            self.stdout.write(
+                self.style.WARNING(f"Skipped {player_name}: deadline reached.")
+            )
+
+        self.stdout.write("Per-player timings:")
+        for player_name, seconds in sorted(
+            timings.items(), key=lambda item: item[1], reverse=True
+        ):
+            self.stdout.write(f"  {player_name}: {seconds:.2f}s")
+
+        self.stdout.write(
+            f"Upstream calls left this minute: {get_upstream_limiter().remaining()}"
+        )
         self.stdout.write(
             self.style.SUCCESS(
-                f"Cache refresh process completed. Success: {success_count}, Failed: {fail_count}"
+                f"Cache refresh process completed in "
+                f"{time.monotonic() - started:.2f}s. Success: {success_count}, "
+                f"Failed: {fail_count}, Skipped: {len(pending_players)}"
             )
         )
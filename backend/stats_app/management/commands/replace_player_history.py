@@ -1,20 +1,18 @@
-from django.core.management.base import BaseCommand
-from stats_app.models import GroupMember, PlayerHistory
-from stats_app.utils import load_config, carry_forward
-import requests
-from datetime import datetime, timezone
+import time
+from stats_app.models import GroupMember
+from stats_app.history import replace_history
+from stats_app.utils import get_config
+from stats_app.ratelimit import RateLimitExceeded
+from stats_app.upstream import get_client
+from stats_app.datapoints import parse_datapoints
+from stats_app.profiling import ProfiledCommand
+from requests.exceptions import RequestException
 
+# Seconds to wait for rate-limit budget before giving up.
+RATE_LIMIT_WAIT = 60
 
-def xp_to_level(xp):
-    lvl_xp = 0
-    for level in range(1, 127):  # 126 is max
-        lvl_xp += int((level + 300 * 2 ** (level / 7)) // 4)
-        if lvl_xp > xp:
-            return level
-    return 126
 
-
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = "Replace PlayerHistory for a player by fetching all datapoints from TempleOSRS (up to 200 datapoints)"
 
     def add_arguments(self, parser):
@@ -30,18 +28,23 @@ class Command(BaseCommand):
             )
             return
 
-        config = load_config()
-        skill_names = config.get("skills", [])
+        skill_names = get_config().skills
 
         # 1. Get all datapoints (up to 200) for the player
-        datapoints_url = f"https://templeosrs.com/api/player_datapoints.php?player={player_name}&time=10000000000"
-        resp = requests.get(datapoints_url)
-        if not resp.ok:
+        try:
+            datapoints = get_client().player_datapoints(
+                player_name, rate_limit_timeout=RATE_LIMIT_WAIT
+            )
+        except RateLimitExceeded:
+            self.stdout.write(
+                self.style.ERROR("Rate limit reached; try again in a minute.")
+            )
+            return
+        except RequestException:
             self.stdout.write(
                 self.style.ERROR("Failed to fetch datapoints from TempleOSRS.")
             )
             return
-        datapoints = resp.json()
 
         if isinstance(datapoints, dict) and "error" in datapoints:
             self.stdout.write(self.style.ERROR(f"API error: {datapoints['error']}"))
@@ -52,56 +55,20 @@ class Command(BaseCommand):
             )
             return
 
-        # 2. Delete existing PlayerHistory for this player
-        PlayerHistory.objects.filter(group_member=member).delete()
-        self.stdout.write(
-            self.style.SUCCESS(f"Deleted existing PlayerHistory for {player_name}.")
-        )
-
-        # 3. Create new PlayerHistory entries from datapoints
-        created_count = 0
-        data_points = datapoints.get("data", {})
-
-        # Carry forward previous values for missing skills
-        previous_xp = {skill: 0 for skill in skill_names}
-
-        for i, (timestamp_str, stats) in enumerate(sorted(data_points.items())):
-            stats_with_date = dict(stats)
-            stats_with_date["date"] = timestamp_str
-
-            for skill in skill_names:
-                xp = carry_forward(stats.get(skill), previous_xp.get(skill, 0))
-                previous_xp[skill] = xp
-                stats_with_date[skill] = xp
-
-            try:
-                dt = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S").replace(
-                    tzinfo=timezone.utc
-                )
-
-                # Add level fields for each skill and sum for overall
-                overall_level = 0
-                for skill in skill_names:
-                    if skill.lower() == "overall":
-                        continue  # Skip the "Overall" skill
-                    xp = stats_with_date.get(skill, 0)
-                    level = xp_to_level(xp)
-                    stats_with_date[f"{skill}_level"] = level
-                    overall_level += level
-                stats_with_date["Overall_level"] = overall_level
+        # 2. Build the new snapshots in memory
+        started = time.monotonic()
+        snapshots, errors = parse_datapoints(datapoints, skill_names=skill_names)
+        for i, error in errors:
+            self.stdout.write(
+                self.style.WARNING(f"Failed to process datapoint {i + 1}: {error}")
+            )
 
-                PlayerHistory.objects.create(
-                    group_member=member, timestamp=dt, data={"data": stats_with_date}
-                )
-                created_count += 1
-                self.stdout.write(f"Added datapoint {i + 1}/{len(data_points)} ({dt})")
-            except Exception as e:
-                self.stdout.write(
-                    self.style.WARNING(f"Failed to process datapoint {i + 1}: {e}")
-                )
+        # 3. Swap the old history for the new one in a single transaction
+        created_count = replace_history(member, snapshots, skill_names=skill_names)
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Created {created_count} PlayerHistory entries for {player_name}."
+                f"Replaced PlayerHistory for {player_name} with {created_count} "
+                f"entries in {time.monotonic() - started:.2f}s."
             )
         )
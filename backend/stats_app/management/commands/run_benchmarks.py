@@ -0,0 +1,115 @@
+# stats_app/management/commands/run_benchmarks.py
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from stats_app.benchmarks.generator import generate_group
+from stats_app.benchmarks.runner import (
+    BENCHMARK_CACHES,
+    DEFAULT_BASELINE,
+    SCALES,
+    SNAPSHOT_INTERVAL,
+    find_regressions,
+    load_baseline,
+    run_suite,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the stats and history endpoints, refresh and import on a "
+        "synthetic group in a throwaway test database, and fails if latency, "
+        "query count or peak memory regress past the baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=sorted(SCALES),
+            default="small",
+            help="Size of the generated group (default small)",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per benchmark; the median is reported (default 5)",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=DEFAULT_BASELINE,
+            help="Baseline JSON file to compare against",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed latency/memory growth as a fraction (default 0.5)",
+        )
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Record these results as the new baseline for this scale",
+        )
+
+    def handle(self, *args, **options):
+        scale = options["scale"]
+        members, snapshots = SCALES[scale]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                results = self.run_benchmarks(
+                    members, snapshots, options["seed"], options["repeat"]
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'benchmark':<26}{'median':>12}{'queries':>10}{'peak':>12}")
+        for result in results:
+            self.stdout.write(
+                f"{result.name:<26}{result.latency_ms:>10.1f}ms"
+                f"{result.queries:>10}{result.peak_kb:>10.0f}KB"
+            )
+
+        baseline = load_baseline(options["baseline"])
+        if options["update_baseline"]:
+            save_baseline(options["baseline"], baseline, scale, results)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Saved the {scale} baseline to {options['baseline']}."
+                )
+            )
+            return
+        if scale not in baseline:
+            self.stdout.write(
+                self.style.WARNING(f"No {scale} baseline to compare against.")
+            )
+            return
+
+        regressions = find_regressions(results, baseline[scale], options["tolerance"])
+        if regressions:
+            raise CommandError("Benchmarks regressed:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def run_benchmarks(self, members, snapshots, seed, repeat):
+        started = time.monotonic()
+        group = generate_group(
+            members, snapshots, seed=seed, interval=SNAPSHOT_INTERVAL
+        )
+        self.stdout.write(
+            f"Generated {members} members x {snapshots} snapshots "
+            f"in {time.monotonic() - started:.1f}s."
+        )
+        return run_suite(group, snapshots, seed, repeat)
@@ -0,0 +1,154 @@
+# stats_app/management/commands/run_scheduler.py
+
+import heapq
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from stats_app.api_handler import CALLS_PER_REFRESH, refresh_player_cache
+from stats_app.models import RefreshSchedule
+from stats_app.ratelimit import get_upstream_limiter
+from stats_app.scheduler import (
+    current_overall_xp,
+    ensure_schedules,
+    pick_early_refresh,
+    record_refresh,
+)
+
+# Seconds each upstream call may wait for budget during a refresh.
+RATE_LIMIT_WAIT = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the adaptive refresh scheduler: refreshes members as they fall "
+        "due, sooner for members gaining XP quickly, within the API rate limit. "
+        "Budget left over while nobody is due goes to early refreshes of the "
+        "fastest gainers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Refresh every member that is due now, then exit",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=30,
+            help="Maximum seconds to sleep between checks (default 30)",
+        )
+        parser.add_argument(
+            "--resync-interval",
+            type=float,
+            default=300,
+            help="Seconds between reloading schedules from the database",
+        )
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        poll_interval = options["poll_interval"]
+        limiter = get_upstream_limiter()
+        queue = self.load_queue()
+        synced_at = time.monotonic()
+        self.stdout.write(f"Scheduler started with {len(queue)} members.")
+
+        try:
+            while True:
+                if time.monotonic() - synced_at >= options["resync_interval"]:
+                    queue = self.load_queue()
+                    synced_at = time.monotonic()
+
+                now = timezone.now()
+                if queue and queue[0][0] <= now:
+                    _, member_id = heapq.heappop(queue)
+                    schedule = (
+                        RefreshSchedule.objects.select_related("group_member")
+                        .filter(group_member_id=member_id)
+                        .first()
+                    )
+                    if schedule is None:
+                        continue  # Member was removed since the last sync.
+                    if schedule.next_refresh_at > now:
+                        # Refreshed early since it was queued; requeue it.
+                        heapq.heappush(queue, (schedule.next_refresh_at, member_id))
+                        continue
+                    early = False
+                elif once:
+                    break
+                else:
+                    # Nothing is due: spend spare budget on an early refresh.
+                    # Its queue entry goes stale and is requeued when popped.
+                    schedule = pick_early_refresh(now)
+                    if schedule is None:
+                        time.sleep(self.idle_wait(queue, now, poll_interval))
+                        continue
+                    early = True
+
+                # Take both calls' budget in one step; checking remaining()
+                # first could race with other processes using the limiter.
+                reservation = limiter.reserve(CALLS_PER_REFRESH)
+                if reservation is None:
+                    wait = limiter.reset_in(CALLS_PER_REFRESH)
+                    if early:
+                        wait = min(wait, self.idle_wait(queue, now, poll_interval))
+                    else:
+                        heapq.heappush(
+                            queue, (schedule.next_refresh_at, schedule.group_member_id)
+                        )
+                    time.sleep(min(max(wait, 0.5), poll_interval))
+                    continue
+
+                self.refresh(schedule, reservation, early=early)
+                if not early:
+                    heapq.heappush(
+                        queue, (schedule.next_refresh_at, schedule.group_member_id)
+                    )
+        except KeyboardInterrupt:
+            self.stdout.write("Scheduler stopped.")
+
+    def idle_wait(self, queue, now, poll_interval):
+        """Seconds to sleep until the next member falls due, at most poll_interval."""
+        wait = poll_interval
+        if queue:
+            wait = min(wait, (queue[0][0] - now).total_seconds())
+        return max(wait, 0.1)
+
+    def load_queue(self):
+        """Builds the priority queue of (next_refresh_at, member_id)."""
+        ensure_schedules()
+        queue = list(
+            RefreshSchedule.objects.values_list("next_refresh_at", "group_member_id")
+        )
+        heapq.heapify(queue)
+        return queue
+
+    def refresh(self, schedule, reservation, early=False):
+        member = schedule.group_member
+        before = current_overall_xp(member)
+        started = time.monotonic()
+        success = refresh_player_cache(
+            member.player_name,
+            rate_limit_timeout=RATE_LIMIT_WAIT,
+            reservation=reservation,
+        )
+        changed = success and current_overall_xp(member) != before
+        record_refresh(schedule, success, changed)
+
+        seconds = time.monotonic() - started
+        next_at = timezone.localtime(schedule.next_refresh_at).strftime("%H:%M:%S")
+        if success:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Refreshed {member.player_name}{' early' if early else ''} "
+                    f"in {seconds:.2f}s "
+                    f"({'changed' if changed else 'unchanged'}, "
+                    f"{schedule.xp_per_hour:.0f} xp/h); next at {next_at}."
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Failed to refresh {member.player_name}; retrying at {next_at}."
+                )
+            )
@@ -0,0 +1,161 @@
+# stats_app/middleware.py
+
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db import connections
+from .profiling import check_profile_token, profiled
+
+logger = logging.getLogger("stats_app.requests")
+
+# How many of a request's slowest statements are logged when it is slow.
+SLOWEST_STATEMENTS = 5
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """SQL and timing figures collected while one request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.statements = []
+        self.timings = {}
+
+    def add_query(self, sql, duration_ms):
+        self.queries += 1
+        self.sql_ms += duration_ms
+        self.statements.append((duration_ms, sql))
+
+    def add_timing(self, name, duration_ms):
+        self.timings[name] = self.timings.get(name, 0.0) + duration_ms
+
+    def slowest(self, count=SLOWEST_STATEMENTS):
+        return sorted(self.statements, key=lambda item: item[0], reverse=True)[:count]
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+@contextmanager
+def record_timing(name):
+    """
+    Adds the time spent in the block to the current request's `name` timing
+    (reported as a Server-Timing metric). A no-op outside instrumented requests.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_timing(name, (time.perf_counter() - started) * 1000)
+
+
+def _time_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, (time.perf_counter() - started) * 1000)
+
+
+def _instrument_connection(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Opt-in (settings.REQUEST_METRICS) per-request instrumentation: counts
+    queries and SQL time on every connection the request touches, including
+    worker threads, adds them to a Server-Timing header and logs a JSON line
+    per request. Requests slower than REQUEST_METRICS_SLOW_MS are logged as
+    warnings with their slowest statements.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = settings.REQUEST_METRICS_SLOW_MS
+        # Context variables follow the request into sync_to_async threads, so
+        # wrapping every connection catches queries made off the main thread.
+        connection_created.connect(_instrument_connection)
+        for connection in connections.all(initialized_only=True):
+            _instrument_connection(None, connection)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = metrics.elapsed_ms()
+        response["Server-Timing"] = self.server_timing(metrics, total_ms)
+        self.log(request, response, metrics, total_ms)
+        return response
+
+    def server_timing(self, metrics, total_ms):
+        entries = [f'db;dur={metrics.sql_ms:.1f};desc="{metrics.queries} queries"']
+        entries += [f"{name};dur={ms:.1f}" for name, ms in metrics.timings.items()]
+        entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+    def log(self, request, response, metrics, total_ms):
+        match = request.resolver_match
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 1),
+            "queries": metrics.queries,
+            "sql_ms": round(metrics.sql_ms, 1),
+            **{f"{name}_ms": round(ms, 1) for name, ms in metrics.timings.items()},
+        }
+        if request.GET.get("players"):
+            fields["players"] = request.GET["players"]
+        if total_ms < self.slow_ms:
+            logger.info("request %s", json.dumps(fields))
+            return
+        fields["slowest"] = [
+            {"ms": round(ms, 1), "sql": sql} for ms, sql in metrics.slowest()
+        ]
+        logger.warning("slow request %s", json.dumps(fields))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that carry a valid profiling token (see `manage.py
+    profiles --token`) in the `profile` query parameter or the X-Profile-Token
+    header. The saved profile's name is returned in the X-Profile header.
+    Before Python 3.12 only the thread handling the request is profiled, so
+    work an async view hands to the thread pool with thread_sensitive=False
+    is not included. From 3.12 every thread is, and a request that arrives
+    while another is being profiled runs unprofiled, without the header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.GET.get("profile") or request.headers.get("X-Profile-Token")
+        if not token or not check_profile_token(token):
+            return self.get_response(request)
+        with profiled(request.path) as profile:
+            response = self.get_response(request)
+        if profile["name"]:
+            response["X-Profile"] = profile["name"]
+        return response
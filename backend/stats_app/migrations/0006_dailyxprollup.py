@@ -0,0 +1,113 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:12
+
+import json
+import os
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json"
+)
+
+
+def build_daily_rollups(apps, schema_editor):
+    # rollups.rebuild_rollups as of this migration, so later changes to it
+    # can't alter what this migration does. Without a readable config the
+    # table stays empty until `manage.py rebuild_rollups` is run.
+    try:
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return
+    data_key = config.get("keys", {}).get("data", "data")
+    skills = config.get("skills", [])
+
+    def skill_xp(payload):
+        data = (payload or {}).get(data_key, {})
+        xp = {}
+        for skill in skills:
+            try:
+                xp[skill] = int(data.get(skill, 0) or 0)
+            except (ValueError, TypeError):
+                xp[skill] = 0
+        return xp
+
+    GroupMember = apps.get_model("stats_app", "GroupMember")
+    PlayerHistory = apps.get_model("stats_app", "PlayerHistory")
+    DailyXPRollup = apps.get_model("stats_app", "DailyXPRollup")
+
+    for member_id in GroupMember.objects.values_list("id", flat=True):
+        rollups = {}
+        history = (
+            PlayerHistory.objects.filter(group_member_id=member_id)
+            .order_by("timestamp", "id")
+            .values_list("timestamp", "data")
+        )
+        for timestamp, payload in history.iterator(chunk_size=500):
+            date = timezone.localtime(timestamp).date()
+            rollup = rollups.get(date)
+            if rollup is None:
+                xp = skill_xp(payload)
+                rollups[date] = DailyXPRollup(
+                    group_member_id=member_id,
+                    date=date,
+                    first_timestamp=timestamp,
+                    last_timestamp=timestamp,
+                    first_xp=xp,
+                    last_xp=xp,
+                )
+            else:
+                rollup.last_timestamp = timestamp
+                rollup.last_xp = skill_xp(payload)
+        DailyXPRollup.objects.bulk_create(rollups.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0005_alter_playerhistory_timestamp"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyXPRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("first_timestamp", models.DateTimeField()),
+                ("last_timestamp", models.DateTimeField()),
+                ("first_xp", models.JSONField(default=dict)),
+                ("last_xp", models.JSONField(default=dict)),
+                (
+                    "group_member",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stats_app.groupmember",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["date", "group_member"],
+                        name="stats_app_d_date_1c47ab_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("group_member", "date"), name="unique_daily_rollup"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_daily_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0006_dailyxprollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SkillSample",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("skill", models.CharField(max_length=32)),
+                ("timestamp", models.DateTimeField()),
+                ("xp", models.BigIntegerField()),
+                ("level", models.IntegerField()),
+                (
+                    "group_member",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stats_app.groupmember",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["group_member", "skill", "timestamp"],
+                        name="stats_app_s_group_m_0a43f7_idx",
+                    )
+                ],
+            },
+        ),
+    ]
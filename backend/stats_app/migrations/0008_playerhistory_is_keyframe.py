@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0007_skillsample"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playerhistory",
+            name="is_keyframe",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name="playerhistory",
+            index=models.Index(
+                fields=["group_member", "timestamp"],
+                name="stats_app_p_group_m_bcb553_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0008_playerhistory_is_keyframe"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="apicalllog",
+            name="timestamp",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name="RateLimitSlot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50)),
+                ("slot", models.PositiveIntegerField()),
+                ("expires_at", models.DateTimeField()),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "slot"), name="unique_rate_limit_slot"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0009_ratelimitslot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RefreshSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("next_refresh_at", models.DateTimeField(db_index=True)),
+                ("last_refreshed_at", models.DateTimeField(blank=True, null=True)),
+                ("last_changed_at", models.DateTimeField(blank=True, null=True)),
+                ("xp_per_hour", models.FloatField(default=0)),
+                ("consecutive_failures", models.PositiveIntegerField(default=0)),
+                (
+                    "group_member",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stats_app.groupmember",
+                    ),
+                ),
+            ],
+        ),
+    ]
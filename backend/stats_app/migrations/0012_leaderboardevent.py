@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0011_backfillcheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("kind", models.CharField(max_length=32)),
+                ("data", models.JSONField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:52
+
+import hashlib
+import json
+import os
+
+from django.db import migrations, models
+
+CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json"
+)
+
+
+def project(response, config):
+    # api_handler.build_stats_projection as of this migration. A projection
+    # it gets wrong only costs a rebuild: reads redo any row whose layout no
+    # longer matches the config.
+    keys = config.get("keys", {})
+    data_key = keys.get("data", "data")
+    if not response or data_key not in response:
+        return None
+    data = response.get(data_key, {})
+    info = data.get(keys.get("info", "info"), {})
+    if not info or not data:
+        return None
+
+    skills = {}
+    for skill in config.get("skills", []):
+        skills[skill.lower()] = [
+            data.get(f"{skill}_rank", 0),
+            data.get(f"{skill}_level", 0),
+            data.get(skill, 0),
+        ]
+    skills["overall"] = [
+        data.get(keys.get("overall_rank", "Overall_rank"), 0),
+        data.get(keys.get("overall_level", "Overall_level"), 0),
+        data.get(keys.get("overall", "Overall"), 0),
+    ]
+    bosses = {boss.lower(): data.get(boss, 0) for boss in config.get("bosses", [])}
+
+    names = json.dumps(
+        [config.get("skills", []), config.get("bosses", []), keys], sort_keys=True
+    )
+    return {
+        "layout": hashlib.sha1(names.encode("utf-8")).hexdigest()[:12],
+        "timestamp": info.get("Last checked", "N/A"),
+        "skills": [[key, *values] for key, values in skills.items()],
+        "bosses": [
+            [key, kc]
+            for key, kc in sorted(bosses.items(), key=lambda b: b[1], reverse=True)
+        ],
+    }
+
+
+def build_projections(apps, schema_editor):
+    # Without a readable config the projections stay empty and are built on
+    # first read instead.
+    try:
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    PlayerStatsCache = apps.get_model("stats_app", "PlayerStatsCache")
+    caches = list(PlayerStatsCache.objects.only("pk", "data"))
+    for cache in caches:
+        cache.projection = project(cache.data, config)
+    PlayerStatsCache.objects.bulk_update(caches, ["projection"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0012_leaderboardevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playerstatscache",
+            name="projection",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(build_projections, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0013_playerstatscache_projection"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BossSample",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("boss", models.CharField(max_length=64)),
+                ("timestamp", models.DateTimeField()),
+                ("killcount", models.IntegerField()),
+                (
+                    "group_member",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stats_app.groupmember",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["boss", "group_member", "timestamp"],
+                        name="stats_app_b_boss_d504e2_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,131 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:06
+
+import json
+import os
+from datetime import timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json"
+)
+REMOVED_KEY = "__removed__"
+
+
+def apply_delta(base, delta):
+    # delta.apply_delta as of this migration.
+    result = dict(base)
+    for key in delta.get(REMOVED_KEY, ()):
+        result.pop(key, None)
+    for key, value in delta.items():
+        if key == REMOVED_KEY:
+            continue
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = apply_delta(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def build_hourly_rollups(apps, schema_editor):
+    # rollups.rebuild_rollups as of this migration, reading PlayerHistory
+    # rather than SkillSample, which stays empty until backfill_samples runs.
+    # Without a readable config the table stays empty until
+    # `manage.py rebuild_rollups` is run.
+    try:
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return
+    data_key = config.get("keys", {}).get("data", "data")
+    skills = config.get("skills", [])
+
+    def skill_xp(payload):
+        data = (payload or {}).get(data_key, {})
+        xp = {}
+        for skill in skills:
+            try:
+                xp[skill] = int(data.get(skill, 0) or 0)
+            except (ValueError, TypeError):
+                xp[skill] = 0
+        return xp
+
+    GroupMember = apps.get_model("stats_app", "GroupMember")
+    PlayerHistory = apps.get_model("stats_app", "PlayerHistory")
+    HourlyXPRollup = apps.get_model("stats_app", "HourlyXPRollup")
+
+    for member_id in GroupMember.objects.values_list("id", flat=True):
+        rollups = {}
+        snapshot = None
+        history = (
+            PlayerHistory.objects.filter(group_member_id=member_id)
+            .order_by("timestamp", "id")
+            .values_list("timestamp", "data", "is_keyframe")
+        )
+        for timestamp, data, is_keyframe in history.iterator(chunk_size=500):
+            if is_keyframe or snapshot is None:
+                snapshot = data
+            else:
+                snapshot = apply_delta(snapshot, data)
+            hour = timestamp.astimezone(timezone.utc).replace(
+                minute=0, second=0, microsecond=0
+            )
+            rollup = rollups.get(hour)
+            if rollup is None:
+                xp = skill_xp(snapshot)
+                rollups[hour] = HourlyXPRollup(
+                    group_member_id=member_id,
+                    hour=hour,
+                    first_timestamp=timestamp,
+                    last_timestamp=timestamp,
+                    first_xp=xp,
+                    last_xp=xp,
+                )
+            else:
+                rollup.last_timestamp = timestamp
+                rollup.last_xp = skill_xp(snapshot)
+        HourlyXPRollup.objects.bulk_create(rollups.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stats_app", "0014_bosssample"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HourlyXPRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("first_timestamp", models.DateTimeField()),
+                ("last_timestamp", models.DateTimeField()),
+                ("first_xp", models.JSONField(default=dict)),
+                ("last_xp", models.JSONField(default=dict)),
+                (
+                    "group_member",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stats_app.groupmember",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("group_member", "hour"), name="unique_hourly_rollup"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_hourly_rollups, migrations.RunPython.noop),
+    ]
@@ -11,24 +11,196 @@ class GroupMember(models.Model):
 
 
 class PlayerStatsCache(models.Model):
+    """
+    The latest Temple stats of a member. `data` is the raw API response, kept
+    for auditing; reads go through `projection`, the parsed form written
+    alongside it (see api_handler.build_stats_projection).
+    """
+
     group_member = models.OneToOneField(GroupMember, on_delete=models.CASCADE)
     data = JSONField()
+    projection = JSONField(null=True, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
 
 
 class APICallLog(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class RateLimitSlot(models.Model):
+    """
+    A token taken from a RateLimiter bucket, returned once `expires_at`
+    passes. The unique constraint is what makes reserving a token atomic.
+    """
+
+    name = models.CharField(max_length=50)
+    slot = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "slot"], name="unique_rate_limit_slot"
+            )
+        ]
 
 
 class PlayerHistory(models.Model):
     """
     Model to store historical snapshots of a player's stats.
-    Each entry is a full dump of stats at a specific point in time.
+    Keyframe entries hold a full dump of stats at a specific point in time;
+    the others hold a sparse delta against the previous entry. Use the
+    readers in stats_app.history rather than reading `data` directly.
     """
 
     group_member = models.ForeignKey(GroupMember, on_delete=models.CASCADE)
     timestamp = models.DateTimeField()
     data = JSONField()
+    is_keyframe = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["group_member", "timestamp"])]
 
     def __str__(self):
         return f"{self.group_member.player_name} - {self.timestamp}"
+
+
+class DailyXPRollup(models.Model):
+    """
+    Per-member, per-day summary of the first and last XP seen for each skill.
+    Maintained as history is written so gains can be read without scanning
+    PlayerHistory.
+    """
+
+    group_member = models.ForeignKey(GroupMember, on_delete=models.CASCADE)
+    date = models.DateField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    first_xp = JSONField(default=dict)
+    last_xp = JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["group_member", "date"], name="unique_daily_rollup"
+            )
+        ]
+        indexes = [models.Index(fields=["date", "group_member"])]
+
+    def __str__(self):
+        return f"{self.group_member.player_name} - {self.date}"
+
+
+class HourlyXPRollup(models.Model):
+    """
+    The DailyXPRollup summary per UTC hour, so gains over windows that do not
+    start and end at local midnight can be read without scanning samples.
+    """
+
+    group_member = models.ForeignKey(GroupMember, on_delete=models.CASCADE)
+    hour = models.DateTimeField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    first_xp = JSONField(default=dict)
+    last_xp = JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["group_member", "hour"], name="unique_hourly_rollup"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.group_member.player_name} - {self.hour}"
+
+
+class SkillSample(models.Model):
+    """
+    One skill's XP and level from a PlayerHistory snapshot, stored narrowly so
+    history charts can range-scan an index instead of parsing JSON blobs.
+    """
+
+    group_member = models.ForeignKey(GroupMember, on_delete=models.CASCADE)
+    skill = models.CharField(max_length=32)
+    timestamp = models.DateTimeField()
+    xp = models.BigIntegerField()
+    level = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["group_member", "skill", "timestamp"])]
+
+    def __str__(self):
+        return f"{self.group_member.player_name} - {self.skill} - {self.timestamp}"
+
+
+class BossSample(models.Model):
+    """
+    A boss killcount from a PlayerHistory snapshot. Rows are only written when
+    a killcount changes (and for every boss in a member's first snapshot), so
+    the killcount at any time is the latest row before it: one index lookup.
+    """
+
+    group_member = models.ForeignKey(GroupMember, on_delete=models.CASCADE)
+    boss = models.CharField(max_length=64)
+    timestamp = models.DateTimeField()
+    killcount = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["boss", "group_member", "timestamp"])]
+
+    def __str__(self):
+        return f"{self.group_member.player_name} - {self.boss} - {self.timestamp}"
+
+
+class RefreshSchedule(models.Model):
+    """
+    Persistent state of the adaptive refresh scheduler for one member: when
+    to refresh next and the activity signals that decided it.
+    """
+
+    group_member = models.OneToOneField(GroupMember, on_delete=models.CASCADE)
+    next_refresh_at = models.DateTimeField(db_index=True)
+    last_refreshed_at = models.DateTimeField(null=True, blank=True)
+    last_changed_at = models.DateTimeField(null=True, blank=True)
+    xp_per_hour = models.FloatField(default=0)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.group_member.player_name} - {self.next_refresh_at}"
+
+
+class BackfillCheckpoint(models.Model):
+    """
+    Progress of the backfill_history command for one member, so an
+    interrupted run resumes with the members it had not finished.
+    """
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (DONE, "Done"), (FAILED, "Failed")]
+
+    group_member = models.OneToOneField(GroupMember, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    synced_until = models.DateTimeField(null=True, blank=True)
+    datapoints_added = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.group_member.player_name} - {self.status}"
+
+
+class LeaderboardEvent(models.Model):
+    """
+    An entry in the log behind the live events stream. The auto-incrementing
+    id doubles as the SSE event id clients resume from.
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    kind = models.CharField(max_length=32)
+    data = JSONField()
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
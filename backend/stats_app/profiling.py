@@ -0,0 +1,150 @@
+# stats_app/profiling.py
+
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from django.conf import settings
+from django.core import signing
+from django.core.management.base import BaseCommand
+
+PROFILE_SUFFIX = ".prof"
+TOKEN_SALT = "stats_app.profiling"
+TOKEN_VALUE = "profile"
+# From 3.12 cProfile is built on sys.monitoring, which profiles every thread.
+PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def profile_dir():
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    return settings.PROFILE_DIR
+
+
+@contextmanager
+def profiled(label, threads=False):
+    """
+    Profiles the block with cProfile and saves the stats to PROFILE_DIR. With
+    `threads`, threads started inside the block are profiled too (e.g. a
+    command's worker pool); otherwise only the calling thread is. Yields a
+    dict whose "name" is set to the saved profile's file name on exit.
+
+    From Python 3.12 a profiler sees every thread and only one can be active
+    at a time, so a block entered while another is profiling (e.g. a
+    concurrent profiled request) runs unprofiled, and "name" stays None.
+    """
+    profiles = [cProfile.Profile()]
+    lock = threading.Lock()
+    result = {"name": None}
+    try:
+        profiles[0].enable()
+    except ValueError:
+        yield result
+        return
+
+    def start_thread_profile(*args):
+        # Runs once as the new thread's profile hook: removes itself, then
+        # gives the thread its own profiler.
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return  # Another profiler is active; run the thread unprofiled.
+        with lock:
+            profiles.append(profile)
+
+    per_thread = threads and not PROFILER_SEES_ALL_THREADS
+    if per_thread:
+        threading.setprofile(start_thread_profile)
+    try:
+        yield result
+    finally:
+        profiles[0].disable()
+        if per_thread:
+            threading.setprofile(None)
+        with lock:
+            result["name"] = save_profile(label, profiles)
+
+
+def save_profile(label, profiles):
+    """Writes the combined stats of `profiles` and prunes old profiles."""
+    stats = pstats.Stats(profiles[0])
+    for profile in profiles[1:]:
+        stats.add(profile)
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "-", label).strip("-") or "profile"
+    name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}{PROFILE_SUFFIX}"
+    stats.dump_stats(os.path.join(profile_dir(), name))
+    rotate_profiles()
+    return name
+
+
+def rotate_profiles():
+    """Deletes all but the newest settings.PROFILE_KEEP profiles."""
+    for name in list_profiles()[settings.PROFILE_KEEP :]:
+        try:
+            os.remove(os.path.join(profile_dir(), name))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles():
+    """Returns the saved profiles' file names, newest first."""
+    names = [n for n in os.listdir(profile_dir()) if n.endswith(PROFILE_SUFFIX)]
+    return sorted(names, reverse=True)
+
+
+def summarize_profile(name, sort="cumulative", limit=25):
+    """Returns the top `limit` functions of a saved profile, sorted by `sort`."""
+    path = os.path.join(profile_dir(), os.path.basename(name))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No profile named {name}")
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def make_profile_token():
+    """Returns a token that enables request profiling until it expires."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def check_profile_token(token):
+    try:
+        value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+class ProfiledCommand(BaseCommand):
+    """
+    A BaseCommand with a `--profile` option that profiles the whole command,
+    worker threads included, and saves the result to PROFILE_DIR.
+    """
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Profile this run; see `manage.py profiles` for the results",
+        )
+        return parser
+
+    def execute(self, *args, **options):
+        if not options.get("profile"):
+            return super().execute(*args, **options)
+        label = self.__module__.rsplit(".", 1)[-1]
+        with profiled(label, threads=True) as profile:
+            output = super().execute(*args, **options)
+        self.stdout.write(f"Profile saved as {profile['name']}.")
+        return output
@@ -0,0 +1,135 @@
+# stats_app/ratelimit.py
+
+
+import time
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import APICallLog, RateLimitSlot
+from .utils import get_config
+
+# How long APICallLog rows are kept for auditing.
+API_CALL_LOG_RETENTION = timedelta(days=1)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no upstream call budget became available in time."""
+
+
+class RateLimiter:
+    """
+    Token bucket shared through the database: `limit` tokens, each of which
+    returns to the bucket `period` seconds after it was taken, so no more
+    than `limit` calls start in any `period`-second window.
+
+    Each taken token is a RateLimitSlot row. The (name, slot) unique
+    constraint makes reserving atomic, so concurrent threads and processes
+    can never take the same token.
+    """
+
+    def __init__(self, name, limit, period=60):
+        self.name = name
+        self.limit = limit
+        self.period = period
+
+    def _taken(self):
+        return RateLimitSlot.objects.filter(
+            name=self.name, slot__lt=self.limit, expires_at__gt=timezone.now()
+        )
+
+    def try_acquire(self, tokens=1):
+        """
+        Takes `tokens` tokens if that many are free, all or none. Returns True
+        on success.
+        """
+        if tokens > self.limit:
+            raise ValueError(f"Cannot take {tokens} of {self.limit} tokens at once")
+        while True:
+            now = timezone.now()
+            RateLimitSlot.objects.filter(name=self.name, expires_at__lte=now).delete()
+            taken = set(self._taken().values_list("slot", flat=True))
+            free = [slot for slot in range(self.limit) if slot not in taken]
+            if len(free) < tokens:
+                return False
+            expires_at = now + timedelta(seconds=self.period)
+            try:
+                with transaction.atomic():
+                    RateLimitSlot.objects.bulk_create(
+                        [
+                            RateLimitSlot(
+                                name=self.name, slot=slot, expires_at=expires_at
+                            )
+                            for slot in free[:tokens]
+                        ]
+                    )
+                return True
+            except IntegrityError:
+                continue  # Another worker took one of these tokens first.
+
+    def acquire(self, tokens=1, timeout=0):
+        """
+        Takes `tokens` tokens, all or none, waiting up to `timeout` seconds
+        for enough to return. Returns True on success, False if the wait
+        timed out.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                return False
+            time.sleep(min(max(self.reset_in(tokens), 0.05), time_left, 1.0))
+
+    def reserve(self, tokens, timeout=0):
+        """
+        Takes the tokens for `tokens` upcoming calls in one step, so a task
+        that makes several calls either gets budget for all of them or
+        spends none. Returns a Reservation, or None if the wait timed out.
+        """
+        if not self.acquire(tokens, timeout=timeout):
+            return None
+        return Reservation(self, tokens)
+
+    def remaining(self):
+        """Returns how many tokens are free right now."""
+        return max(0, self.limit - self._taken().count())
+
+    def reset_in(self, tokens=1):
+        """Seconds until `tokens` tokens are free (0 if they are now)."""
+        taken = sorted(self._taken().values_list("expires_at", flat=True))
+        missing = len(taken) + tokens - self.limit
+        if missing <= 0:
+            return 0.0
+        return max(0.0, (taken[missing - 1] - timezone.now()).total_seconds())
+
+
+class Reservation:
+    """
+    Tokens taken ahead of time by RateLimiter.reserve(). It stands in for the
+    limiter: acquire() hands out the reserved tokens first, then takes fresh
+    ones from the limiter (e.g. for retries).
+    """
+
+    def __init__(self, limiter, tokens):
+        self.limiter = limiter
+        self.tokens = tokens
+
+    def acquire(self, tokens=1, timeout=0):
+        if tokens <= self.tokens:
+            self.tokens -= tokens
+            return True
+        return self.limiter.acquire(tokens, timeout=timeout)
+
+
+def get_upstream_limiter():
+    """The limiter every TempleOSRS call goes through."""
+    return RateLimiter("templeosrs", get_config().max_requests_per_minute, period=60)
+
+
+def record_api_call():
+    """Logs an upstream call and prunes log rows past the retention window."""
+    APICallLog.objects.create()
+    APICallLog.objects.filter(
+        timestamp__lt=timezone.now() - API_CALL_LOG_RETENTION
+    ).delete()
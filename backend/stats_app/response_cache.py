@@ -0,0 +1,62 @@
+# stats_app/response_cache.py
+
+
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+GENERATION_KEY = "stats_app:generation"
+
+
+def get_generation():
+    """Returns the current data generation, seeding it if the cache is empty."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so a cleared cache never reuses an old generation.
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Invalidates every cached response. Called whenever stats are written."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def cached_json_response(request, name, build_body, content_type="application/json"):
+    """
+    Serves the response body produced by `build_body()` from the cache, keyed
+    by `name`, the data generation and the local date (so "today" rolls over
+    at midnight). Adds a strong ETag and Last-Modified and answers conditional
+    requests with 304 Not Modified.
+    """
+    key = f"stats_app:response:{name}:{get_generation()}:{timezone.localdate()}"
+    entry = cache.get(key)
+    if entry is None:
+        body = build_body()
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        entry = {
+            "body": body,
+            "etag": f'"{hashlib.sha1(body).hexdigest()}"',
+            "last_modified": int(time.time()),
+        }
+        cache.set(key, entry, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+    response = get_conditional_response(
+        request, etag=entry["etag"], last_modified=entry["last_modified"]
+    )
+    if response is None:
+        response = HttpResponse(entry["body"], content_type=content_type)
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    response["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,169 @@
+# stats_app/rollups.py
+
+
+from datetime import timezone as dt_timezone
+from django.utils import timezone
+from .models import DailyXPRollup, HourlyXPRollup
+from .utils import get_config
+
+
+def local_day(timestamp):
+    """The DailyXPRollup bucket of a timestamp: its date in TIME_ZONE."""
+    return timezone.localtime(timestamp).date()
+
+
+def utc_hour(timestamp):
+    """The HourlyXPRollup bucket of a timestamp: the start of its UTC hour."""
+    return timestamp.astimezone(dt_timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+# (model, bucket field, bucket of a timestamp) of each rollup table.
+ROLLUPS = (
+    (DailyXPRollup, "date", local_day),
+    (HourlyXPRollup, "hour", utc_hour),
+)
+
+
+def extract_skill_xp(payload, skill_names):
+    """Returns {skill: xp} for the configured skills of a Temple payload."""
+    DATA_KEY, _, _, _, _ = get_config().keys
+    data = (payload or {}).get(DATA_KEY, {})
+    skill_xp = {}
+    for skill in skill_names:
+        try:
+            skill_xp[skill] = int(data.get(skill, 0) or 0)
+        except (ValueError, TypeError):
+            skill_xp[skill] = 0
+    return skill_xp
+
+
+def update_rollups(member, timestamp, payload, skill_names=None):
+    """
+    Folds a single snapshot into the member's daily and hourly rollup rows
+    for `timestamp`. Snapshots may arrive out of order.
+    """
+    if skill_names is None:
+        skill_names = get_config().skills
+    skill_xp = extract_skill_xp(payload, skill_names)
+
+    for model, field, bucket in ROLLUPS:
+        rollup, created = model.objects.get_or_create(
+            group_member=member,
+            **{field: bucket(timestamp)},
+            defaults={
+                "first_timestamp": timestamp,
+                "last_timestamp": timestamp,
+                "first_xp": skill_xp,
+                "last_xp": skill_xp,
+            },
+        )
+        if created:
+            continue
+
+        changed = False
+        if timestamp < rollup.first_timestamp:
+            rollup.first_timestamp = timestamp
+            rollup.first_xp = skill_xp
+            changed = True
+        if timestamp >= rollup.last_timestamp:
+            rollup.last_timestamp = timestamp
+            rollup.last_xp = skill_xp
+            changed = True
+        if changed:
+            rollup.save()
+
+
+def merge_rollups(member, snapshots, skill_names=None):
+    """
+    Folds many snapshots, an iterable of (timestamp, payload), into the
+    member's rollup rows with one read and one bulk write per table.
+    """
+    if skill_names is None:
+        skill_names = get_config().skills
+    snapshots = list(snapshots)
+
+    for model, field, bucket in ROLLUPS:
+        buckets = {}
+        for timestamp, payload in snapshots:
+            key = bucket(timestamp)
+            first, last = buckets.get(key, (None, None))
+            if first is None or timestamp < first[0]:
+                first = (timestamp, payload)
+            if last is None or timestamp >= last[0]:
+                last = (timestamp, payload)
+            buckets[key] = (first, last)
+
+        existing = model.objects.filter(
+            group_member=member, **{f"{field}__in": list(buckets)}
+        )
+        existing = {getattr(rollup, field): rollup for rollup in existing}
+        created = []
+        updated = []
+        for key, ((first_ts, first), (last_ts, last)) in buckets.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                created.append(
+                    model(
+                        group_member=member,
+                        first_timestamp=first_ts,
+                        last_timestamp=last_ts,
+                        first_xp=extract_skill_xp(first, skill_names),
+                        last_xp=extract_skill_xp(last, skill_names),
+                        **{field: key},
+                    )
+                )
+                continue
+            changed = False
+            if first_ts < rollup.first_timestamp:
+                rollup.first_timestamp = first_ts
+                rollup.first_xp = extract_skill_xp(first, skill_names)
+                changed = True
+            if last_ts >= rollup.last_timestamp:
+                rollup.last_timestamp = last_ts
+                rollup.last_xp = extract_skill_xp(last, skill_names)
+                changed = True
+            if changed:
+                updated.append(rollup)
+
+        model.objects.bulk_create(created, batch_size=500)
+        model.objects.bulk_update(
+            updated,
+            ["first_timestamp", "last_timestamp", "first_xp", "last_xp"],
+            batch_size=500,
+        )
+
+
+def rebuild_rollups(member, snapshots, skill_names=None):
+    """
+    Recomputes every rollup row for a member from `snapshots`, an iterable of
+    (timestamp, payload) in time order such as history.iter_snapshots().
+    Returns the number of (daily, hourly) rows written.
+    """
+    if skill_names is None:
+        skill_names = get_config().skills
+
+    rollups = {model: {} for model, _, _ in ROLLUPS}
+    for timestamp, payload in snapshots:
+        skill_xp = extract_skill_xp(payload, skill_names)
+        for model, field, bucket in ROLLUPS:
+            key = bucket(timestamp)
+            rollup = rollups[model].get(key)
+            if rollup is None:
+                rollups[model][key] = model(
+                    group_member=member,
+                    first_timestamp=timestamp,
+                    last_timestamp=timestamp,
+                    first_xp=skill_xp,
+                    last_xp=skill_xp,
+                    **{field: key},
+                )
+            else:
+                rollup.last_timestamp = timestamp
+                rollup.last_xp = skill_xp
+
+    for model, rows in rollups.items():
+        model.objects.filter(group_member=member).delete()
+        model.objects.bulk_create(rows.values(), batch_size=500)
+    return tuple(len(rows) for rows in rollups.values())
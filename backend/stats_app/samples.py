@@ -0,0 +1,53 @@
+# stats_app/samples.py
+
+
+from .models import SkillSample
+from .utils import get_config
+
+
+def build_skill_samples(member, timestamp, payload, config=None):
+    """Returns unsaved SkillSample rows for every configured skill of a snapshot."""
+    if config is None:
+        config = get_config()
+    DATA_KEY, _, _, _, _ = config.keys
+    data = (payload or {}).get(DATA_KEY, {})
+
+    samples = []
+    for skill, level_key in zip(config.skills, config.skill_level_keys):
+        samples.append(
+            SkillSample(
+                group_member=member,
+                skill=skill,
+                timestamp=timestamp,
+                xp=_to_int(data.get(skill), 0),
+                level=_to_int(data.get(level_key), 1),
+            )
+        )
+    return samples
+
+
+def rebuild_skill_samples(member, snapshots, batch_size=1000):
+    """
+    Recomputes every SkillSample for a member from `snapshots`, an iterable of
+    (timestamp, payload) such as history.iter_snapshots().
+    """
+    config = get_config()
+    SkillSample.objects.filter(group_member=member).delete()
+
+    pending = []
+    count = 0
+    for timestamp, payload in snapshots:
+        pending.extend(build_skill_samples(member, timestamp, payload, config))
+        if len(pending) >= batch_size:
+            SkillSample.objects.bulk_create(pending)
+            count += len(pending)
+            pending = []
+    SkillSample.objects.bulk_create(pending)
+    return count + len(pending)
+
+
+def _to_int(value, default):
+    try:
+        return int(value or default)
+    except (ValueError, TypeError):
+        return default
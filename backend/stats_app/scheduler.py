@@ -0,0 +1,111 @@
+# stats_app/scheduler.py
+
+
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+from .gains import compute_gains, day_window
+from .models import GroupMember, PlayerStatsCache, RefreshSchedule
+from .utils import get_config
+
+MIN_INTERVAL = timedelta(minutes=15)
+MAX_INTERVAL = timedelta(hours=12)
+# Members who left the group are still tracked, just rarely.
+INACTIVE_INTERVAL = timedelta(hours=24)
+# Members with no XP change for this long get the maximum interval.
+IDLE_AFTER = timedelta(days=3)
+# XP/hour at which the interval is halved; faster gainers refresh sooner.
+VELOCITY_SCALE = 5000
+
+
+def next_interval(schedule, in_group, now):
+    """How long to wait before refreshing a member again."""
+    if not in_group:
+        interval = INACTIVE_INTERVAL
+    elif (
+        schedule.last_changed_at is None or now - schedule.last_changed_at > IDLE_AFTER
+    ):
+        interval = MAX_INTERVAL
+    else:
+        interval = MAX_INTERVAL / (1 + schedule.xp_per_hour / VELOCITY_SCALE)
+        interval = max(MIN_INTERVAL, interval)
+    if schedule.consecutive_failures:
+        # Back off on members that keep failing, up to the inactive interval.
+        interval = min(
+            INACTIVE_INTERVAL, interval * 2 ** min(schedule.consecutive_failures, 6)
+        )
+    return interval
+
+
+def ensure_schedules(now=None):
+    """Creates a schedule, due immediately, for every member without one."""
+    now = now or timezone.now()
+    missing = GroupMember.objects.filter(refreshschedule__isnull=True)
+    RefreshSchedule.objects.bulk_create(
+        [RefreshSchedule(group_member=m, next_refresh_at=now) for m in missing]
+    )
+
+
+def update_velocities(schedules):
+    """Sets xp_per_hour on each schedule from its member's gains this week."""
+    overall = get_config().keys[2]
+    window = day_window("week", 7)
+    gains = compute_gains([s.group_member_id for s in schedules], [overall], [window])
+    hours = (timezone.now() - window.start).total_seconds() / 3600
+    for schedule in schedules:
+        total, _ = gains[schedule.group_member_id]["week"]
+        schedule.xp_per_hour = max(0, total) / max(hours, 1)
+
+
+def current_overall_xp(member):
+    """The member's cached Overall XP, used to detect whether a refresh changed it."""
+    DATA_KEY, _, OVERALL_KEY, _, _ = get_config().keys
+    data = (
+        PlayerStatsCache.objects.filter(group_member=member)
+        .values_list("data", flat=True)
+        .first()
+    )
+    return ((data or {}).get(DATA_KEY) or {}).get(OVERALL_KEY)
+
+
+def record_refresh(schedule, success, changed, now=None):
+    """Updates and saves a schedule after a refresh attempt."""
+    now = now or timezone.now()
+    if success:
+        schedule.last_refreshed_at = now
+        schedule.consecutive_failures = 0
+        if changed:
+            schedule.last_changed_at = now
+    else:
+        schedule.consecutive_failures += 1
+    update_velocities([schedule])
+    schedule.next_refresh_at = now + next_interval(
+        schedule, schedule.group_member.in_group, now
+    )
+    schedule.save()
+
+
+def pick_early_refresh(now=None):
+    """
+    The schedule to refresh ahead of time when no member is due but budget
+    is left over: the fastest-gaining active group member, soonest due first
+    among equals, skipping members refreshed within MIN_INTERVAL or failing.
+    Idle members (no XP gained, or no change within IDLE_AFTER) keep their
+    long intervals.
+    """
+    now = now or timezone.now()
+    return (
+        RefreshSchedule.objects.select_related("group_member")
+        .filter(
+            group_member__in_group=True,
+            consecutive_failures=0,
+            xp_per_hour__gt=0,
+            last_changed_at__gte=now - IDLE_AFTER,
+        )
+        .filter(
+            Q(last_refreshed_at__isnull=True)
+            | Q(last_refreshed_at__lte=now - MIN_INTERVAL)
+        )
+        .order_by("-xp_per_hour", "next_refresh_at")
+        .first()
+    )
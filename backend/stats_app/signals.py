@@ -0,0 +1,30 @@
+# stats_app/signals.py
+
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import GroupMember, PlayerHistory, PlayerStatsCache
+from .events import publish_player_update
+from .response_cache import bump_generation
+
+
+@receiver(post_save, sender=GroupMember)
+@receiver(post_delete, sender=GroupMember)
+@receiver(post_save, sender=PlayerStatsCache)
+@receiver(post_delete, sender=PlayerStatsCache)
+@receiver(post_save, sender=PlayerHistory)
+@receiver(post_delete, sender=PlayerHistory)
+def invalidate_cached_responses(sender, **kwargs):
+    # Wait for the commit so no request can cache pre-commit data under the
+    # new generation.
+    transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=PlayerStatsCache)
+def publish_leaderboard_update(sender, instance, **kwargs):
+    # Published after the refresh's snapshot commits, so the gains include
+    # it. A failure here must not fail the refresh itself.
+    transaction.on_commit(
+        lambda: publish_player_update(instance.group_member_id), robust=True
+    )
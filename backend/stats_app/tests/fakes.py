@@ -0,0 +1,36 @@
+# stats_app/tests/fakes.py
+
+from unittest import mock
+from stats_app.benchmarks.generator import PlayerSimulator
+from stats_app.utils import StatsConfig, load_config
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Answers every Temple request with a simulated player_stats payload."""
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        return FakeResponse(PlayerSimulator("player", seed=1).payload())
+
+
+def override_config(**sections):
+    """Patches get_config() to return config.json with `sections` replaced."""
+    config = StatsConfig.from_dict({**load_config(), **sections})
+    return mock.patch("stats_app.utils.config_registry.get", return_value=config)
@@ -0,0 +1,85 @@
+# stats_app/tests/test_admin.py
+
+import json
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from stats_app.api_handler import build_stats_projection, get_player_stats_from_cache
+from stats_app.benchmarks.generator import PlayerSimulator
+from stats_app.history import iter_snapshots, replace_history
+from stats_app.models import GroupMember, PlayerHistory, PlayerStatsCache
+from stats_app.utils import get_config
+from .fakes import override_config
+from .test_history import simulate
+
+
+class PlayerHistoryAdminTests(TestCase):
+    def setUp(self):
+        patcher = override_config(history={"storage": "delta", "keyframe_interval": 3})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.member = GroupMember.objects.create(player_name="player")
+        self.snapshots = simulate(9)
+        replace_history(self.member, self.snapshots)
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "password")
+        )
+
+    def row(self, index):
+        return PlayerHistory.objects.order_by("timestamp")[index]
+
+    def test_rows_are_shown_rebuilt_and_read_only(self):
+        delta = self.row(4)
+        self.assertFalse(delta.is_keyframe)
+        url = reverse("admin:stats_app_playerhistory_change", args=[delta.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Username")  # Only in full snapshots.
+        self.assertNotContains(response, 'name="data"')
+
+        response = self.client.post(url, {"data": "{}", "is_keyframe": "on"})
+        self.assertEqual(response.status_code, 403)
+        delta.refresh_from_db()
+        self.assertFalse(delta.is_keyframe)
+
+    def test_deleting_a_keyframe_keeps_later_snapshots(self):
+        keyframe = self.row(3)
+        self.assertTrue(keyframe.is_keyframe)
+        url = reverse("admin:stats_app_playerhistory_delete", args=[keyframe.pk])
+        self.client.post(url, {"post": "yes"})
+        self.assertEqual(
+            list(iter_snapshots(self.member)), self.snapshots[:3] + self.snapshots[4:]
+        )
+
+    def test_bulk_delete_keeps_later_snapshots(self):
+        pks = [self.row(i).pk for i in (1, 3, 7)]
+        self.client.post(
+            reverse("admin:stats_app_playerhistory_changelist"),
+            {"action": "delete_selected", "_selected_action": pks, "post": "yes"},
+        )
+        expected = [s for i, s in enumerate(self.snapshots) if i not in (1, 3, 7)]
+        self.assertEqual(list(iter_snapshots(self.member)), expected)
+
+
+class PlayerStatsCacheAdminTests(TestCase):
+    def test_editing_data_rebuilds_the_projection(self):
+        member = GroupMember.objects.create(player_name="player")
+        payload = PlayerSimulator("player", seed=1).payload()
+        cache = PlayerStatsCache.objects.create(
+            group_member=member,
+            data=payload,
+            projection=build_stats_projection(payload, get_config()),
+        )
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "password")
+        )
+
+        payload["data"]["Attack"] += 1000
+        url = reverse("admin:stats_app_playerstatscache_change", args=[cache.pk])
+        response = self.client.post(
+            url, {"group_member": member.pk, "data": json.dumps(payload)}
+        )
+        self.assertEqual(response.status_code, 302)
+
+        stats = get_player_stats_from_cache("player")
+        self.assertEqual(stats.skills["attack"].xp, payload["data"]["Attack"])
@@ -0,0 +1,115 @@
+# stats_app/tests/test_benchmarks.py
+
+from datetime import timedelta
+from django.test import SimpleTestCase, TestCase, override_settings
+from stats_app.benchmarks.generator import PlayerSimulator, generate_group
+from stats_app.benchmarks.runner import (
+    BENCHMARK_CACHES,
+    DEFAULT_BASELINE,
+    SCALES,
+    Result,
+    find_regressions,
+    load_baseline,
+    run_suite,
+)
+from stats_app.models import PlayerHistory, PlayerStatsCache
+
+# Test machines are slower and noisier than the one that recorded the
+# baseline, so latency and memory get more room here than in run_benchmarks.
+# Query counts are exact either way.
+TEST_TOLERANCE = 3.0
+
+
+class FindRegressionsTests(SimpleTestCase):
+    baseline = {"case": {"latency_ms": 10.0, "queries": 4, "peak_kb": 100.0}}
+
+    def result(self, latency_ms=10.0, queries=4, peak_kb=100.0, name="case"):
+        return Result(
+            name=name, latency_ms=latency_ms, queries=queries, peak_kb=peak_kb
+        )
+
+    def test_matching_results_pass(self):
+        self.assertEqual(find_regressions([self.result()], self.baseline, 0.5), [])
+
+    def test_any_extra_query_regresses(self):
+        regressions = find_regressions([self.result(queries=5)], self.baseline, 0.5)
+        self.assertEqual(regressions, ["case: 5 queries (baseline 4)"])
+
+    def test_fewer_queries_pass(self):
+        self.assertEqual(
+            find_regressions([self.result(queries=2)], self.baseline, 0.5), []
+        )
+
+    def test_latency_within_tolerance_and_slack_passes(self):
+        # 10ms * 1.5 + 5ms slack
+        self.assertEqual(
+            find_regressions([self.result(latency_ms=20.0)], self.baseline, 0.5), []
+        )
+        regressions = find_regressions(
+            [self.result(latency_ms=20.1)], self.baseline, 0.5
+        )
+        self.assertEqual(regressions, ["case: 20.1ms (baseline 10.0ms)"])
+
+    def test_memory_past_tolerance_regresses(self):
+        regressions = find_regressions([self.result(peak_kb=300.0)], self.baseline, 0.5)
+        self.assertEqual(regressions, ["case: 300KB peak (baseline 100KB)"])
+
+    def test_cases_missing_from_the_baseline_are_ignored(self):
+        result = self.result(queries=99, name="new_case")
+        self.assertEqual(find_regressions([result], self.baseline, 0.5), [])
+
+
+class GeneratorTests(TestCase):
+    def test_simulator_is_deterministic(self):
+        runs = []
+        for _ in range(2):
+            sim = PlayerSimulator("bench000", seed=7)
+            payloads = []
+            for _ in range(20):
+                sim.step()
+                payloads.append(sim.payload())
+            runs.append(payloads)
+        self.assertEqual(runs[0], runs[1])
+
+    def test_seeds_change_the_data(self):
+        a, b = PlayerSimulator("bench000", seed=1), PlayerSimulator("bench000", seed=2)
+        self.assertNotEqual(a.payload(), b.payload())
+
+    def test_generate_group_is_deterministic(self):
+        def snapshot():
+            group = generate_group(3, 12, seed=5, interval=timedelta(hours=2))
+            history = list(
+                PlayerHistory.objects.filter(group_member__in=group)
+                .order_by("group_member__player_name", "timestamp")
+                .values_list(
+                    "group_member__player_name", "timestamp", "data", "is_keyframe"
+                )
+            )
+            caches = list(
+                PlayerStatsCache.objects.filter(group_member__in=group)
+                .order_by("group_member__player_name")
+                .values_list("data", "projection")
+            )
+            for member in group:
+                member.delete()
+            return history, caches
+
+        first = snapshot()
+        self.assertEqual(len(first[0]), 3 * 12)
+        self.assertEqual(first, snapshot())
+
+
+@override_settings(CACHES=BENCHMARK_CACHES)
+class SmallBenchmarkTests(TestCase):
+    """Runs the small benchmark scale and gates it on the stored baseline."""
+
+    def test_no_regressions_against_the_small_baseline(self):
+        baseline = load_baseline(DEFAULT_BASELINE)
+        self.assertIn("small", baseline)
+        members, snapshots = SCALES["small"]
+        group = generate_group(members, snapshots)
+        results = run_suite(group, snapshots, repeat=3)
+
+        self.assertEqual({result.name for result in results}, set(baseline["small"]))
+        regressions = find_regressions(results, baseline["small"], TEST_TOLERANCE)
+        self.assertEqual(regressions, [], "Benchmarks regressed past the baseline")
@@ -0,0 +1,122 @@
+# stats_app/tests/test_bosses.py
+
+from django.test import TestCase
+from stats_app.bosses import compute_boss_gains, killcounts_before
+from stats_app.gains import GainWindow
+from stats_app.history import merge_history, replace_history
+from stats_app.models import BossSample, GroupMember
+from stats_app.utils import get_config
+from .test_history import simulate
+
+
+class BossKillcountTests(TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self.bosses = list(self.config.bosses[:10])
+        self.snapshots = simulate(40, seed=5)
+        self.early = GroupMember.objects.create(player_name="early")
+        self.late = GroupMember.objects.create(player_name="late")
+        replace_history(self.early, self.snapshots)
+        replace_history(self.late, self.snapshots[20:])
+
+    def killcounts(self, snapshots, moment=None):
+        """The killcounts of the last snapshot before `moment`, from payloads."""
+        data_key = self.config.keys[0]
+        before = [p for ts, p in snapshots if moment is None or ts < moment]
+        if not before:
+            return {}
+        return {boss: int(before[-1][data_key].get(boss) or 0) for boss in self.bosses}
+
+    def expected(self, moment=None):
+        expected = {}
+        for member, snapshots in (
+            (self.early, self.snapshots),
+            (self.late, self.snapshots[20:]),
+        ):
+            for boss, kc in self.killcounts(snapshots, moment).items():
+                expected[(member.id, boss)] = kc
+        return expected
+
+    def test_killcounts_before_match_the_snapshots(self):
+        member_ids = [self.early.id, self.late.id]
+        for index in (0, 10, 20, 30):
+            moment = self.snapshots[index][0]
+            self.assertEqual(
+                killcounts_before(member_ids, self.bosses, moment),
+                self.expected(moment),
+            )
+        self.assertEqual(killcounts_before(member_ids, self.bosses), self.expected())
+
+    def test_single_member_reads_match(self):
+        expected = self.expected(self.snapshots[30][0])
+        for member in (self.early, self.late):
+            self.assertEqual(
+                killcounts_before([member.id], self.bosses, self.snapshots[30][0]),
+                {k: v for k, v in expected.items() if k[0] == member.id},
+            )
+            self.assertEqual(
+                killcounts_before([member.id], self.bosses, self.snapshots[0][0]), {}
+            )
+
+    def test_gains_start_at_the_first_sample_inside_the_window(self):
+        start, end = self.snapshots[10][0], self.snapshots[30][0]
+        gains = compute_boss_gains(
+            [self.early.id, self.late.id], self.bosses, [GainWindow("w", start, end)]
+        )
+
+        early_start = self.killcounts(self.snapshots, start)
+        late_start = self.killcounts(self.snapshots[20:21])
+        at_end = self.killcounts(self.snapshots, end)
+        for boss in self.bosses:
+            self.assertEqual(
+                gains[(self.early.id, boss)]["w"], at_end[boss] - early_start[boss]
+            )
+            self.assertEqual(
+                gains[(self.late.id, boss)]["w"], at_end[boss] - late_start[boss]
+            )
+
+    def test_no_bosses(self):
+        self.assertEqual(killcounts_before([self.early.id], []), {})
+
+    def test_reads_each_edge_with_one_query(self):
+        window = GainWindow("w", self.snapshots[10][0], self.snapshots[30][0])
+        with self.assertNumQueries(4):
+            compute_boss_gains([self.early.id, self.late.id], self.bosses, [window])
+
+
+class DatapointWithoutBossesTests(TestCase):
+    def setUp(self):
+        self.member = GroupMember.objects.create(player_name="player")
+        self.snapshots = simulate(3, seed=7)
+        data_key = get_config().keys[0]
+        timestamp, payload = self.snapshots[1]
+        data = {
+            key: value
+            for key, value in payload[data_key].items()
+            if key not in get_config().bosses
+        }
+        self.datapoint = (timestamp, {**payload, data_key: data})
+
+    def assert_no_zero_samples(self):
+        samples = BossSample.objects.filter(group_member=self.member)
+        self.assertFalse(samples.filter(timestamp=self.datapoint[0]).exists())
+        expected = killcounts_before(
+            [self.member.id], get_config().bosses, self.snapshots[1][0]
+        )
+        self.assertEqual(
+            killcounts_before(
+                [self.member.id], get_config().bosses, self.snapshots[2][0]
+            ),
+            expected,
+        )
+
+    def test_merged_datapoint_keeps_killcounts(self):
+        replace_history(self.member, [self.snapshots[0], self.snapshots[2]])
+        self.assertEqual(merge_history(self.member, [self.datapoint]), 1)
+        self.assert_no_zero_samples()
+
+    def test_imported_datapoint_keeps_killcounts(self):
+        replace_history(
+            self.member, [self.snapshots[0], self.datapoint, self.snapshots[2]]
+        )
+        self.assert_no_zero_samples()
@@ -0,0 +1,120 @@
+# stats_app/tests/test_delta.py
+
+import random
+from django.test import SimpleTestCase, TestCase
+from stats_app.delta import REMOVED_KEY, apply_delta, apply_delta_to_key, diff_snapshot
+from stats_app.history import (
+    iter_snapshots,
+    key_series,
+    record_snapshot,
+    reencode_history,
+)
+from stats_app.models import GroupMember, PlayerHistory
+from .fakes import override_config
+from .test_history import simulate
+
+PREVIOUS = {
+    "data": {"Attack": 100, "Defence": 50, "info": {"Username": "a", "Mode": "main"}},
+    "gone": 1,
+    "same": [1, 2],
+}
+CURRENT = {
+    "data": {"Attack": 150, "Defence": 50.0, "info": {"Username": "a"}, "Magic": 7},
+    "same": [1, 2],
+    "new": {"nested": True},
+}
+
+
+class DeltaTests(SimpleTestCase):
+    def test_round_trip(self):
+        delta = diff_snapshot(PREVIOUS, CURRENT)
+        self.assertEqual(apply_delta(PREVIOUS, delta), CURRENT)
+
+    def test_delta_is_sparse(self):
+        delta = diff_snapshot(PREVIOUS, CURRENT)
+        self.assertNotIn("same", delta)
+        self.assertEqual(delta[REMOVED_KEY], ["gone"])
+        self.assertEqual(delta["data"]["info"], {REMOVED_KEY: ["Mode"]})
+        # 50 and 50.0 compare equal but aren't the same JSON value.
+        self.assertEqual(delta["data"]["Defence"], 50.0)
+        self.assertIsInstance(delta["data"]["Defence"], float)
+
+    def test_identical_snapshots_have_an_empty_delta(self):
+        self.assertEqual(diff_snapshot(CURRENT, CURRENT), {})
+
+    def test_apply_delta_leaves_the_base_alone(self):
+        base = {"data": {"Attack": 1}}
+        apply_delta(base, {"data": {"Attack": 2}})
+        self.assertEqual(base, {"data": {"Attack": 1}})
+
+    def test_random_chains_round_trip(self):
+        rng = random.Random(4)
+        keys = [f"k{i}" for i in range(8)]
+        previous = {}
+        for _ in range(200):
+            current = {
+                key: rng.choice([rng.randint(0, 3), {"x": rng.randint(0, 2)}])
+                for key in rng.sample(keys, rng.randint(0, len(keys)))
+            }
+            delta = diff_snapshot(previous, current)
+            self.assertEqual(apply_delta(previous, delta), current)
+            for key in keys:
+                self.assertEqual(
+                    apply_delta_to_key(previous.get(key), delta, (key,)),
+                    current.get(key),
+                )
+            previous = current
+
+    def test_apply_delta_to_key(self):
+        delta = diff_snapshot(PREVIOUS, CURRENT)
+        for path, before, after in (
+            (("data", "Attack"), 100, 150),
+            (("data", "Defence"), 50, 50.0),
+            (("data", "Magic"), None, 7),
+            (("data", "info", "Mode"), "main", None),
+            (("data", "info", "Username"), "a", "a"),
+            (("gone",), 1, None),
+            (("same",), [1, 2], [1, 2]),
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(apply_delta_to_key(before, delta, path), after)
+
+
+class DeltaStorageTests(TestCase):
+    def setUp(self):
+        patcher = override_config(history={"storage": "delta", "keyframe_interval": 3})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.member = GroupMember.objects.create(player_name="player")
+        self.snapshots = simulate(12)
+
+    def assert_history(self, expected):
+        expected = sorted(expected, key=lambda s: s[0])
+        self.assertEqual(list(iter_snapshots(self.member)), expected)
+        self.assertEqual(
+            list(key_series(self.member, ("data", "Attack"))),
+            [(ts, payload["data"]["Attack"]) for ts, payload in expected],
+        )
+
+    def test_in_order_snapshots_are_mostly_deltas(self):
+        for timestamp, payload in self.snapshots:
+            record_snapshot(self.member, timestamp, payload)
+        self.assert_history(self.snapshots)
+        self.assertEqual(PlayerHistory.objects.filter(is_keyframe=True).count(), 4)
+
+    def test_out_of_order_snapshots(self):
+        order = list(range(12))
+        random.Random(1).shuffle(order)
+        recorded = []
+        for i in order:
+            record_snapshot(self.member, *self.snapshots[i])
+            recorded.append(self.snapshots[i])
+            self.assert_history(recorded)
+
+    def test_reencoding_keeps_the_snapshots(self):
+        for timestamp, payload in self.snapshots:
+            record_snapshot(self.member, timestamp, payload)
+        self.assertEqual(reencode_history(self.member, storage="full"), (12, 0))
+        self.assert_history(self.snapshots)
+        reencode_history(self.member, storage="delta")
+        self.assert_history(self.snapshots)
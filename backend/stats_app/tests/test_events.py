@@ -0,0 +1,54 @@
+# stats_app/tests/test_events.py
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, TestCase, override_settings
+from stats_app import async_views, views
+from stats_app.api_handler import build_stats_projection
+from stats_app.benchmarks.generator import PlayerSimulator
+from stats_app.events import build_player_update
+from stats_app.models import GroupMember, PlayerStatsCache
+from stats_app.utils import get_config
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test_events",
+        }
+    }
+)
+class PlayerUpdateTests(TestCase):
+    def test_update_carries_the_players_leaderboard_entry(self):
+        members = {}
+        for index in range(2):
+            name = f"player{index}"
+            payload = PlayerSimulator(name, seed=index).payload()
+            members[name] = GroupMember.objects.create(player_name=name)
+            PlayerStatsCache.objects.create(
+                group_member=members[name],
+                data=payload,
+                projection=build_stats_projection(payload, get_config()),
+            )
+
+        update = build_player_update(members["player1"].id)
+        players = self.client.get("/api/player_stats/").json()["players"]
+        entry = next(p for p in players if p["player_name"] == "player1")
+
+        self.assertEqual(set(update["ranks"]), {"player0", "player1"})
+        self.assertLessEqual({"skills", "bosses", "xp_gained_week"}, set(update))
+        for field, value in update.items():
+            if field != "ranks":
+                self.assertEqual(value, entry[field], field)
+
+
+class EventsApiTests(TestCase):
+    def test_sync_view_tells_clients_not_to_stream(self):
+        response = views.events_api(RequestFactory().get("/api/events/"))
+        self.assertEqual(response.status_code, 204)
+
+    def test_async_view_streams(self):
+        request = RequestFactory().get("/api/events/")
+        response = async_to_sync(async_views.events_api)(request)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue(response.is_async)
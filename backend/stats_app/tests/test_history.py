@@ -0,0 +1,159 @@
+# stats_app/tests/test_history.py
+
+from datetime import timedelta
+from importlib import import_module
+from django.apps import apps
+from django.test import TestCase
+from stats_app.benchmarks.generator import EPOCH, PlayerSimulator
+from stats_app.history import (
+    iter_snapshots,
+    merge_history,
+    reencode_history,
+    replace_history,
+)
+from stats_app.models import (
+    BossSample,
+    DailyXPRollup,
+    GroupMember,
+    HourlyXPRollup,
+    PlayerHistory,
+    SkillSample,
+)
+from .fakes import override_config
+
+
+def simulate(count, interval=timedelta(minutes=30), seed=3):
+    """`count` consecutive (timestamp, payload) snapshots of one player."""
+    sim = PlayerSimulator("player", seed=seed, start=EPOCH, interval=interval)
+    snapshots = []
+    for _ in range(count):
+        sim.step()
+        snapshots.append((sim.timestamp, sim.payload()))
+    return snapshots
+
+
+def derived_rows(member):
+    """Everything stored for a member, minus ids, for comparing two members."""
+    return {
+        "skills": set(
+            SkillSample.objects.filter(group_member=member).values_list(
+                "skill", "timestamp", "xp", "level"
+            )
+        ),
+        "bosses": set(
+            BossSample.objects.filter(group_member=member).values_list(
+                "boss", "timestamp", "killcount"
+            )
+        ),
+        "daily": list(
+            DailyXPRollup.objects.filter(group_member=member)
+            .order_by("date")
+            .values_list(
+                "date", "first_timestamp", "last_timestamp", "first_xp", "last_xp"
+            )
+        ),
+        "hourly": list(
+            HourlyXPRollup.objects.filter(group_member=member)
+            .order_by("hour")
+            .values_list(
+                "hour", "first_timestamp", "last_timestamp", "first_xp", "last_xp"
+            )
+        ),
+    }
+
+
+class MergeHistoryTests(TestCase):
+    def setUp(self):
+        patcher = override_config(history={"storage": "delta", "keyframe_interval": 4})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.member = GroupMember.objects.create(player_name="player")
+        self.snapshots = simulate(40)
+
+    def assert_matches_rebuild(self, expected):
+        self.assertEqual(list(iter_snapshots(self.member)), expected)
+        twin = GroupMember.objects.create(player_name="twin")
+        replace_history(twin, expected)
+        self.assertEqual(derived_rows(self.member), derived_rows(twin))
+
+    def test_appends_newer_snapshots(self):
+        replace_history(self.member, self.snapshots[:30])
+        self.assertEqual(merge_history(self.member, self.snapshots[25:]), 10)
+        self.assert_matches_rebuild(self.snapshots)
+
+    def test_inserts_late_snapshots_without_rewriting_the_history(self):
+        stored = self.snapshots[::2]
+        late = self.snapshots[21:26:2]
+        replace_history(self.member, stored)
+        rows = dict(PlayerHistory.objects.values_list("id", "timestamp"))
+        first_keyframe_after = (
+            PlayerHistory.objects.filter(is_keyframe=True, timestamp__gt=late[-1][0])
+            .order_by("timestamp")
+            .values_list("id", "data")
+            .first()
+        )
+
+        self.assertEqual(merge_history(self.member, late), 3)
+
+        # Existing rows are updated in place, never deleted and recreated...
+        self.assertLessEqual(
+            rows.items(),
+            dict(PlayerHistory.objects.values_list("id", "timestamp")).items(),
+        )
+        # ...and chains past the inserted range are untouched.
+        self.assertEqual(
+            PlayerHistory.objects.filter(pk=first_keyframe_after[0])
+            .values_list("id", "data")
+            .get(),
+            first_keyframe_after,
+        )
+        self.assert_matches_rebuild(sorted(stored + late, key=lambda s: s[0]))
+
+    def test_inserts_before_the_first_snapshot(self):
+        replace_history(self.member, self.snapshots[5:])
+        self.assertEqual(merge_history(self.member, self.snapshots[:5]), 5)
+        self.assert_matches_rebuild(self.snapshots)
+
+    def test_skips_stored_timestamps(self):
+        replace_history(self.member, self.snapshots)
+        self.assertEqual(merge_history(self.member, self.snapshots[10:20]), 0)
+        self.assertEqual(PlayerHistory.objects.count(), 40)
+
+    def test_skips_snapshots_within_the_tolerance(self):
+        replace_history(self.member, self.snapshots[::2])
+        timestamp, payload = self.snapshots[10]
+        near = [(timestamp + timedelta(minutes=2), payload)]
+        self.assertEqual(
+            merge_history(self.member, near, tolerance=timedelta(minutes=5)), 0
+        )
+        self.assertEqual(merge_history(self.member, near), 1)
+
+
+class RollupMigrationTests(TestCase):
+    def test_daily_backfill_matches_rebuild_rollups(self):
+        member = GroupMember.objects.create(player_name="player")
+        replace_history(member, simulate(30, interval=timedelta(hours=3)))
+        # 0006 predates delta storage, when every row held a full snapshot.
+        reencode_history(member, storage="full")
+        expected = derived_rows(member)["daily"]
+        DailyXPRollup.objects.all().delete()
+
+        migration = import_module("stats_app.migrations.0006_dailyxprollup")
+        migration.build_daily_rollups(apps, None)
+
+        self.assertEqual(derived_rows(member)["daily"], expected)
+        self.assertGreater(len(expected), 1)
+
+    def test_hourly_backfill_matches_rebuild_rollups(self):
+        member = GroupMember.objects.create(player_name="player")
+        replace_history(member, simulate(30, interval=timedelta(minutes=20)))
+        expected = derived_rows(member)["hourly"]
+        HourlyXPRollup.objects.all().delete()
+        # A one-shot migrate reaches 0015 before backfill_samples has run.
+        SkillSample.objects.all().delete()
+
+        migration = import_module("stats_app.migrations.0015_hourlyxprollup")
+        migration.build_hourly_rollups(apps, None)
+
+        self.assertEqual(derived_rows(member)["hourly"], expected)
+        self.assertGreater(len(expected), 1)
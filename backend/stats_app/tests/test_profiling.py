@@ -0,0 +1,61 @@
+# stats_app/tests/test_profiling.py
+
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase, override_settings
+from stats_app.profiling import profile_dir, profiled
+
+
+def busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+class ProfiledTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        patcher = override_settings(PROFILE_DIR=directory, PROFILE_KEEP=50)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def functions(self, name):
+        stats = pstats.Stats(os.path.join(profile_dir(), name))
+        return {function for _, _, function in stats.stats}
+
+    def test_profiles_the_calling_thread(self):
+        with profiled("block") as profile:
+            busy_work(1000)
+        self.assertIn("busy_work", self.functions(profile["name"]))
+
+    def test_profiles_a_worker_pool(self):
+        with profiled("pool", threads=True) as profile:
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                futures = [executor.submit(busy_work, 1000) for _ in range(6)]
+                results = [future.result(timeout=10) for future in futures]
+        self.assertEqual(results, [busy_work(1000)] * 6)
+        self.assertIn("busy_work", self.functions(profile["name"]))
+
+    def test_concurrent_profiles_do_not_fail(self):
+        # Where only one profiler can be active (Python 3.12+), the second
+        # block runs unprofiled instead of raising.
+        names = []
+        barrier = threading.Barrier(2, timeout=10)
+
+        def request():
+            with profiled("request") as profile:
+                barrier.wait()
+                busy_work(1000)
+                barrier.wait()
+            names.append(profile["name"])
+
+        threads = [threading.Thread(target=request) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual(len(names), 2)
+        self.assertTrue(any(names))
@@ -0,0 +1,50 @@
+# stats_app/tests/test_projections.py
+
+from importlib import import_module
+from django.test import TestCase
+from stats_app.api_handler import build_stats_projection, refresh_projections
+from stats_app.benchmarks.generator import PlayerSimulator
+from stats_app.models import GroupMember, PlayerStatsCache
+from stats_app.utils import get_config, load_config
+
+
+class ProjectionTests(TestCase):
+    def setUp(self):
+        self.payloads = {}
+        for index in range(3):
+            name = f"player{index}"
+            member = GroupMember.objects.create(player_name=name)
+            self.payloads[name] = PlayerSimulator(name, seed=index).payload()
+            PlayerStatsCache.objects.create(
+                group_member=member, data=self.payloads[name], projection=None
+            )
+
+    def expected(self, name):
+        return build_stats_projection(self.payloads[name], get_config())
+
+    def test_stale_projections_are_rebuilt_in_bulk_and_saved(self):
+        PlayerStatsCache.objects.filter(group_member__player_name="player0").update(
+            projection={"layout": "old"}
+        )
+        caches = list(PlayerStatsCache.objects.defer("data"))
+
+        # One read of the stale rows' data, then one write per row.
+        with self.assertNumQueries(4):
+            refresh_projections(caches)
+        with self.assertNumQueries(0):
+            refresh_projections(caches)
+
+        for cache in PlayerStatsCache.objects.select_related("group_member"):
+            self.assertEqual(
+                cache.projection, self.expected(cache.group_member.player_name)
+            )
+
+    def test_migration_parser_matches_build_stats_projection(self):
+        migration = import_module(
+            "stats_app.migrations.0013_playerstatscache_projection"
+        )
+        for name, payload in self.payloads.items():
+            self.assertEqual(
+                migration.project(payload, load_config()), self.expected(name)
+            )
+        self.assertIsNone(migration.project({}, load_config()))
@@ -0,0 +1,110 @@
+# stats_app/tests/test_ratelimit.py
+
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from stats_app.api_handler import refresh_player_cache
+from stats_app.models import GroupMember, RateLimitSlot
+from stats_app.ratelimit import RateLimiter, Reservation
+from stats_app.upstream import TempleClient, set_client
+from .fakes import FakeSession
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter("test", limit=5, period=60)
+
+    def expire_all(self):
+        RateLimitSlot.objects.filter(name="test").update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_try_acquire_takes_tokens_up_to_the_limit(self):
+        for _ in range(5):
+            self.assertTrue(self.limiter.try_acquire())
+        self.assertFalse(self.limiter.try_acquire())
+        self.assertEqual(RateLimitSlot.objects.filter(name="test").count(), 5)
+
+    def test_try_acquire_many_is_all_or_nothing(self):
+        self.assertTrue(self.limiter.try_acquire(2))
+        self.assertTrue(self.limiter.try_acquire(2))
+        self.assertFalse(self.limiter.try_acquire(2))
+        self.assertEqual(self.limiter.remaining(), 1)
+        self.assertTrue(self.limiter.try_acquire())
+
+    def test_try_acquire_more_than_the_limit_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.limiter.try_acquire(6)
+
+    def test_tokens_return_once_expired(self):
+        self.assertTrue(self.limiter.try_acquire(5))
+        self.assertEqual(self.limiter.remaining(), 0)
+        self.expire_all()
+        self.assertEqual(self.limiter.remaining(), 5)
+        self.assertTrue(self.limiter.try_acquire(5))
+
+    def test_limiters_do_not_share_tokens(self):
+        other = RateLimiter("other", limit=5, period=60)
+        self.assertTrue(self.limiter.try_acquire(5))
+        self.assertEqual(other.remaining(), 5)
+
+    def test_remaining_counts_free_tokens(self):
+        self.assertEqual(self.limiter.remaining(), 5)
+        self.limiter.try_acquire(3)
+        self.assertEqual(self.limiter.remaining(), 2)
+
+    def test_acquire_without_timeout_does_not_wait(self):
+        self.limiter.try_acquire(5)
+        self.assertFalse(self.limiter.acquire(timeout=0))
+
+    def test_acquire_waits_for_tokens_to_return(self):
+        limiter = RateLimiter("test", limit=2, period=0.2)
+        self.assertTrue(limiter.acquire(2))
+        self.assertFalse(limiter.acquire(timeout=0))
+        self.assertTrue(limiter.acquire(2, timeout=2))
+
+    def test_reset_in_waits_for_enough_tokens(self):
+        self.assertEqual(self.limiter.reset_in(), 0.0)
+        self.limiter.try_acquire(4)
+        self.assertEqual(self.limiter.reset_in(), 0.0)
+        self.assertGreater(self.limiter.reset_in(2), 59)
+
+    def test_reserve_takes_every_token_at_once(self):
+        reservation = self.limiter.reserve(2)
+        self.assertIsInstance(reservation, Reservation)
+        self.assertEqual(self.limiter.remaining(), 3)
+        self.limiter.reserve(2)
+        self.assertIsNone(self.limiter.reserve(2))
+        self.assertEqual(self.limiter.remaining(), 1)
+
+    def test_reservation_hands_out_reserved_tokens_first(self):
+        reservation = self.limiter.reserve(2)
+        self.assertTrue(reservation.acquire())
+        self.assertTrue(reservation.acquire())
+        self.assertEqual(self.limiter.remaining(), 3)
+        # A retry past the reservation takes a fresh token.
+        self.assertTrue(reservation.acquire())
+        self.assertEqual(self.limiter.remaining(), 2)
+
+
+class RefreshBudgetTests(TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter("test", limit=5, period=60)
+        self.session = FakeSession()
+        self.previous = set_client(
+            TempleClient(session=self.session, limiter=self.limiter)
+        )
+
+    def tearDown(self):
+        set_client(self.previous)
+
+    def test_refreshes_reserve_both_calls_up_front(self):
+        for name in ("alice", "bob", "carol"):
+            GroupMember.objects.create(player_name=name)
+
+        results = [refresh_player_cache(name) for name in ("alice", "bob", "carol")]
+
+        self.assertEqual(results, [True, True, False])
+        # The third refresh made no calls, so its budget isn't wasted.
+        self.assertEqual(len(self.session.urls), 4)
+        self.assertEqual(self.limiter.remaining(), 1)
@@ -0,0 +1,34 @@
+# stats_app/tests/test_refresh_cache.py
+
+import time
+from io import StringIO
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from stats_app.models import GroupMember
+from stats_app.upstream import TempleClient, set_client
+from .fakes import FakeSession
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class RefreshCacheTests(TransactionTestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.previous = set_client(TempleClient(session=self.session))
+        for name in ("alice", "bob", "carol"):
+            GroupMember.objects.create(player_name=name)
+
+    def tearDown(self):
+        set_client(self.previous)
+
+    def test_deadline_bounds_refreshes_waiting_for_budget(self):
+        out = StringIO()
+        started = time.monotonic()
+        call_command("refresh_cache", "--deadline", "1", stdout=out)
+
+        # The third refresh waits for budget only until the deadline, not
+        # for the default --rate-limit-wait.
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertIn("Success: 2, Failed: 1, Skipped: 0", out.getvalue())
+        self.assertEqual(len(self.session.urls), 4)
@@ -0,0 +1,96 @@
+# stats_app/tests/test_scheduler.py
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from stats_app.models import GroupMember, RefreshSchedule
+from stats_app.ratelimit import get_upstream_limiter
+from stats_app.scheduler import IDLE_AFTER, MIN_INTERVAL, pick_early_refresh
+from stats_app.upstream import TempleClient, set_client
+from .fakes import FakeSession
+
+
+class PickEarlyRefreshTests(TestCase):
+    def schedule(self, name, xp_per_hour=0, due_in=timedelta(hours=1), **fields):
+        member = GroupMember.objects.create(
+            player_name=name, in_group=fields.pop("in_group", True)
+        )
+        fields.setdefault("last_changed_at", timezone.now() - timedelta(hours=1))
+        return RefreshSchedule.objects.create(
+            group_member=member,
+            next_refresh_at=timezone.now() + due_in,
+            xp_per_hour=xp_per_hour,
+            **fields,
+        )
+
+    def test_prefers_the_fastest_gainer_then_the_soonest_due(self):
+        self.schedule("slow", xp_per_hour=10)
+        self.schedule("fast_later", xp_per_hour=500, due_in=timedelta(hours=2))
+        self.schedule("fast_sooner", xp_per_hour=500, due_in=timedelta(hours=1))
+        self.assertEqual(pick_early_refresh().group_member.player_name, "fast_sooner")
+
+    def test_skips_recent_failing_and_departed_members(self):
+        now = timezone.now()
+        self.schedule("recent", 900, last_refreshed_at=now - MIN_INTERVAL / 2)
+        self.schedule("failing", 800, consecutive_failures=2)
+        self.schedule("left", 700, in_group=False)
+        self.assertIsNone(pick_early_refresh(now))
+        self.schedule("eligible", 1, last_refreshed_at=now - MIN_INTERVAL)
+        self.assertEqual(pick_early_refresh(now).group_member.player_name, "eligible")
+
+    def test_never_picks_idle_members(self):
+        now = timezone.now()
+        self.schedule("no_gains", 0)
+        self.schedule("unchanged", 900, last_changed_at=now - IDLE_AFTER * 2)
+        self.schedule("never_changed", 900, last_changed_at=None)
+        self.assertIsNone(pick_early_refresh(now))
+
+
+class RunSchedulerTests(TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.previous = set_client(TempleClient(session=self.session))
+
+    def tearDown(self):
+        set_client(self.previous)
+
+    def run_until_sleep(self):
+        """Runs the scheduler until it first has to sleep."""
+        with mock.patch("time.sleep", side_effect=KeyboardInterrupt):
+            call_command("run_scheduler", stdout=StringIO())
+
+    def test_spare_budget_goes_to_early_refreshes(self):
+        later = timezone.now() + timedelta(hours=1)
+        for name in ("alice", "bob", "carol"):
+            member = GroupMember.objects.create(player_name=name)
+            RefreshSchedule.objects.create(
+                group_member=member,
+                next_refresh_at=later,
+                xp_per_hour=1000,
+                last_changed_at=timezone.now(),
+            )
+
+        self.run_until_sleep()
+
+        # Five calls a minute cover two refreshes of two calls each.
+        self.assertEqual(len(self.session.urls), 4)
+        refreshed = RefreshSchedule.objects.filter(last_refreshed_at__isnull=False)
+        self.assertEqual(refreshed.count(), 2)
+        self.assertEqual(get_upstream_limiter().remaining(), 1)
+
+    def test_once_refreshes_only_due_members(self):
+        now = timezone.now()
+        for name, due in (("alice", now), ("bob", now + timedelta(hours=1))):
+            member = GroupMember.objects.create(player_name=name)
+            RefreshSchedule.objects.create(group_member=member, next_refresh_at=due)
+
+        call_command("run_scheduler", "--once", stdout=StringIO())
+
+        refreshed = RefreshSchedule.objects.filter(last_refreshed_at__isnull=False)
+        self.assertEqual(
+            list(refreshed.values_list("group_member__player_name", flat=True)),
+            ["alice"],
+        )
@@ -0,0 +1,70 @@
+# stats_app/tests/test_upstream.py
+
+import time
+from django.test import TestCase
+from requests.exceptions import ConnectionError, Timeout
+from stats_app.ratelimit import RateLimiter
+from stats_app.upstream import TempleClient
+from .fakes import FakeSession
+
+
+class FailingSession(FakeSession):
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        raise ConnectionError("connection refused")
+
+
+class RecordingSession(FakeSession):
+    def get(self, url, timeout=None):
+        self.timeouts.append(timeout)
+        return super().get(url, timeout)
+
+
+class DeadlineTests(TestCase):
+    def temple(self, session, **kwargs):
+        self.sleeps = []
+        return TempleClient(
+            session=session,
+            limiter=RateLimiter("test", limit=50),
+            connect_timeout=5,
+            read_timeout=10,
+            sleep=self.sleeps.append,
+            **kwargs,
+        )
+
+    def test_timeouts_are_cut_to_the_time_left(self):
+        session = RecordingSession()
+        session.timeouts = []
+        self.temple(session).player_stats("player", deadline=time.monotonic() + 2)
+        connect, read = session.timeouts[0]
+        self.assertLessEqual(connect, 2)
+        self.assertLessEqual(read, 2)
+
+    def test_no_deadline_keeps_the_configured_timeouts(self):
+        session = RecordingSession()
+        session.timeouts = []
+        self.temple(session).player_stats("player")
+        self.assertEqual(session.timeouts, [(5, 10)])
+
+    def test_passed_deadline_makes_no_call(self):
+        session = FakeSession()
+        with self.assertRaises(Timeout):
+            self.temple(session).player_stats("player", deadline=time.monotonic())
+        self.assertEqual(session.urls, [])
+
+    def test_no_retry_past_the_deadline(self):
+        session = FailingSession()
+        client = self.temple(session, max_retries=3, backoff_base=5, backoff_max=5)
+        client.backoff_delay = lambda attempt: 5
+        with self.assertRaises(ConnectionError):
+            client.player_stats("player", deadline=time.monotonic() + 1)
+        self.assertEqual(len(session.urls), 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_retries_within_the_deadline(self):
+        session = FailingSession()
+        client = self.temple(session, max_retries=2)
+        client.backoff_delay = lambda attempt: 0.01
+        with self.assertRaises(ConnectionError):
+            client.player_stats("player", deadline=time.monotonic() + 60)
+        self.assertEqual(len(session.urls), 3)
@@ -0,0 +1,81 @@
+# stats_app/tests/test_utils.py
+
+import json
+import os
+import shutil
+import tempfile
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+from stats_app.utils import ConfigRegistry
+
+
+class ConfigRegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, "config.json")
+        self.registry = ConfigRegistry(self.path, check_interval=0)
+        self.mtime = 1_000_000_000
+
+    def write(self, content):
+        with open(self.path, "w") as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        # Each write gets a distinct mtime, however quickly they follow.
+        self.mtime += 1
+        os.utime(self.path, (self.mtime, self.mtime))
+
+    def test_reloads_when_the_file_changes(self):
+        self.write({"skills": ["Attack"]})
+        self.assertEqual(self.registry.get().skills, ("Attack",))
+        self.write({"skills": ["Attack", "Defence"]})
+        self.assertEqual(self.registry.get().skills, ("Attack", "Defence"))
+
+    def test_first_load_errors_are_fatal(self):
+        self.write("{not json")
+        with self.assertRaises(ValueError):
+            self.registry.get()
+        self.write({"skills": "Attack"})
+        with self.assertRaises(ImproperlyConfigured):
+            self.registry.get()
+
+    def test_missing_file_at_first_load_uses_defaults(self):
+        self.assertEqual(self.registry.get().skills, ())
+
+    def test_keeps_the_last_good_config_after_a_bad_edit(self):
+        self.write({"skills": ["Attack"]})
+        good = self.registry.get()
+        for bad in ('{"skills": ["Att', {"skills": "Attack"}):
+            self.write(bad)
+            with self.assertLogs("stats_app.config", "ERROR"):
+                self.assertIs(self.registry.get(), good)
+            # The bad file is only reported once, not on every check.
+            with self.assertNoLogs("stats_app.config", "ERROR"):
+                self.assertIs(self.registry.get(), good)
+        self.write({"skills": ["Defence"]})
+        self.assertEqual(self.registry.get().skills, ("Defence",))
+
+    def test_keeps_the_last_good_config_if_the_file_disappears(self):
+        self.write({"skills": ["Attack"]})
+        good = self.registry.get()
+        os.remove(self.path)
+        with self.assertLogs("stats_app.config", "ERROR"):
+            self.assertIs(self.registry.get(), good)
+
+    def test_reload_rereads_the_file(self):
+        self.write({"skills": ["Attack"]})
+        self.registry.get()
+        mtime = self.mtime
+        self.write({"skills": ["Defence"]})
+        os.utime(self.path, (mtime, mtime))
+        self.assertEqual(self.registry.get().skills, ("Attack",))
+        self.registry.reload()
+        self.assertEqual(self.registry.get().skills, ("Defence",))
+
+    def test_reload_skips_the_check_interval(self):
+        registry = ConfigRegistry(self.path, check_interval=3600)
+        self.write({"skills": ["Attack"]})
+        self.assertEqual(registry.get().skills, ("Attack",))
+        self.write({"skills": ["Defence"]})
+        self.assertEqual(registry.get().skills, ("Attack",))
+        registry.reload()
+        self.assertEqual(registry.get().skills, ("Defence",))
@@ -0,0 +1,39 @@
+# stats_app/tests/test_views.py
+
+from django.test import TestCase, override_settings
+from stats_app.api_handler import build_stats_projection
+from stats_app.benchmarks.generator import PlayerSimulator
+from stats_app.models import GroupMember, PlayerStatsCache
+from stats_app.utils import get_config
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test_views",
+        }
+    }
+)
+class PlayerStatsFormatTests(TestCase):
+    def setUp(self):
+        for index in range(2):
+            name = f"player{index}"
+            payload = PlayerSimulator(name, seed=index).payload()
+            PlayerStatsCache.objects.create(
+                group_member=GroupMember.objects.create(player_name=name),
+                data=payload,
+                projection=build_stats_projection(payload, get_config()),
+            )
+
+    def test_columnar_format_has_the_same_skills(self):
+        players = self.client.get("/api/player_stats/").json()["players"]
+        columnar = self.client.get("/api/player_stats/?format=columnar").json()
+
+        self.assertEqual(columnar["skills"], list(players[0]["skills"]))
+        xp = {p["player_name"]: p["skills"]["xp"] for p in columnar["players"]}
+        for player in players:
+            self.assertEqual(
+                xp[player["player_name"]],
+                [skill["xp"] for skill in player["skills"].values()],
+            )
@@ -0,0 +1,192 @@
+# stats_app/upstream.py
+
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+from .ratelimit import RateLimitExceeded, get_upstream_limiter, record_api_call
+from .utils import get_config
+
+# Status codes worth retrying: rate limited or a transient server failure.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TempleClient:
+    """
+    Client for the TempleOSRS API. Reuses pooled keep-alive connections,
+    takes a rate-limit token before every attempt, and retries transient
+    failures with jittered exponential backoff, honouring Retry-After.
+    """
+
+    def __init__(
+        self,
+        base_url="https://templeosrs.com",
+        session=None,
+        connect_timeout=None,
+        read_timeout=None,
+        max_retries=None,
+        backoff_base=None,
+        backoff_max=None,
+        pool_size=10,
+        limiter=None,
+        sleep=time.sleep,
+    ):
+        upstream = get_config().upstream
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout or upstream["connect_timeout"]
+        self.read_timeout = read_timeout or upstream["read_timeout"]
+        self.max_retries = (
+            max_retries if max_retries is not None else upstream["max_retries"]
+        )
+        self.backoff_base = backoff_base or upstream["backoff_base"]
+        self.backoff_max = backoff_max or upstream["backoff_max"]
+        self.limiter = limiter
+        self.sleep = sleep
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def reserve(self, calls, timeout=0):
+        """
+        Takes the rate-limit budget for `calls` upcoming calls at once,
+        waiting up to `timeout` seconds. Returns a Reservation to pass to
+        them as `limiter`, or None if the budget didn't free up in time.
+        """
+        return (self.limiter or get_upstream_limiter()).reserve(calls, timeout=timeout)
+
+    def add_datapoint(
+        self, player_name, rate_limit_timeout=0, limiter=None, deadline=None
+    ):
+        """Asks Temple to record a fresh datapoint for the player."""
+        self.get(
+            f"/php/add_datapoint.php?player={quote(player_name)}",
+            rate_limit_timeout=rate_limit_timeout,
+            limiter=limiter,
+            deadline=deadline,
+        )
+
+    def player_stats(
+        self, player_name, rate_limit_timeout=0, limiter=None, deadline=None
+    ):
+        """Returns the player's current stats, including bosses."""
+        return self.get(
+            f"/api/player_stats.php?player={quote(player_name)}&bosses=1",
+            rate_limit_timeout=rate_limit_timeout,
+            limiter=limiter,
+            deadline=deadline,
+        ).json()
+
+    def player_datapoints(
+        self, player_name, seconds=10000000000, rate_limit_timeout=0, limiter=None
+    ):
+        """
+        Returns the player's datapoints, including bosses, from the last
+        `seconds` seconds.
+        """
+        return self.get(
+            f"/api/player_datapoints.php?player={quote(player_name)}"
+            f"&time={int(seconds)}&bosses=1",
+            rate_limit_timeout=rate_limit_timeout,
+            limiter=limiter,
+        ).json()
+
+    def get(self, path, rate_limit_timeout=0, limiter=None, deadline=None):
+        """
+        GETs `path`, retrying transient failures. Takes each attempt's token
+        from `limiter` (e.g. a Reservation) or the client's limiter. Raises
+        RateLimitExceeded if no call budget frees up in time, or the last
+        requests exception once retries are exhausted.
+
+        `deadline`, a time.monotonic() value, bounds the whole call: budget
+        waits, connect and read timeouts are cut to the time left, no retry
+        starts past it, and Timeout is raised once it has passed.
+        """
+        url = f"{self.base_url}{path}"
+        limiter = limiter or self.limiter or get_upstream_limiter()
+        attempt = 0
+        while True:
+            wait = rate_limit_timeout
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            if not limiter.acquire(timeout=wait):
+                raise RateLimitExceeded(url)
+
+            timeout = (self.connect_timeout, self.read_timeout)
+            if deadline is not None:
+                time_left = deadline - time.monotonic()
+                if time_left <= 0:
+                    raise Timeout(f"Deadline passed before GET {url}")
+                timeout = tuple(min(t, time_left) for t in timeout)
+            record_api_call()
+
+            retry_after = None
+            try:
+                response = self.session.get(url, timeout=timeout)
+                if response.status_code in RETRY_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                response.raise_for_status()
+                return response
+            except (ConnectionError, Timeout, HTTPError) as e:
+                status = getattr(e.response, "status_code", None)
+                if isinstance(e, HTTPError) and status not in RETRY_STATUSES:
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                if retry_after is not None:
+                    if retry_after > self.backoff_max:
+                        raise
+                    delay = max(delay, retry_after)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                self.sleep(delay)
+                attempt += 1
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+def parse_retry_after(value):
+    """Returns a Retry-After header (seconds or HTTP date) in seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide TempleClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TempleClient()
+    return _client
+
+
+def set_client(client):
+    """Replaces the process-wide client (e.g. with a stub) and returns the old one."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
@@ -1,12 +1,33 @@
 # stats_app/urls.py
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the same URLs are served by the async variants.
+api = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
+    path(
+        "api/history_data/",
+        api.multi_skill_history_data_api,
+        name="multi_skill_history_data_api",
+    ),
     path(
         "api/history_data/<str:skill_name>/",
-        views.skill_history_data_api,
+        api.skill_history_data_api,
         name="skill_history_data_api",
     ),
-    path("api/player_stats/", views.player_stats_api, name="player_stats_api"),
+    path("api/player_stats/", api.player_stats_api, name="player_stats_api"),
+    path("api/gains/", api.gains_api, name="gains_api"),
+    path(
+        "api/boss_leaderboard/",
+        api.boss_leaderboard_api,
+        name="boss_leaderboard_api",
+    ),
+    path(
+        "api/boss_history_data/<str:boss_name>/",
+        api.boss_history_data_api,
+        name="boss_history_data_api",
+    ),
+    path("api/events/", api.events_api, name="events_api"),
 ]
@@ -1,28 +1,208 @@
+import copy
+import hashlib
 import os
 import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from django.core.exceptions import ImproperlyConfigured
+
+HISTORY_STORAGE_MODES = ("full", "delta")
+UPSTREAM_DEFAULTS = {
+    "connect_timeout": 5,
+    "read_timeout": 10,
+    "max_retries": 3,
+    "backoff_base": 0.5,
+    "backoff_max": 30,
+}
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+logger = logging.getLogger("stats_app.config")
+# Never equal to a file's mtime, so the next check re-reads the file.
+_STALE = object()
+
+
+@dataclass(frozen=True)
+class StatsConfig:
+    """Immutable, precompiled view of config.json."""
+
+    raw: MappingProxyType
+    skills: tuple
+    skill_keys: tuple
+    skill_rank_keys: tuple
+    skill_level_keys: tuple
+    bosses: tuple
+    boss_keys: tuple
+    keys: tuple
+    max_requests_per_minute: int
+    history_storage: str
+    keyframe_interval: int
+    upstream: MappingProxyType
+    layout: str
+
+    @classmethod
+    def from_dict(cls, config):
+        validate_config(config)
+        skills = tuple(config.get("skills", []))
+        bosses = tuple(config.get("bosses", []))
+        keys = config.get("keys", {})
+        return cls(
+            raw=MappingProxyType(config),
+            skills=skills,
+            skill_keys=tuple(skill.lower() for skill in skills),
+            skill_rank_keys=tuple(f"{skill}_rank" for skill in skills),
+            skill_level_keys=tuple(f"{skill}_level" for skill in skills),
+            bosses=bosses,
+            boss_keys=tuple(boss.lower() for boss in bosses),
+            keys=(
+                keys.get("data", "data"),
+                keys.get("info", "info"),
+                keys.get("overall", "Overall"),
+                keys.get("overall_rank", "Overall_rank"),
+                keys.get("overall_level", "Overall_level"),
+            ),
+            max_requests_per_minute=config.get("api_rate_limit", {}).get(
+                "max_requests_per_minute", 5
+            ),
+            history_storage=config.get("history", {}).get("storage", "full"),
+            keyframe_interval=config.get("history", {}).get("keyframe_interval", 48),
+            upstream=MappingProxyType(
+                {**UPSTREAM_DEFAULTS, **config.get("upstream", {})}
+            ),
+            layout=config_layout(skills, bosses, keys),
+        )
+
+
+def config_layout(skills, bosses, keys):
+    """
+    A fingerprint of the configured skill, boss and key names. Data derived
+    from them and stored (e.g. PlayerStatsCache.projection) records it, so a
+    config change can be detected.
+    """
+    names = json.dumps([skills, bosses, keys], sort_keys=True)
+    return hashlib.sha1(names.encode("utf-8")).hexdigest()[:12]
+
+
+def validate_config(config):
+    """Raises ImproperlyConfigured if config.json has the wrong shape."""
+    if not isinstance(config, dict):
+        raise ImproperlyConfigured("config.json must contain a JSON object.")
+    for section in ("skills", "bosses"):
+        names = config.get(section, [])
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise ImproperlyConfigured(
+                f"config.json '{section}' must be a list of names."
+            )
+    for section in ("keys", "api_rate_limit", "history", "upstream"):
+        if not isinstance(config.get(section, {}), dict):
+            raise ImproperlyConfigured(f"config.json '{section}' must be an object.")
+    max_requests = config.get("api_rate_limit", {}).get("max_requests_per_minute", 5)
+    if not isinstance(max_requests, int) or max_requests < 1:
+        raise ImproperlyConfigured(
+            "config.json 'max_requests_per_minute' must be a positive integer."
+        )
+    for key, value in config.get("upstream", {}).items():
+        if key not in UPSTREAM_DEFAULTS or not isinstance(value, (int, float)):
+            raise ImproperlyConfigured(
+                f"config.json upstream '{key}' must be one of "
+                f"{tuple(UPSTREAM_DEFAULTS)} with a numeric value."
+            )
+    history = config.get("history", {})
+    if history.get("storage", "full") not in HISTORY_STORAGE_MODES:
+        raise ImproperlyConfigured(
+            f"config.json history 'storage' must be one of {HISTORY_STORAGE_MODES}."
+        )
+    keyframe_interval = history.get("keyframe_interval", 48)
+    if not isinstance(keyframe_interval, int) or keyframe_interval < 1:
+        raise ImproperlyConfigured(
+            "config.json history 'keyframe_interval' must be a positive integer."
+        )
+
+
+class ConfigRegistry:
+    """
+    Process-wide holder for the parsed config. The file is parsed once and
+    only re-read when its mtime changes; the mtime itself is checked at most
+    every `check_interval` seconds.
+
+    Only the first load is fatal. If a later edit leaves the file missing,
+    half-written or invalid, the error is logged and the last good config
+    stays in use until the file changes again.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._config = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def get(self):
+        config = self._config
+        if (
+            config is not None
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return config
+        with self._lock:
+            self._checked_at = time.monotonic()
+            mtime = self._read_mtime()
+            if self._config is None:
+                self._config = StatsConfig.from_dict(self._read(missing_ok=True))
+                self._mtime = mtime
+            elif mtime != self._mtime:
+                # Don't retry a bad file on every check, only once it changes.
+                self._mtime = mtime
+                try:
+                    self._config = StatsConfig.from_dict(self._read())
+                except (OSError, ValueError, ImproperlyConfigured) as e:
+                    logger.error(
+                        "Keeping the last good config; %s failed to load: %s",
+                        self.path,
+                        e,
+                    )
+            return self._config
+
+    def reload(self):
+        """Forces the next get() to re-read the file, even within the interval."""
+        with self._lock:
+            self._mtime = _STALE
+            self._checked_at = 0.0
+
+    def _read_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read(self, missing_ok=False):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            if not missing_ok:
+                raise
+            return {}
+
+
+config_registry = ConfigRegistry(CONFIG_PATH)
+
+
+def get_config():
+    """Returns the current StatsConfig."""
+    return config_registry.get()
 
 
 def get_keys():
-    config = load_config()
-    keys = config.get("keys", {})
-    return (
-        keys.get("data", "data"),
-        keys.get("info", "info"),
-        keys.get("overall", "Overall"),
-        keys.get("overall_rank", "Overall_rank"),
-        keys.get("overall_level", "Overall_level"),
-    )
+    return get_config().keys
 
 
 def load_config():
-    """Loads the configuration from a JSON file."""
-    try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(base_dir, "config.json")
-        with open(config_path, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    """Returns a copy of the raw configuration loaded from the JSON file."""
+    return copy.deepcopy(dict(get_config().raw))
 
 
 def carry_forward(new_value, prev_value):
@@ -1,28 +1,127 @@
 # stats_app/views.py
 
 
-from django.http import JsonResponse
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_GET
-from django.db.models.functions import Cast
-from django.db.models import IntegerField
-from django.db.models.fields.json import KeyTextTransform
-from .models import GroupMember, PlayerHistory
-from .api_handler import get_player_stats_from_cache, load_config
-from .utils import get_keys
-from datetime import datetime, timedelta
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+from .models import BossSample, GroupMember, SkillSample
+from .downsample import lttb
+from .events import latest_event_id
+from .api_handler import get_player_stats_from_cache, refresh_projections
+from .bosses import boss_series_points, compute_boss_gains, killcounts_before
+from .gains import (
+    GainWindow,
+    compute_gains,
+    day_window,
+    default_windows,
+    local_midnight,
+)
+from .middleware import record_timing
+from .response_cache import cached_json_response
+from .rollups import utc_hour
+from .utils import get_config
+from .xpmath import xp_to_levels
+
+# Default and upper bound on the points returned per history series.
+DEFAULT_MAX_POINTS = 1000
+MAX_POINTS_LIMIT = 10000
+# Named gains_api periods: the number of local days ending today.
+GAIN_PERIODS = {"today": 1, "week": 7, "month": 30, "year": 365}
 
 
 @require_GET
 def player_stats_api(request):
+    return player_stats_response(request)
+
+
+def player_stats_response(request):
+    """
+    Serves the leaderboard in the format requested by `format`: "json" (the
+    default) or "columnar", see build_columnar_player_stats_body.
+    """
+    fmt = request.GET.get("format", "json")
+    if fmt not in PLAYER_STATS_FORMATS:
+        return JsonResponse(
+            {"error": f"format must be one of: {', '.join(PLAYER_STATS_FORMATS)}"},
+            status=400,
+        )
+    name = "player_stats" if fmt == "json" else f"player_stats_{fmt}"
+    return cached_json_response(request, name, PLAYER_STATS_FORMATS[fmt])
+
+
+def build_player_stats_body():
+    """Builds the serialized leaderboard served by player_stats_api."""
+    data = []
+    for p in leaderboard_players():
+        entry = player_summary(p)
+        entry["skills"] = {
+            k: {"rank": v.rank, "level": v.level, "xp": v.xp}
+            for k, v in p.skills.items()
+        }
+        entry["bosses"] = {k: {"killcount": v.killcount} for k, v in p.bosses.items()}
+        data.append(entry)
+
+    with record_timing("serialize"):
+        return json.dumps({"players": data}, cls=DjangoJSONEncoder)
+
+
+def build_columnar_player_stats_body():
+    """
+    Builds the leaderboard in the compact columnar format: the skill and boss
+    name tables are sent once, and each player's skills and bosses as integer
+    arrays in table order. Bosses are not sorted by killcount; clients sort.
+    """
+    config = get_config()
+    # In projection order; config.json may list Overall among the skills.
+    skill_keys = list(dict.fromkeys([*config.skill_keys, "overall"]))
+    boss_keys = list(config.boss_keys)
+
+    data = []
+    for p in leaderboard_players():
+        skills = [p.skills[key] for key in skill_keys]
+        entry = player_summary(p)
+        entry["skills"] = {
+            "rank": [s.rank for s in skills],
+            "level": [s.level for s in skills],
+            "xp": [s.xp for s in skills],
+        }
+        entry["bosses"] = {"killcount": [p.bosses[key].killcount for key in boss_keys]}
+        data.append(entry)
+
+    with record_timing("serialize"):
+        return COLUMNAR_ENCODER.encode(
+            {
+                "format": "columnar",
+                "skills": skill_keys,
+                "bosses": boss_keys,
+                "players": data,
+            }
+        )
+
+
+def leaderboard_players():
+    """Returns every cached player's annotated stats, ranked and podium-ordered."""
     from .models import PlayerStatsCache
 
-    skill_names = load_config().get("skills", [])
+    skill_names = get_config().skills
     all_players = list(GroupMember.objects.all().order_by("player_name"))
-    caches = PlayerStatsCache.objects.select_related("group_member").in_bulk(
-        [p.id for p in all_players], field_name="group_member_id"
+    caches = (
+        PlayerStatsCache.objects.select_related("group_member")
+        .defer("data")
+        .in_bulk([p.id for p in all_players], field_name="group_member_id")
     )
+    refresh_projections(caches.values())
+    gains = compute_gains([p.id for p in all_players], skill_names, default_windows())
     all_players_data = [
-        annotate_player_stats(player, skill_names, cache=caches.get(player.id))
+        annotate_player_stats(player, gains[player.id], cache=caches.get(player.id))
         for player in all_players
     ]
     all_players_data = [p for p in all_players_data if p]
@@ -30,81 +129,33 @@ def player_stats_api(request):
     for idx, player in enumerate(all_players_data):
         player.rank = idx + 1
 
-    players_ordered = order_players_for_podium(all_players_data)
+    return order_players_for_podium(all_players_data)
 
-    data = []
-    for p in players_ordered:
-        # Convert skills and bosses to plain dicts
-        skills = {
-            k: v if isinstance(v, dict) else v.__dict__
-            for k, v in getattr(p, "skills", {}).items()
-        }
-        bosses = {
-            k: v if isinstance(v, dict) else v.__dict__
-            for k, v in getattr(p, "bosses", {}).items()
-        }
 
-        # Optionally, filter out any non-serializable fields from v.__dict__ if needed
+def player_summary(p):
+    """The leaderboard fields other than skills and bosses, in response order."""
+    return {
+        "player_name": p.player_name,
+        "rank": p.rank,
+        "timestamp": p.timestamp,
+        "skills": None,
+        "bosses": None,
+        "xp_gained_today": p.xp_gained_today,
+        "top_skill_today": p.top_skill_today,
+        "skill_xp_gained_today": p.skill_xp_gained_today,
+        "xp_gained_week": p.xp_gained_week,
+        "top_skill_week": p.top_skill_week,
+        "skill_xp_gained_week": p.skill_xp_gained_week,
+    }
 
-        data.append(
-            {
-                "player_name": p.player_name,
-                "rank": p.rank,
-                "timestamp": getattr(p, "timestamp", None),
-                "skills": skills,
-                "bosses": bosses,
-                "xp_gained_today": getattr(p, "xp_gained_today", 0),
-                "top_skill_today": getattr(p, "top_skill_today", None),
-                "skill_xp_gained_today": getattr(p, "skill_xp_gained_today", []),
-                "xp_gained_week": getattr(p, "xp_gained_week", 0),
-                "top_skill_week": getattr(p, "top_skill_week", None),
-                "skill_xp_gained_week": getattr(p, "skill_xp_gained_week", []),
-            }
-        )
 
-    return JsonResponse({"players": data})
-
-
-def get_xp_gained_period(player, skill_names, days=1):
-    """
-    Returns a tuple: (total_xp_gained, sorted_skill_xp_gained)
-    for the last `days` days (1 = today, 7 = last 7 days).
-    """
-    today = datetime.now().date()
-    start_date = today - timedelta(days=days - 1)
-    histories = PlayerHistory.objects.filter(
-        group_member=player, timestamp__date__gte=start_date, timestamp__date__lte=today
-    ).order_by("timestamp")
-    skill_gains = {}
-    DATA_KEY, _, OVERALL_KEY, _, _ = get_keys()
-    if histories.exists():
-        first = getattr(histories.first(), "data", {}).get(DATA_KEY, {})
-        last = getattr(histories.last(), "data", {}).get(DATA_KEY, {})
-        for skill in skill_names:
-            try:
-                first_xp = int(first.get(skill.capitalize(), 0) or 0)
-                last_xp = int(last.get(skill.capitalize(), 0) or 0)
-            except (ValueError, TypeError):
-                first_xp = 0
-                last_xp = 0
-            skill_gains[skill] = last_xp - first_xp
-        total = skill_gains.get(OVERALL_KEY, 0)
-    else:
-        for skill in skill_names:
-            skill_gains[skill] = 0
-        total = 0
-
-    sorted_skill_gains = sorted(
-        (
-            (skill, xp)
-            for skill, xp in skill_gains.items()
-            if skill.lower() != "overall" and xp != 0
-        ),
-        key=lambda item: item[1],
-        reverse=True,
-    )
-
-    return total, sorted_skill_gains
+PLAYER_STATS_FORMATS = {
+    "json": build_player_stats_body,
+    "columnar": build_columnar_player_stats_body,
+}
+# Built once: no indentation or spaces, and no circular-reference checks
+# (the payload is plain lists and dicts).
+COLUMNAR_ENCODER = DjangoJSONEncoder(separators=(",", ":"), check_circular=False)
 
 
 def order_players_for_podium(players):
@@ -132,123 +183,569 @@ def order_players_for_podium(players):
     return [p for p in (left + ordered + right) if p is not None]
 
 
-def annotate_player_stats(player, skill_names, cache=None):
+def annotate_player_stats(player, period_gains, cache=None):
     stats = get_player_stats_from_cache(player.player_name, cache=cache)
     if not stats:
         return None
     # Daily
-    total_xp, skill_xp_gained_today = get_xp_gained_period(player, skill_names, days=1)
+    total_xp, skill_xp_gained_today = period_gains["today"]
     stats.top_skill_today = (
         skill_xp_gained_today[0][0] if skill_xp_gained_today else None
     )
     stats.xp_gained_today = total_xp
     stats.skill_xp_gained_today = skill_xp_gained_today
     # Weekly
-    total_weekly_xp, skill_xp_gained_week = get_xp_gained_period(
-        player, skill_names, days=7
-    )
+    total_weekly_xp, skill_xp_gained_week = period_gains["week"]
     stats.top_skill_week = skill_xp_gained_week[0][0] if skill_xp_gained_week else None
     stats.xp_gained_week = total_weekly_xp
     stats.skill_xp_gained_week = skill_xp_gained_week
     return stats
 
 
+@require_GET
+def events_api(request):
+    """
+    Server-Sent Events stream of leaderboard changes, served only by the
+    async variant: under WSGI each open stream would hold a worker for
+    minutes. Answers 204 No Content instead, which tells EventSource not to
+    reconnect, so clients fall back to polling player_stats_api.
+    """
+    return HttpResponse(status=204)
+
+
+def resume_event_id(request):
+    """The event id a stream starts after: the client's, or the latest."""
+    value = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return latest_event_id()
+
+
+def event_stream_response(stream):
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx and similar proxies from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@require_GET
+def gains_api(request):
+    return gains_response(request)
+
+
+def gains_response(request):
+    """
+    Serves each player's XP gained over a window, best first: a named
+    `period` (see GAIN_PERIODS, default "week") or any `start`/`end` range,
+    e.g. a competition. `skills` and `players` narrow it down. Windows that
+    don't start and end at midnight are measured in whole hours.
+    """
+    try:
+        window = parse_gain_window(request)
+        skill_names = parse_skill_names(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    player_names = [
+        name.strip()
+        for name in request.GET.get("players", "").split(",")
+        if name.strip()
+    ]
+
+    params = [window.name, window.start, window.end, skill_names, player_names]
+    digest = hashlib.sha1(repr(params).encode("utf-8")).hexdigest()
+    return cached_json_response(
+        request,
+        f"gains_{digest}",
+        lambda: build_gains_body(window, skill_names, player_names),
+    )
+
+
+def build_gains_body(window, skill_names, player_names=None):
+    """Builds the serialized gains served by gains_api."""
+    _, _, OVERALL_KEY, _, _ = get_config().keys
+    members = GroupMember.objects.order_by("player_name")
+    if player_names:
+        members = members.filter(player_name__in=player_names)
+    members = dict(members.values_list("id", "player_name"))
+    gains = compute_gains(members, skill_names, [window])
+
+    players = []
+    for member_id, player_name in members.items():
+        total, skill_gains = gains[member_id][window.name]
+        if OVERALL_KEY not in skill_names:
+            total = sum(xp for _, xp in skill_gains)
+        players.append(
+            {"player_name": player_name, "xp_gained": total, "skills": skill_gains}
+        )
+    players.sort(key=lambda p: p["xp_gained"], reverse=True)
+    for rank, player in enumerate(players, start=1):
+        player["rank"] = rank
+
+    with record_timing("serialize"):
+        return json.dumps(
+            {
+                "period": window.name,
+                "start": window.start,
+                "end": window.end,
+                "players": players,
+            },
+            cls=DjangoJSONEncoder,
+        )
+
+
+@require_GET
+def boss_leaderboard_api(request):
+    return boss_leaderboard_response(request)
+
+
+def boss_leaderboard_response(request):
+    """
+    Serves every player's killcount and today/week gains for each boss in
+    `bosses` (comma-separated names, default all), best week first.
+    """
+    try:
+        bosses = parse_boss_names(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    name = "boss_leaderboard"
+    if len(bosses) != len(get_config().bosses):
+        digest = hashlib.sha1(",".join(bosses).encode("utf-8")).hexdigest()
+        name = f"boss_leaderboard_{digest}"
+    return cached_json_response(
+        request, name, lambda: build_boss_leaderboard_body(bosses)
+    )
+
+
+def build_boss_leaderboard_body(bosses):
+    """Builds the serialized boss leaderboard served by boss_leaderboard_api."""
+    config = get_config()
+    boss_keys = dict(zip(config.bosses, config.boss_keys))
+    members = dict(
+        GroupMember.objects.order_by("player_name").values_list("id", "player_name")
+    )
+    windows = default_windows()
+    gains = compute_boss_gains(members, bosses, windows)
+
+    data = {}
+    for boss in bosses:
+        players = []
+        for member_id, player_name in members.items():
+            boss_gains = gains.get((member_id, boss))
+            if not boss_gains or not boss_gains["killcount"]:
+                continue
+            entry = {"player_name": player_name, "killcount": boss_gains["killcount"]}
+            for window in windows:
+                entry[f"gained_{window.name}"] = boss_gains.get(window.name, 0)
+            players.append(entry)
+        players.sort(key=lambda p: (p["gained_week"], p["killcount"]), reverse=True)
+        data[boss_keys[boss]] = {"name": boss, "players": players}
+
+    with record_timing("serialize"):
+        return json.dumps({"bosses": data}, cls=DjangoJSONEncoder)
+
+
+@require_GET
+def boss_history_data_api(request, boss_name):
+    """
+    API endpoint to fetch one boss's killcount history for multiple players.
+    Takes the same `players`, `start`, `end` and `max_points` parameters as
+    skill_history_data_api; each series runs from `start` (or the first
+    sample) to `end` (or now).
+    """
+    try:
+        boss = parse_boss_name(boss_name)
+        player_names, _, start, end, max_points = parse_history_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    datasets = build_boss_series(player_names, boss, start, end, max_points)
+    with record_timing("serialize"):
+        return JsonResponse({"datasets": datasets})
+
+
+def build_boss_series(player_names, boss, start, end, max_points):
+    """
+    Returns one boss's datasets, one per player with samples, in the order the
+    players were given. Reads the BossSample index once, plus once for the
+    killcounts in force at `start`.
+    """
+    members = GroupMember.objects.in_bulk(player_names, field_name="player_name")
+    member_ids = [m.id for m in members.values()]
+    samples = BossSample.objects.filter(group_member_id__in=member_ids, boss=boss)
+    initial = {}
+    if start is not None:
+        samples = samples.filter(timestamp__gte=start)
+        initial = killcounts_before(member_ids, [boss], start)
+    if end is not None:
+        samples = samples.filter(timestamp__lte=end)
+    until = min(end, timezone.now()) if end is not None else timezone.now()
+
+    records = {member_id: [] for member_id in member_ids}
+    for (member_id, _), killcount in initial.items():
+        records[member_id].append((start, killcount))
+    for member_id, timestamp, killcount in samples.order_by(
+        "group_member_id", "timestamp"
+    ).values_list("group_member_id", "timestamp", "killcount"):
+        records[member_id].append((timestamp, killcount))
+
+    datasets = []
+    for player_name in player_names:
+        member = members.get(player_name)
+        points = boss_series_points(records[member.id], until) if member else None
+        if points:
+            datasets.append(build_dataset(player_name, lttb(points, max_points)))
+    return datasets
+
+
 @require_GET
 def skill_history_data_api(request, skill_name):
     """
     API endpoint to fetch all skill history data for multiple players,
     keeping only the first and last point of each run of identical y-values.
+    Optional `start`/`end` (ISO date or datetime) limit the time range and
+    `max_points` caps each series, which is then downsampled with LTTB.
+    With `stream=1` each player's dataset is written as soon as it is built.
+    """
+    try:
+        player_names, ymode, start, end, max_points = parse_history_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    skill = skill_name.capitalize()
+    if wants_stream(request):
+        datasets = iter_skill_datasets(
+            player_names, skill, ymode, start, end, max_points
+        )
+        return StreamingHttpResponse(
+            stream_datasets(datasets), content_type="application/json"
+        )
+
+    series = build_skill_series(player_names, [skill], ymode, start, end, max_points)
+    with record_timing("serialize"):
+        return JsonResponse({"datasets": series[skill.lower()]})
+
+
+@require_GET
+def multi_skill_history_data_api(request):
+    """
+    API endpoint to fetch the history of several skills (or `skills=all`) for
+    multiple players at once, reading each player's samples a single time.
+    Accepts the same `players`, `ymode`, `start`, `end` and `max_points`
+    parameters as skill_history_data_api and returns one dataset list per
+    skill.
+    """
+    player_names = [
+        name.strip()
+        for name in request.GET.get("players", "").split(",")
+        if name.strip()
+    ]
+    if not player_names:
+        return JsonResponse({"error": "No players selected"}, status=400)
+
+    try:
+        skill_names = parse_skill_names(request)
+        start, end, max_points = parse_series_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    series = build_skill_series(
+        player_names,
+        skill_names,
+        request.GET.get("ymode", "xp"),
+        start,
+        end,
+        max_points,
+    )
+    with record_timing("serialize"):
+        return JsonResponse(
+            {
+                "skills": {
+                    skill: {"datasets": datasets} for skill, datasets in series.items()
+                }
+            }
+        )
+
+
+def build_skill_series(player_names, skill_names, ymode, start, end, max_points):
+    """
+    Returns {skill_key: datasets} for every requested skill, with one dataset
+    per player that has samples, in the order the players were given. All
+    samples are read in a single ordered pass over the SkillSample index.
+    """
+    members = GroupMember.objects.in_bulk(player_names, field_name="player_name")
+    samples = sample_rows([m.id for m in members.values()], skill_names, start, end)
+
+    points = {}
+    for (member_id, skill), records in groupby(
+        samples.iterator(chunk_size=2000),
+        key=itemgetter("group_member_id", "skill"),
+    ):
+        points[(member_id, skill)] = series_points(records, skill, ymode, max_points)
+
+    series = {}
+    for skill in skill_names:
+        datasets = []
+        for player_name in player_names:
+            member = members.get(player_name)
+            skill_points = points.get((member.id, skill)) if member else None
+            if not skill_points:
+                continue
+            datasets.append(build_dataset(player_name, skill_points))
+        series[skill.lower()] = datasets
+    return series
+
+
+def iter_skill_datasets(player_names, skill_name, ymode, start, end, max_points):
+    """
+    Yields one skill's datasets a player at a time, in the order the players
+    were given. Each player's samples are read with a chunked iterator, so
+    only one series is held in memory at once.
+    """
+    members = GroupMember.objects.in_bulk(player_names, field_name="player_name")
+    for player_name in player_names:
+        member = members.get(player_name)
+        if member is None:
+            continue
+        samples = sample_rows([member.id], [skill_name], start, end)
+        skill_points = series_points(
+            samples.iterator(chunk_size=2000), skill_name, ymode, max_points
+        )
+        if skill_points:
+            yield build_dataset(player_name, skill_points)
+
+
+def sample_rows(member_ids, skill_names, start, end):
+    """SkillSample rows for the members and skills, ordered for grouping."""
+    samples = SkillSample.objects.filter(
+        group_member_id__in=member_ids, skill__in=skill_names
+    )
+    if start is not None:
+        samples = samples.filter(timestamp__gte=start)
+    if end is not None:
+        samples = samples.filter(timestamp__lte=end)
+    return samples.order_by("group_member_id", "skill", "timestamp").values(
+        "group_member_id",
+        "skill",
+        "timestamp",
+        skill_xp=F("xp"),
+        skill_level=F("level"),
+    )
+
+
+def series_points(records, skill, ymode, max_points):
+    """Compresses and downsamples one player's records for one skill."""
+    if ymode == "level" and skill != get_config().keys[2]:
+        records = derive_levels(records)
+    return lttb(compress_runs(records, ymode), max_points)
+
+
+def build_dataset(player_name, points):
+    return {
+        "label": player_name,
+        "data": [{"x": format_timestamp(x), "y": y} for x, y in points],
+    }
+
+
+def stream_datasets(datasets):
+    """Yields a {"datasets": [...]} JSON document one dataset at a time."""
+    yield '{"datasets": ['
+    for i, dataset in enumerate(datasets):
+        yield (", " if i else "") + json.dumps(dataset, cls=DjangoJSONEncoder)
+    yield "]}"
+
+
+def compress_runs(records, ymode):
+    """
+    Returns (timestamp, y) points keeping only the first and last record of
+    each run of identical y-values, plus the final record. `records` may be
+    any iterable; only the previous record is held while scanning it.
+    """
+    value_key = "skill_xp"
+    level_key = "skill_level"
+    points = []
+    prev_y = None
+    run_start = None
+    last_record = None
+
+    for record in records:
+        y_val = extract_y_value(record, value_key, level_key, ymode)
+        if prev_y is None or y_val != prev_y:
+            if run_start is not None:
+                if last_record["timestamp"] != run_start["timestamp"]:
+                    last_y = extract_y_value(last_record, value_key, level_key, ymode)
+                    points.append((last_record["timestamp"], last_y))
+            points.append((record["timestamp"], y_val))
+            run_start = record
+        prev_y = y_val
+        last_record = record
+
+    if last_record is not None:
+        if not points or format_timestamp(points[-1][0]) != format_timestamp(
+            last_record["timestamp"]
+        ):
+            last_y = extract_y_value(last_record, value_key, level_key, ymode)
+            points.append((last_record["timestamp"], last_y))
+    return points
+
+
+def derive_levels(records, chunk_size=2000):
+    """
+    Yields `records` with skill_level recomputed from skill_xp, converting a
+    chunk at a time so imported and refreshed samples agree.
+    """
+    records = iter(records)
+    while chunk := list(islice(records, chunk_size)):
+        levels = xp_to_levels([record["skill_xp"] for record in chunk])
+        for record, level in zip(chunk, levels):
+            record["skill_level"] = level
+            yield record
+
+
+def parse_history_params(request):
+    """
+    Parses the `players` and `ymode` parameters of skill_history_data_api on
+    top of parse_series_params. Raises ValueError with a client-facing message.
     """
     player_names_str = request.GET.get("players", "")
     ymode = request.GET.get("ymode", "xp")
     if not player_names_str:
-        return JsonResponse({"error": "No players selected"}, status=400)
+        raise ValueError("No players selected")
 
     player_names = [
         name.strip() for name in player_names_str.split(",") if name.strip()
     ]
     if not player_names:
-        return JsonResponse({"error": "No valid player names provided"}, status=400)
+        raise ValueError("No valid player names provided")
 
-    datasets = []
+    start, end, max_points = parse_series_params(request)
+    return player_names, ymode, start, end, max_points
 
-    for player_name in player_names:
-        try:
-            qs = PlayerHistory.objects.filter(
-                group_member__player_name=player_name
-            ).order_by("timestamp")
-            qs = qs.annotate(
-                skill_xp=Cast(
-                    KeyTextTransform(
-                        skill_name.capitalize(), KeyTextTransform("data", "data")
-                    ),
-                    IntegerField(),
-                ),
-                skill_level=Cast(
-                    KeyTextTransform(
-                        f"{skill_name.capitalize()}_level",
-                        KeyTextTransform("data", "data"),
-                    ),
-                    IntegerField(),
-                ),
-            ).values("timestamp", "skill_xp", "skill_level")
-        except Exception:
-            continue
 
-        history_list = list(qs)
-        print(f"DEBUG {player_name} {skill_name}: {history_list}")
-        if not history_list:
+def parse_skill_names(request):
+    """
+    Resolves the `skills` parameter (comma-separated keys or "all") to
+    configured skill names. Raises ValueError with a client-facing message.
+    """
+    skills_param = request.GET.get("skills", "all").strip()
+    config = get_config()
+    if skills_param.lower() == "all":
+        return list(config.skills)
+
+    known = dict(zip(config.skill_keys, config.skills))
+    skill_names = []
+    for name in skills_param.split(","):
+        if not name.strip():
             continue
+        skill = known.get(name.strip().lower())
+        if skill is None:
+            raise ValueError(f"Unknown skill: {name.strip()}")
+        skill_names.append(skill)
+    if not skill_names:
+        raise ValueError("No skills selected")
+    return skill_names
 
-        chart_data = []
-        value_key = "skill_xp"
-        level_key = "skill_level"
-        prev_y = None
-        run_start = None
-
-        for i, record in enumerate(history_list):
-            y_val = extract_y_value(record, value_key, level_key, ymode)
-            if prev_y is None or y_val != prev_y:
-                if run_start is not None and i > 0:
-                    last_record = history_list[i - 1]
-                    last_y = extract_y_value(last_record, value_key, level_key, ymode)
-                    if last_record["timestamp"] != run_start["timestamp"]:
-                        chart_data.append(
-                            {
-                                "x": format_timestamp(last_record["timestamp"]),
-                                "y": last_y,
-                            }
-                        )
-                chart_data.append(
-                    {
-                        "x": format_timestamp(record["timestamp"]),
-                        "y": y_val,
-                    }
-                )
-                run_start = record
-            prev_y = y_val
-
-        if history_list:
-            last_record = history_list[-1]
-            last_y = extract_y_value(last_record, value_key, level_key, ymode)
-            if not chart_data or chart_data[-1]["x"] != format_timestamp(
-                last_record["timestamp"]
-            ):
-                chart_data.append(
-                    {
-                        "x": format_timestamp(last_record["timestamp"]),
-                        "y": last_y,
-                    }
-                )
-
-        datasets.append(
-            {
-                "label": player_name,
-                "data": chart_data,
-            }
-        )
 
-    return JsonResponse({"datasets": datasets})
+def parse_gain_window(request):
+    """
+    Resolves `period` or `start`/`end` to a GainWindow. A date `end` includes
+    that whole day; without `end` the window runs to now. Raises ValueError
+    with a client-facing message.
+    """
+    period = request.GET.get("period")
+    start_param = request.GET.get("start")
+    end_param = request.GET.get("end")
+    if period and (start_param or end_param):
+        raise ValueError("Use either 'period' or 'start'/'end', not both")
+
+    if not (start_param or end_param):
+        period = period or "week"
+        if period not in GAIN_PERIODS:
+            raise ValueError(f"'period' must be one of: {', '.join(GAIN_PERIODS)}")
+        return day_window(period, GAIN_PERIODS[period])
+
+    if not start_param:
+        raise ValueError("'start' is required with 'end'")
+    start = parse_time_param(start_param, "start")
+    if end_param and parse_datetime(end_param) is None and parse_date(end_param):
+        end = local_midnight(parse_date(end_param) + timedelta(days=1))
+    else:
+        end = parse_time_param(end_param, "end")
+    if end is None:
+        # Open-ended windows run to the end of the current hour, which the
+        # hourly rollups can't tell apart from now but which caches well.
+        end = utc_hour(timezone.now()) + timedelta(hours=1)
+    if start >= end:
+        raise ValueError("'start' must be before 'end'")
+    return GainWindow(name="custom", start=start, end=end)
+
+
+def parse_boss_names(request):
+    """
+    Resolves the `bosses` parameter (comma-separated names, or "all") to
+    configured boss names. Raises ValueError with a client-facing message.
+    """
+    bosses_param = request.GET.get("bosses", "all").strip()
+    if bosses_param.lower() == "all":
+        return list(get_config().bosses)
+    bosses = [parse_boss_name(name) for name in bosses_param.split(",") if name.strip()]
+    if not bosses:
+        raise ValueError("No bosses selected")
+    return bosses
+
+
+def parse_boss_name(name):
+    """Returns the configured boss matching `name` (any case)."""
+    config = get_config()
+    boss = dict(zip(config.boss_keys, config.bosses)).get(name.strip().lower())
+    if boss is None:
+        raise ValueError(f"Unknown boss: {name.strip()}")
+    return boss
+
+
+def wants_stream(request):
+    return request.GET.get("stream", "").lower() in ("1", "true")
+
+
+def parse_series_params(request):
+    """
+    Parses the `start`, `end` and `max_points` query parameters shared by the
+    history endpoints. Naive values are read in TIME_ZONE. Raises ValueError
+    with a client-facing message on bad input.
+    """
+    start = parse_time_param(request.GET.get("start"), "start")
+    end = parse_time_param(request.GET.get("end"), "end", end_of_day=True)
+    if start is not None and end is not None and start > end:
+        raise ValueError("'start' must be before 'end'")
+
+    max_points = request.GET.get("max_points", DEFAULT_MAX_POINTS)
+    try:
+        max_points = int(max_points)
+    except (TypeError, ValueError):
+        raise ValueError("'max_points' must be an integer")
+    if not 3 <= max_points <= MAX_POINTS_LIMIT:
+        raise ValueError(f"'max_points' must be between 3 and {MAX_POINTS_LIMIT}")
+    return start, end, max_points
+
+
+def parse_time_param(value, name, end_of_day=False):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"'{name}' must be an ISO date or datetime")
+        if end_of_day:
+            day += timedelta(days=1)
+            parsed = datetime.combine(day, time.min) - timedelta(microseconds=1)
+        else:
+            parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
 
 def format_timestamp(ts):
@@ -0,0 +1,78 @@
+# stats_app/xpmath.py
+
+
+from bisect import bisect_right
+
+MAX_LEVEL = 99
+MAX_VIRTUAL_LEVEL = 126
+MAX_XP = 200_000_000
+
+
+def _build_level_xp():
+    # The game floors each term, sums, then quarters the total; quartering
+    # each term first undercounts by up to a few dozen XP at high levels.
+    table = [0, 0]
+    points = 0
+    for level in range(1, MAX_VIRTUAL_LEVEL):
+        points += int(level + 300 * 2 ** (level / 7))
+        table.append(points // 4)
+    return tuple(table)
+
+
+# LEVEL_XP[level] is the total XP needed to reach `level` (index 0 is unused).
+LEVEL_XP = _build_level_xp()
+# XP at which levels 2..126 start, for bisecting.
+_THRESHOLDS = LEVEL_XP[2:]
+
+
+def xp_to_virtual_level(xp):
+    """Returns the level (1-126) for an XP total, past 99 where earned."""
+    return bisect_right(_THRESHOLDS, xp) + 1
+
+
+def xp_to_level(xp):
+    """Returns the in-game level (1-99) for an XP total."""
+    return min(bisect_right(_THRESHOLDS, xp) + 1, MAX_LEVEL)
+
+
+def level_to_xp(level):
+    """Returns the XP needed to reach `level`, clamped to 1-126."""
+    return LEVEL_XP[min(max(int(level), 1), MAX_VIRTUAL_LEVEL)]
+
+
+def xp_to_next_level(xp, virtual=False):
+    """Returns the XP still needed for the next level, or 0 at the cap."""
+    level = xp_to_virtual_level(xp)
+    if level >= (MAX_VIRTUAL_LEVEL if virtual else MAX_LEVEL):
+        return 0
+    return LEVEL_XP[level + 1] - xp
+
+
+# Batched versions. These take any iterable and return a list; binding the
+# table and bisect locally avoids per-value lookups in tight loops.
+
+
+def xp_to_levels(xps, virtual=False):
+    """xp_to_level (or xp_to_virtual_level) for every value in `xps`."""
+    thresholds, search = _THRESHOLDS, bisect_right
+    if virtual:
+        return [search(thresholds, xp) + 1 for xp in xps]
+    cap = MAX_LEVEL - 1
+    return [min(search(thresholds, xp), cap) + 1 for xp in xps]
+
+
+def levels_to_xp(levels):
+    """level_to_xp for every value in `levels`."""
+    table, top = LEVEL_XP, MAX_VIRTUAL_LEVEL
+    return [table[min(max(int(level), 1), top)] for level in levels]
+
+
+def xps_to_next_level(xps, virtual=False):
+    """xp_to_next_level for every value in `xps`."""
+    table, thresholds, search = LEVEL_XP, _THRESHOLDS, bisect_right
+    cap = MAX_VIRTUAL_LEVEL if virtual else MAX_LEVEL
+    result = []
+    for xp in xps:
+        level = search(thresholds, xp) + 1
+        result.append(0 if level >= cap else table[level + 1] - xp)
+    return result
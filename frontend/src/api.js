@@ -1,10 +1,11 @@
 import axios from 'axios';
+import { expandColumnarStats } from './utils';
 
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL;
 
 export const getData = async () => {
-  const response = await axios.get(`${API_BASE_URL}player_stats/`);
-  return response.data;
+  const response = await axios.get(`${API_BASE_URL}player_stats/?format=columnar`);
+  return expandColumnarStats(response.data);
 };
 
 export const getHistoryData = async (selectedSkill, playerNames) => {
@@ -12,3 +13,23 @@ export const getHistoryData = async (selectedSkill, playerNames) => {
   const response = await axios.get(`${API_BASE_URL}history_data/${selectedSkill}/?players=${playerNames}`);
   return response.data;
 };
+
+export const getAllHistoryData = async (playerNames) => {
+  const response = await axios.get(`${API_BASE_URL}history_data/?skills=all&players=${playerNames}`);
+  return response.data;
+};
+
+// Calls onUpdate with each player_update pushed by the server. EventSource
+// reconnects (resuming from the last event id) on its own. If the server
+// doesn't stream (it answers 204 under WSGI) the source closes for good and
+// onUnavailable is called once. Returns a function that closes the stream.
+export const subscribeToUpdates = (onUpdate, onUnavailable) => {
+  const source = new EventSource(`${API_BASE_URL}events/`);
+  source.addEventListener("player_update", (event) => {
+    onUpdate(JSON.parse(event.data));
+  });
+  source.addEventListener("error", () => {
+    if (source.readyState === EventSource.CLOSED) onUnavailable();
+  });
+  return () => source.close();
+};
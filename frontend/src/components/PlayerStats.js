@@ -1,5 +1,9 @@
 import React, { useEffect, useState } from "react";
-import { humanizeNumber } from "../utils";
+import {
+  humanizeNumber,
+  mergePlayerHistory,
+  orderPlayersForPodium,
+} from "../utils";
 import {
   Chart as ChartJS,
   CategoryScale,
@@ -10,7 +14,7 @@ import {
   Tooltip,
   Legend,
 } from "chart.js";
-import { getData, getHistoryData } from '../api';
+import { getData, getAllHistoryData, subscribeToUpdates } from '../api';
 import axios from 'axios';
 import PlayerHistoryChart from "./PlayerHistoryChart";
 
@@ -20,12 +24,15 @@ ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, Title, T
 const BACKEND_URL = process.env.REACT_APP_API_BASE_URL
   ? process.env.REACT_APP_API_BASE_URL.replace(/\/api\/?$/, "")
   : "";
+// How often the leaderboard is refetched when the backend can't push updates.
+const POLL_INTERVAL_MS = 60 * 1000;
 
 function PlayerStats() {
   const [players, setPlayers] = useState([]);
   const [loading, setLoading] = useState(true);
-  const [historyData, setHistoryData] = useState(null);
+  const [allHistoryData, setAllHistoryData] = useState(null);
   const [selectedSkill, setSelectedSkill] = useState("overall");
+  const [historyVersion, setHistoryVersion] = useState(0);
 
   useEffect(() => {
     getData()
@@ -35,14 +42,61 @@ function PlayerStats() {
       })
       .catch(() => setLoading(false));
   }, []);
-  
+
+  // Apply pushed updates instead of polling for the whole leaderboard. An
+  // update carries the player's new stats; their history is refetched alone.
+  // Backends that don't stream (WSGI) are polled instead.
   useEffect(() => {
-    if (players.length > 0 && selectedSkill) {
-      const playerNames = players.map((p) => p.player_name).join(",");
-      getHistoryData(selectedSkill, playerNames)
-        .then((data) => setHistoryData(data));
+    let timer = null;
+    const unsubscribe = subscribeToUpdates(
+      (update) => {
+        const { ranks, ...fields } = update;
+        setPlayers((current) =>
+          orderPlayersForPodium(
+            current.map((p) => ({
+              ...p,
+              ...(p.player_name === update.player_name ? fields : {}),
+              rank: ranks[p.player_name] ?? p.rank,
+            }))
+          )
+        );
+        getAllHistoryData(update.player_name).then((data) =>
+          setAllHistoryData((current) =>
+            current
+              ? mergePlayerHistory(current, data.skills, update.player_name)
+              : current
+          )
+        );
+      },
+      () => {
+        timer = setInterval(() => {
+          getData().then((data) => {
+            if (Array.isArray(data.players)) setPlayers(data.players);
+            setHistoryVersion((version) => version + 1);
+          });
+        }, POLL_INTERVAL_MS);
+      }
+    );
+    return () => {
+      unsubscribe();
+      clearInterval(timer);
+    };
+  }, []);
+
+  // Every skill's history is fetched at once, so switching skills is
+  // client-side. Sorted, so reordering the leaderboard doesn't refetch it.
+  const playerNames = players
+    .map((p) => p.player_name)
+    .sort()
+    .join(",");
+  useEffect(() => {
+    if (playerNames) {
+      getAllHistoryData(playerNames)
+        .then((data) => setAllHistoryData(data.skills));
     }
-  }, [players, selectedSkill]);
+  }, [playerNames, historyVersion]);
+
+  const historyData = allHistoryData ? allHistoryData[selectedSkill] : null;
 
   if (loading) return <div>Loading...</div>;
   if (!Array.isArray(players) || players.length === 0) {
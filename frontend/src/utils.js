@@ -7,4 +7,58 @@ export function humanizeNumber(value) {
   if (value >= 1_000_000) return (value / 1_000_000).toFixed(1) + "M";
   if (value >= 1000) return (value / 1000).toFixed(1) + "K";
   return value;
-}
\ No newline at end of file
+}
+
+// Mirrors order_players_for_podium in the backend: gold in the centre,
+// silver to its left, bronze to its right, the rest alternating outward.
+export function orderPlayersForPodium(players) {
+  const byRank = [...players].sort((a, b) => a.rank - b.rank);
+  const podium = [byRank[1], byRank[0], byRank[2]].filter(Boolean);
+  const left = [];
+  const right = [];
+  byRank.slice(3).forEach((player, i) => {
+    if (i % 2 === 0) left.unshift(player);
+    else right.push(player);
+  });
+  return [...left, ...podium, ...right];
+}
+
+// Expands a `?format=columnar` player_stats response into the default
+// format's shape: per-player skill and boss objects keyed by name, bosses
+// sorted by killcount like the backend's parse_bosses.
+export function expandColumnarStats(data) {
+  const players = data.players.map((player) => {
+    const skills = {};
+    data.skills.forEach((name, i) => {
+      skills[name] = {
+        rank: player.skills.rank[i],
+        level: player.skills.level[i],
+        xp: player.skills.xp[i],
+      };
+    });
+    const bosses = {};
+    data.bosses
+      .map((name, i) => [name, player.bosses.killcount[i]])
+      .sort((a, b) => b[1] - a[1])
+      .forEach(([name, killcount]) => {
+        bosses[name] = { killcount };
+      });
+    return { ...player, skills, bosses };
+  });
+  return { players };
+}
+
+// Replaces one player's datasets in a history_data/?skills= response with
+// the ones in `update` (the same response for just that player), in place so
+// every series keeps its position and colour.
+export function mergePlayerHistory(history, update, playerName) {
+  const merged = { ...history };
+  Object.entries(update).forEach(([skill, { datasets }]) => {
+    const current = history[skill]?.datasets || [];
+    const index = current.findIndex((dataset) => dataset.label === playerName);
+    const others = current.filter((dataset) => dataset.label !== playerName);
+    others.splice(index === -1 ? others.length : index, 0, ...datasets);
+    merged[skill] = { ...history[skill], datasets: others };
+  });
+  return merged;
+}